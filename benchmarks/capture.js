@@ -0,0 +1,118 @@
+// Writes a synthetic event capture for benchmarks/replay.py, in the format of
+// Baileys' captureEventStream (what PYBAILEYS_CAPTURE_EVENTS records): one
+// {timestamp, event, data} JSON object per line. Seeded, so the same arguments
+// always produce the same file.
+//
+//     node benchmarks/capture.js --out capture.ndjson [--events 20000] [--rate 500] [--seed 1]
+const fs = require('fs');
+
+const arg = (name, fallback) => {
+    const i = process.argv.indexOf(`--${name}`);
+    return i === -1 ? fallback : process.argv[i + 1];
+};
+
+// mulberry32
+const makeRandom = (seed) => () => {
+    seed = (seed + 0x6D2B79F5) | 0;
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+
+const main = () => {
+    const out = arg('out');
+    if (!out) throw new Error('--out is required');
+    const total = Number(arg('events', 20000));
+    const rate = Number(arg('rate', 500));
+    const random = makeRandom(Number(arg('seed', 1)));
+
+    const int = (n) => Math.floor(random() * n);
+    const bytes = (n) => Buffer.from(Array.from({ length: n }, () => int(256)));
+    const hex = (n) => bytes(n).toString('hex').toUpperCase();
+    const chat = () => (random() < 0.4
+        ? `1203630${String(int(50)).padStart(5, '0')}@g.us`
+        : `9477${String(int(5000)).padStart(7, '0')}@s.whatsapp.net`);
+
+    const key = (remoteJid) => ({
+        remoteJid,
+        fromMe: false,
+        id: hex(10),
+        ...(remoteJid.endsWith('@g.us') ? { participant: `9477${String(int(5000)).padStart(7, '0')}@s.whatsapp.net` } : {})
+    });
+
+    const contextInfo = () => ({
+        messageContextInfo: {
+            deviceListMetadata: { senderKeyHash: bytes(10), senderTimestamp: 1699990000 },
+            deviceListMetadataVersion: 2,
+            messageSecret: bytes(32)
+        }
+    });
+
+    const text = (i) => ({
+        extendedTextMessage: { text: `message ${i} ${'lorem ipsum '.repeat(1 + int(8))}`.trim() },
+        ...contextInfo()
+    });
+
+    const image = () => ({
+        imageMessage: {
+            url: `https://mmg.whatsapp.net/v/t62.7118-24/${hex(12)}_n.enc?ccb=11-4&mms3=true`,
+            mimetype: 'image/jpeg',
+            fileSha256: bytes(32),
+            fileLength: 40000 + int(200000),
+            height: 1280,
+            width: 960,
+            mediaKey: bytes(32),
+            fileEncSha256: bytes(32),
+            directPath: `/v/t62.7118-24/${hex(12)}_n.enc?ccb=11-4`,
+            mediaKeyTimestamp: 1700000000,
+            jpegThumbnail: bytes(1500 + int(2000))
+        },
+        ...contextInfo()
+    });
+
+    const event = (i, timestamp) => {
+        const roll = random();
+        if (roll < 0.7) {
+            const remoteJid = chat();
+            return {
+                event: 'messages.upsert',
+                data: {
+                    type: 'notify',
+                    messages: [{
+                        key: key(remoteJid),
+                        messageTimestamp: Math.floor(timestamp / 1000),
+                        pushName: `User ${int(5000)}`,
+                        message: random() < 0.8 ? text(i) : image()
+                    }]
+                }
+            };
+        }
+        if (roll < 0.85) {
+            return {
+                event: 'messages.update',
+                data: [{ key: { ...key(chat()), fromMe: true }, update: { status: 3 + int(2) } }]
+            };
+        }
+        if (roll < 0.95) {
+            const id = chat();
+            return {
+                event: 'presence.update',
+                data: { id, presences: { [id]: { lastKnownPresence: random() < 0.5 ? 'composing' : 'available' } } }
+            };
+        }
+        return {
+            event: 'chats.update',
+            data: [{ id: chat(), unreadCount: 1 + int(20), conversationTimestamp: Math.floor(timestamp / 1000) }]
+        };
+    };
+
+    const start = 1700000000000;
+    const lines = [];
+    for (let i = 0; i < total; i++) {
+        const timestamp = start + Math.round((i * 1000) / rate);
+        lines.push(JSON.stringify({ timestamp, ...event(i, timestamp) }));
+    }
+    fs.writeFileSync(out, `${lines.join('\n')}\n`);
+};
+
+main();
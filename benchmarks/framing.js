@@ -0,0 +1,126 @@
+// Node side of benchmarks/framing.py: builds messages.upsert frames shaped like
+// the ones Baileys emits, encodes them as JSON (bridge.js' replacer) and as
+// msgpack, and reports sizes and encode times.
+const fs = require('fs');
+const path = require('path');
+const crypto = require('crypto');
+const msgpack = require('../src/pybaileys/engine/msgpack');
+
+// Same replacer as bridge.js
+const jsonReplacer = (key, value) => {
+    if (typeof value === 'bigint') return value.toString();
+    if (value && value.type === 'Buffer' && Array.isArray(value.data)) {
+        return { type: 'Buffer', data: Buffer.from(value.data).toString('base64') };
+    }
+    return value;
+};
+
+const key = (i) => ({
+    remoteJid: `1203630${String(i % 50).padStart(5, '0')}@g.us`,
+    fromMe: false,
+    id: crypto.randomBytes(10).toString('hex').toUpperCase(),
+    participant: `9477${String(i).padStart(7, '0')}@s.whatsapp.net`
+});
+
+const textMessage = (i) => ({
+    key: key(i),
+    messageTimestamp: 1700000000 + i,
+    pushName: `User ${i}`,
+    broadcast: false,
+    message: {
+        extendedTextMessage: {
+            text: `.menu some command text number ${i}`,
+            contextInfo: { expiration: 604800, ephemeralSettingTimestamp: 1690000000 }
+        },
+        messageContextInfo: {
+            deviceListMetadata: { senderKeyHash: crypto.randomBytes(10), senderTimestamp: 1699990000 },
+            deviceListMetadataVersion: 2,
+            messageSecret: crypto.randomBytes(32)
+        }
+    }
+});
+
+const imageMessage = (i) => ({
+    key: key(i),
+    messageTimestamp: 1700000000 + i,
+    pushName: `User ${i}`,
+    message: {
+        imageMessage: {
+            url: 'https://mmg.whatsapp.net/v/t62.7118-24/12345678_123456789012345_1234567890123456789_n.enc?ccb=11-4&oh=01_Q5AaI&oe=65A1B2C3&_nc_sid=5e03e0&mms3=true',
+            mimetype: 'image/jpeg',
+            caption: `photo ${i}`,
+            fileSha256: crypto.randomBytes(32),
+            fileLength: 180000 + i,
+            height: 1280,
+            width: 960,
+            mediaKey: crypto.randomBytes(32),
+            fileEncSha256: crypto.randomBytes(32),
+            directPath: '/v/t62.7118-24/12345678_123456789012345_1234567890123456789_n.enc?ccb=11-4&oh=01_Q5AaI&oe=65A1B2C3&_nc_sid=5e03e0',
+            mediaKeyTimestamp: 1699999999,
+            jpegThumbnail: crypto.randomBytes(9000),
+            scansSidecar: crypto.randomBytes(40),
+            scanLengths: [2400, 11000, 5800, 12000],
+            midQualityFileSha256: crypto.randomBytes(32)
+        },
+        messageContextInfo: { messageSecret: crypto.randomBytes(32) }
+    }
+});
+
+const buildFrames = (count, perFrame) => {
+    const frames = [];
+    for (let f = 0; f < count; f++) {
+        const messages = [];
+        for (let m = 0; m < perFrame; m++) {
+            const i = f * perFrame + m;
+            messages.push(i % 4 === 0 ? imageMessage(i) : textMessage(i));
+        }
+        frames.push({ type: 'EVENT', name: 'messages.upsert', data: { messages, type: 'notify' } });
+    }
+    return frames;
+};
+
+const bench = (label, frames, encode) => {
+    let bytes = 0;
+    const encoded = [];
+    const start = process.hrtime.bigint();
+    for (const frame of frames) {
+        const out = encode(frame);
+        bytes += Buffer.byteLength(out);
+        encoded.push(out);
+    }
+    const ms = Number(process.hrtime.bigint() - start) / 1e6;
+    return { label, bytes, ms, encoded };
+};
+
+const main = () => {
+    const args = process.argv.slice(2);
+    const dump = args.includes('--dump') ? args[args.indexOf('--dump') + 1] : null;
+    const count = Number(process.env.FRAMES || 2000);
+    const perFrame = Number(process.env.PER_FRAME || 4);
+
+    const frames = buildFrames(count, perFrame);
+    // Warm up both encoders before timing
+    bench('warmup', frames.slice(0, 100), (f) => JSON.stringify(f, jsonReplacer));
+    bench('warmup', frames.slice(0, 100), (f) => msgpack.encode(f));
+
+    const results = [
+        bench('json', frames, (f) => JSON.stringify(f, jsonReplacer)),
+        bench('msgpack', frames, (f) => msgpack.encode(f))
+    ];
+
+    if (dump) {
+        fs.mkdirSync(dump, { recursive: true });
+        fs.writeFileSync(path.join(dump, 'frames.ndjson'), results[0].encoded.join('\n'));
+        const lengths = Buffer.alloc(4 * results[1].encoded.length);
+        results[1].encoded.forEach((buf, i) => lengths.writeUInt32BE(buf.length, i * 4));
+        fs.writeFileSync(path.join(dump, 'frames.msgpack'), Buffer.concat([lengths, ...results[1].encoded]));
+    }
+
+    console.log(JSON.stringify({
+        frames: count,
+        messages_per_frame: perFrame,
+        encode: results.map(({ label, bytes, ms }) => ({ label, bytes, ms }))
+    }));
+};
+
+main();
@@ -0,0 +1,59 @@
+"""Compares JSON and msgpack framing on realistic messages.upsert payloads.
+
+Runs benchmarks/framing.js to build and encode the frames in Node, then times
+decoding them in Python the way BaileysClient._decode_frame does.
+
+    python benchmarks/framing.py            # FRAMES=2000 PER_FRAME=4 by default
+"""
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+import msgpack
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_msgpack_frames(path, count):
+    with open(path, 'rb') as f:
+        data = f.read()
+    lengths = struct.unpack(f'>{count}I', data[:4 * count])
+    frames, pos = [], 4 * count
+    for length in lengths:
+        frames.append(data[pos:pos + length])
+        pos += length
+    return frames
+
+
+def time_decode(frames, decode):
+    start = time.perf_counter()
+    for frame in frames:
+        decode(frame)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        out = subprocess.check_output(['node', os.path.join(BASE_DIR, 'framing.js'), '--dump', tmp], text=True)
+        node = json.loads(out)
+        with open(os.path.join(tmp, 'frames.ndjson')) as f:
+            json_frames = f.read().split('\n')
+        msgpack_frames = load_msgpack_frames(os.path.join(tmp, 'frames.msgpack'), node['frames'])
+
+    decode = {
+        'json': time_decode(json_frames, json.loads),
+        'msgpack': time_decode(msgpack_frames, lambda b: msgpack.unpackb(b, raw=False)),
+    }
+
+    print(f"{node['frames']} messages.upsert frames x {node['messages_per_frame']} messages")
+    print(f"{'format':<10}{'bytes':>14}{'node encode ms':>18}{'python decode ms':>20}")
+    for row in node['encode']:
+        print(f"{row['label']:<10}{row['bytes']:>14,}{row['ms']:>18.1f}{decode[row['label']]:>20.1f}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
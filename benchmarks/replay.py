@@ -0,0 +1,214 @@
+"""End-to-end benchmark without a WhatsApp account or network.
+
+The engine runs with PYBAILEYS_REPLAY, so its socket is engine/replay-socket.js.
+That socket replays an event capture into the bridge and answers every call
+after a canned latency. This measures:
+
+- events/s: from start() until the last event reached a Python handler
+- RPC throughput and latency: sendMessage from several threads
+- peak memory of both processes
+
+With no --capture, a synthetic one is generated by benchmarks/capture.js, seeded
+so runs are comparable. Record a real one from a live session by starting it with
+PYBAILEYS_CAPTURE_EVENTS=capture.ndjson.
+
+    python benchmarks/replay.py                          # 20000 synthetic events, 4000 calls
+    python benchmarks/replay.py --json results.json      # also write the results
+    python benchmarks/replay.py --baseline results.json  # exit 1 on a >20% regression
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from pybaileys import BaileysClient
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Results compared against a baseline, and whether higher is better
+TRACKED = {
+    'events_per_s': True,
+    'engine_replay_ms': False,
+    'rpc_per_s': True,
+    'rpc_p50_ms': False,
+    'rpc_p99_ms': False,
+    'python_peak_rss_mb': False,
+    'engine_peak_rss_mb': False,
+}
+
+
+def count_events(path):
+    with open(path, 'rb') as f:
+        return Counter(json.loads(line)['event'] for line in f if line.strip())
+
+
+def peak_rss_mb(pid=None):
+    if pid is None:
+        # KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024))
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024)
+    except OSError:
+        pass
+    return None
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))], 3)
+
+
+def replay_events(client, expected, auth_path, timeout):
+    handled = 0
+    lock = threading.Lock()
+    done = threading.Event()
+    replayed = threading.Event()
+    engine = {}
+
+    def handler(payload):
+        nonlocal handled
+        with lock:
+            handled += 1
+            if handled == total:
+                done.set()
+
+    total = sum(expected.values())
+    for name in expected:
+        client.on(name)(handler)
+
+    def on_replayed(payload):
+        engine.update(payload)
+        replayed.set()
+
+    client.on('replay.done')(on_replayed)
+
+    start = time.perf_counter()
+    client.start(auth_path, log_level='warn', send_queue=False, group_cache=False)
+    if not done.wait(timeout):
+        raise TimeoutError(f"Only {handled} of {total} events reached Python within {timeout}s")
+    elapsed = time.perf_counter() - start
+    # Sent after the last event, its listener may still be queued
+    replayed.wait(5)
+    return {
+        'events': total,
+        'events_per_s': round(total / elapsed),
+        'engine_replay_ms': engine.get('ms'),
+    }
+
+
+def rpc_throughput(client, calls, threads):
+    latencies = []
+    per_thread = calls // threads
+
+    def worker(n):
+        own = []
+        for i in range(per_thread):
+            t = time.perf_counter()
+            client.sendMessage(f'9477{n:03d}{i:04d}@s.whatsapp.net', {'text': f'benchmark {i}'})
+            own.append((time.perf_counter() - t) * 1000)
+        latencies.extend(own)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'rpc_calls': len(latencies),
+        'rpc_per_s': round(len(latencies) / elapsed),
+        'rpc_p50_ms': percentile(latencies, 0.5),
+        'rpc_p99_ms': percentile(latencies, 0.99),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, higher_is_better in TRACKED.items():
+        base, value = baseline.get('results', {}).get(name), results.get(name)
+        if not base or value is None:
+            continue
+        change = (value - base) / base
+        worse = -change if higher_is_better else change
+        if worse > tolerance:
+            regressions.append(f"{name}: {base} -> {value} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--capture', help="NDJSON event capture (default: a synthetic one)")
+    parser.add_argument('--events', type=int, default=20000, help="size of the synthetic capture")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--speed', type=float, default=0, help="replay pace, x recorded; 0 = as fast as possible")
+    parser.add_argument('--latency-ms', type=float, default=2, help="canned latency of every socket call")
+    parser.add_argument('--calls', type=int, default=4000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--framing', default='json')
+    parser.add_argument('--transport', default='ws')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--baseline', help="results file of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = args.capture
+        if capture is None:
+            capture = os.path.join(tmp, 'capture.ndjson')
+            subprocess.check_call(['node', os.path.join(BASE_DIR, 'capture.js'), '--out', capture,
+                                   '--events', str(args.events), '--seed', str(args.seed)])
+        expected = count_events(capture)
+        # Always sent by the bridge, whether subscribed or not
+        expected.pop('connection.update', None)
+
+        os.environ.update(
+            PYBAILEYS_REPLAY=os.path.abspath(capture),
+            PYBAILEYS_REPLAY_SPEED=str(args.speed),
+            PYBAILEYS_REPLAY_LATENCY_MS=str(args.latency_ms),
+        )
+        client = BaileysClient(framing=args.framing, transport=args.transport)
+        # Connected first: the sync client subscribes to events as they are registered
+        client._connect()
+        try:
+            results = replay_events(client, expected, os.path.join(tmp, 'auth'), args.timeout)
+            results.update(rpc_throughput(client, args.calls, args.threads))
+            results['python_peak_rss_mb'] = peak_rss_mb()
+            results['engine_peak_rss_mb'] = peak_rss_mb(client.process.pid)
+        finally:
+            client.stop()
+
+    params = {k: v for k, v in vars(args).items() if k not in ('json', 'baseline', 'tolerance', 'timeout')}
+    print(f"{results['events']:,} events ({dict(expected)})")
+    print(f"{'events/s':<22}{results['events_per_s']:>12,}   (engine replay {results['engine_replay_ms']} ms)")
+    print(f"{'sendMessage/s':<22}{results['rpc_per_s']:>12,}   "
+          f"p50 {results['rpc_p50_ms']} ms, p99 {results['rpc_p99_ms']} ms, canned latency {args.latency_ms} ms")
+    print(f"{'peak RSS python / node':<22}{results['python_peak_rss_mb']:>9} MB / {results['engine_peak_rss_mb']} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'params': params, 'results': results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('params') != params:
+            print(f"[!] Baseline ran with different parameters: {baseline.get('params')}")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"[!] Regression {line}")
+        return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+// Writes a synthetic stanza corpus for benchmarks/wabinary.js, in the format
+// PYBAILEYS_CAPTURE_STANZAS records from a live session: one {dir, frame} JSON
+// object per line, `frame` being the base64 of a decrypted frame as the codec
+// sees it (flag byte first, deflated when the flag has bit 2 set). The mix
+// follows a busy account: mostly group and direct messages, receipts, acks
+// and presence, with now and then a large usync result or a send fanned out
+// to many devices. Seeded, so the same arguments always produce the same file.
+//
+//     node benchmarks/stanzas.js --out stanzas.ndjson [--frames 5000] [--seed 1]
+const fs = require('fs');
+const zlib = require('zlib');
+const { encodeBinaryNode } = require('./wabinary-reference');
+
+// Frames at least this large are sent deflated
+const COMPRESS_MIN = 1024;
+
+// mulberry32
+const makeRandom = (seed) => () => {
+    seed = (seed + 0x6D2B79F5) | 0;
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+
+const makeStanzas = ({ frames = 5000, seed = 1 } = {}) => {
+    const random = makeRandom(seed);
+    const int = (n) => Math.floor(random() * n);
+    const pick = (items) => items[int(items.length)];
+    const bytes = (n) => Buffer.from(Array.from({ length: n }, () => int(256)));
+    const id = () => `3EB0${bytes(8).toString('hex').toUpperCase()}`;
+    const phone = () => `9477${String(int(5000000)).padStart(7, '0')}`;
+    const user = () => (random() < 0.3 ? `${1e14 + int(9e14)}@lid` : `${phone()}@s.whatsapp.net`);
+    const device = (jid) => jid.replace('@', `:${1 + int(20)}@`);
+    const group = () => `1203630${String(int(500)).padStart(11, '0')}@g.us`;
+    const t = () => String(1700000000 + int(10000000));
+    const name = () => pick(['Nimal', 'Kasun', 'Ayesha', 'Dilani', 'Ruwan', 'Sachini', 'Tharindu', 'Malsha 🌸', 'Chamod ✌️']);
+    const enc = (type, n) => ({ tag: 'enc', attrs: { v: '2', type }, content: bytes(n) });
+
+    const message = () => {
+        const inGroup = random() < 0.6;
+        const attrs = inGroup
+            ? { from: group(), participant: user(), id: id(), t: t(), type: 'text', notify: name() }
+            : { from: user(), id: id(), t: t(), type: random() < 0.8 ? 'text' : 'media', notify: name() };
+        if (random() < 0.1) attrs.offline = '1';
+        const content = [inGroup ? enc('skmsg', 60 + int(300)) : enc(random() < 0.2 ? 'pkmsg' : 'msg', 80 + int(400))];
+        if (inGroup && random() < 0.05) content.unshift(enc('pkmsg', 500 + int(300)));
+        return { tag: 'message', attrs, content };
+    };
+
+    const receipt = () => {
+        const attrs = { from: random() < 0.5 ? group() : user(), id: id(), t: t() };
+        if (random() < 0.7) attrs.type = pick(['read', 'read-self', 'played']);
+        if (attrs.from.endsWith('@g.us')) attrs.participant = device(user());
+        const extra = int(4);
+        if (!extra) return { tag: 'receipt', attrs };
+        return {
+            tag: 'receipt',
+            attrs,
+            content: [{ tag: 'list', attrs: {}, content: Array.from({ length: extra }, () => ({ tag: 'item', attrs: { id: id() } })) }]
+        };
+    };
+
+    const ack = () => ({ tag: 'ack', attrs: { class: pick(['message', 'receipt', 'notification']), id: id(), from: user(), t: t() } });
+
+    const presence = () => (random() < 0.5
+        ? { tag: 'presence', attrs: { from: user(), type: pick(['available', 'unavailable']), last: t() } }
+        : { tag: 'chatstate', attrs: { from: user() }, content: [{ tag: pick(['composing', 'paused']), attrs: {} }] });
+
+    const notification = () => ({
+        tag: 'notification',
+        attrs: { from: user(), type: pick(['devices', 'encrypt', 'picture', 'w:gp2']), id: String(int(1e9)), t: t() },
+        content: [{ tag: 'count', attrs: { value: String(int(50)) } }]
+    });
+
+    const usyncResult = () => ({
+        tag: 'iq',
+        attrs: { from: 's.whatsapp.net', type: 'result', id: `${int(1e5)}.${int(1e5)}-${int(100)}` },
+        content: [{
+            tag: 'usync',
+            attrs: { sid: id(), index: '0', last: 'true' },
+            content: [{
+                tag: 'list',
+                attrs: {},
+                content: Array.from({ length: 20 + int(200) }, () => ({
+                    tag: 'user',
+                    attrs: { jid: user() },
+                    content: [{
+                        tag: 'devices',
+                        attrs: {},
+                        content: [{
+                            tag: 'device-list',
+                            attrs: {},
+                            content: Array.from({ length: 1 + int(4) }, (_, i) => ({ tag: 'device', attrs: { id: String(i), 'key-index': String(int(40)) } }))
+                        }]
+                    }]
+                }))
+            }]
+        }]
+    });
+
+    const send = () => {
+        const to = random() < 0.5 ? group() : user();
+        const fanout = to.endsWith('@g.us') ? 0 : 1 + int(random() < 0.1 ? 60 : 4);
+        const content = fanout
+            ? [{ tag: 'participants', attrs: {}, content: Array.from({ length: fanout }, () => ({ tag: 'to', attrs: { jid: device(user()) }, content: [enc('msg', 100 + int(200))] })) }]
+            : [enc('skmsg', 80 + int(200))];
+        return { tag: 'message', attrs: { to, id: id(), type: 'text' }, content };
+    };
+
+    const readReceipt = () => ({ tag: 'receipt', attrs: { to: user(), id: id(), type: 'read', t: t() } });
+
+    const ping = () => ({ tag: 'iq', attrs: { to: 's.whatsapp.net', type: 'get', xmlns: 'w:p', id: `${int(1e5)}.${int(1e5)}-${int(100)}` }, content: [{ tag: 'ping', attrs: {} }] });
+
+    // [weight, direction, kind]
+    const MIX = [
+        [40, 'in', message], [18, 'in', receipt], [10, 'in', ack], [10, 'in', presence],
+        [3, 'in', notification], [1, 'in', usyncResult],
+        [8, 'out', send], [7, 'out', readReceipt], [3, 'out', ping]
+    ];
+    const totalWeight = MIX.reduce((sum, [weight]) => sum + weight, 0);
+    const kind = () => {
+        let roll = random() * totalWeight;
+        for (const entry of MIX) {
+            roll -= entry[0];
+            if (roll < 0) return entry;
+        }
+        return MIX[0];
+    };
+
+    const out = [];
+    for (let i = 0; i < frames; i++) {
+        const [, dir, make] = kind();
+        let frame = encodeBinaryNode(make());
+        if (frame.length >= COMPRESS_MIN) {
+            frame = Buffer.concat([Buffer.from([2]), zlib.deflateSync(frame.subarray(1))]);
+        }
+        out.push({ dir, frame });
+    }
+    return out;
+};
+
+const readStanzas = (file) => fs.readFileSync(file, 'utf-8')
+    .split('\n')
+    .filter(Boolean)
+    .map((line) => {
+        const { dir, frame } = JSON.parse(line);
+        return { dir, frame: Buffer.from(frame, 'base64') };
+    });
+
+if (require.main === module) {
+    const arg = (name, fallback) => {
+        const i = process.argv.indexOf(`--${name}`);
+        return i === -1 ? fallback : process.argv[i + 1];
+    };
+    const out = arg('out');
+    if (!out) throw new Error('--out is required');
+    const stanzas = makeStanzas({ frames: Number(arg('frames', 5000)), seed: Number(arg('seed', 1)) });
+    fs.writeFileSync(out, stanzas.map(({ dir, frame }) => JSON.stringify({ dir, frame: frame.toString('base64') })).join('\n') + '\n');
+}
+
+module.exports = { makeStanzas, readStanzas };
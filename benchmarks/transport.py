@@ -0,0 +1,75 @@
+"""Compares the 'ws', 'unix' and 'stdio' transports on PING round trips.
+
+Boots one engine per transport (no WhatsApp session is started) and measures
+round-trip latency for a few payload sizes, then throughput with several
+threads issuing PINGs at once.
+
+    python benchmarks/transport.py                  # ROUNDS=2000 THREADS=8 by default
+    python benchmarks/transport.py unix stdio       # only some transports
+"""
+import os
+import sys
+import threading
+import time
+
+from pybaileys import BaileysClient
+
+ROUNDS = int(os.environ.get('ROUNDS', 2000))
+THREADS = int(os.environ.get('THREADS', 8))
+SIZES = (100, 10_000, 100_000)
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def latency(client, size, rounds):
+    data = 'x' * size
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        client._call_rpc('PING', {'data': data})
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentile(samples, 0.5), percentile(samples, 0.99)
+
+
+def throughput(client, threads, rounds):
+    def worker():
+        for _ in range(rounds):
+            client._call_rpc('PING', {})
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return threads * rounds / (time.perf_counter() - start)
+
+
+def main():
+    transports = sys.argv[1:] or ['ws', 'unix', 'stdio']
+    print(f"{ROUNDS} round trips per size, throughput with {THREADS} threads")
+    header = ''.join(f"{f'{size:,}B p50/p99 ms':>22}" for size in SIZES)
+    print(f"{'transport':<11}{'connect ms':>11}{header}{'req/s':>10}")
+    for transport in transports:
+        client = BaileysClient(transport=transport)
+        client._connect()
+        try:
+            # Warm up both sides before measuring
+            latency(client, 100, 200)
+            cells = ''
+            rounds = ROUNDS
+            for size in SIZES:
+                p50, p99 = latency(client, size, rounds)
+                cells += f"{f'{p50:.3f} / {p99:.3f}':>22}"
+                rounds = max(rounds // 4, 100)
+            rate = throughput(client, THREADS, ROUNDS // THREADS)
+        finally:
+            client.stop()
+        print(f"{transport:<11}{client.startup_timings['connect']:>11}{cells}{rate:>10,.0f}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
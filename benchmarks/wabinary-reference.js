@@ -0,0 +1,487 @@
+// The WABinary codec as Baileys ships it, before the engine's optimized
+// rewrite in vendor/baileys-main/lib/WABinary. benchmarks/wabinary.js measures
+// against it and checks the rewrite produces the same nodes and bytes.
+const util_1 = require("util")
+const zlib_1 = require("zlib")
+const constants = require("../src/pybaileys/engine/vendor/baileys-main/lib/WABinary/constants")
+const jid_utils_1 = require("../src/pybaileys/engine/vendor/baileys-main/lib/WABinary/jid-utils")
+
+const inflatePromise = util_1.promisify(zlib_1.inflate)
+
+const decompressingIfRequired = async (buffer) => {
+    if (2 & buffer.readUInt8()) {
+        buffer = await inflatePromise(buffer.slice(1))
+    }
+    else { // nodes with no compression have a 0x00 prefix, we remove that
+        buffer = buffer.slice(1)
+    }
+    return buffer
+}
+
+const decodeDecompressedBinaryNode = (buffer, opts, indexRef = { index: 0 }) => {
+    const { DOUBLE_BYTE_TOKENS, SINGLE_BYTE_TOKENS, TAGS } = opts
+    const checkEOS = (length) => {
+        if (indexRef.index + length > buffer.length) {
+            throw new Error('end of stream')
+        }
+    }
+    
+    const next = () => {
+        const value = buffer[indexRef.index]
+        indexRef.index += 1
+        return value
+    }
+    
+    const readByte = () => {
+        checkEOS(1)
+        return next()
+    }
+    
+    const readBytes = (n) => {
+        checkEOS(n)
+        const value = buffer.slice(indexRef.index, indexRef.index + n)
+        indexRef.index += n
+        return value
+    }
+    
+    const readStringFromChars = (length) => {
+        return readBytes(length).toString('utf-8')
+    }
+    
+    const readInt = (n, littleEndian = false) => {
+        checkEOS(n)
+        let val = 0
+        for (let i = 0; i < n; i++) {
+            const shift = littleEndian ? i : n - 1 - i
+            val |= next() << (shift * 8)
+        }
+        return val
+    }
+    
+    const readInt20 = () => {
+        checkEOS(3)
+        return ((next() & 15) << 16) + (next() << 8) + next()
+    }
+    
+    const unpackHex = (value) => {
+        if (value >= 0 && value < 16) {
+            return value < 10 ? '0'.charCodeAt(0) + value : 'A'.charCodeAt(0) + value - 10
+        }
+        throw new Error('invalid hex: ' + value)
+    }
+    
+    const unpackNibble = (value) => {
+        if (value >= 0 && value <= 9) {
+            return '0'.charCodeAt(0) + value
+        }
+        switch (value) {
+            case 10:
+                return '-'.charCodeAt(0)
+            case 11:
+                return '.'.charCodeAt(0)
+            case 15:
+                return '\0'.charCodeAt(0)
+            default:
+                throw new Error('invalid nibble: ' + value)
+        }
+    }
+    
+    const unpackByte = (tag, value) => {
+        if (tag === TAGS.NIBBLE_8) {
+            return unpackNibble(value)
+        }
+        else if (tag === TAGS.HEX_8) {
+            return unpackHex(value)
+        }
+        else {
+            throw new Error('unknown tag: ' + tag)
+        }
+    }
+    
+    const readPacked8 = (tag) => {
+        const startByte = readByte()
+        let value = ''
+        for (let i = 0; i < (startByte & 127); i++) {
+            const curByte = readByte()
+            value += String.fromCharCode(unpackByte(tag, (curByte & 0xf0) >> 4))
+            value += String.fromCharCode(unpackByte(tag, curByte & 0x0f))
+        }
+        if (startByte >> 7 !== 0) {
+            value = value.slice(0, -1)
+        }
+        return value
+    }
+    
+    const isListTag = (tag) => {
+        return tag === TAGS.LIST_EMPTY || tag === TAGS.LIST_8 || tag === TAGS.LIST_16
+    }
+    
+    const readListSize = (tag) => {
+        switch (tag) {
+            case TAGS.LIST_EMPTY:
+                return 0
+            case TAGS.LIST_8:
+                return readByte()
+            case TAGS.LIST_16:
+                return readInt(2)
+            default:
+                throw new Error('invalid tag for list size: ' + tag)
+        }
+    }
+    
+    const readJidPair = () => {
+        const i = readString(readByte())
+        const j = readString(readByte())
+        if (j) {
+            return (i || '') + '@' + j
+        }
+        throw new Error('invalid jid pair: ' + i + ', ' + j)
+    }
+    
+    const readAdJid = () => {
+        const agent = readByte()
+        const device = readByte()
+        const user = readString(readByte())
+        return jid_utils_1.jidEncode(user, agent === 0 ? 's.whatsapp.net' : 'lid', device)
+    }
+    
+    const readString = (tag) => {
+        if (tag >= 1 && tag < SINGLE_BYTE_TOKENS.length) {
+            return SINGLE_BYTE_TOKENS[tag] || ''
+        }
+        switch (tag) {
+            case TAGS.DICTIONARY_0:
+            case TAGS.DICTIONARY_1:
+            case TAGS.DICTIONARY_2:
+            case TAGS.DICTIONARY_3:
+                return getTokenDouble(tag - TAGS.DICTIONARY_0, readByte())
+            case TAGS.LIST_EMPTY:
+                return ''
+            case TAGS.BINARY_8:
+                return readStringFromChars(readByte())
+            case TAGS.BINARY_20:
+                return readStringFromChars(readInt20())
+            case TAGS.BINARY_32:
+                return readStringFromChars(readInt(4))
+            case TAGS.JID_PAIR:
+                return readJidPair()
+            case TAGS.AD_JID:
+                return readAdJid()
+            case TAGS.HEX_8:
+            case TAGS.NIBBLE_8:
+                return readPacked8(tag)
+            default:
+                throw new Error('invalid string with tag: ' + tag)
+        }
+    }
+    
+    const readList = (tag) => {
+        const items = []
+        const size = readListSize(tag)
+        for (let i = 0; i < size; i++) {
+            items.push(decodeDecompressedBinaryNode(buffer, opts, indexRef))
+        }
+        return items
+    }
+    
+    const getTokenDouble = (index1, index2) => {
+        const dict = DOUBLE_BYTE_TOKENS[index1]
+        if (!dict) {
+            throw new Error(`Invalid double token dict (${index1})`)
+        }
+        const value = dict[index2]
+        if (typeof value === 'undefined') {
+            throw new Error(`Invalid double token (${index2})`)
+        }
+        return value
+    }
+    
+    const listSize = readListSize(readByte())
+    const header = readString(readByte())
+    
+    if (!listSize || !header.length) {
+        throw new Error('invalid node')
+    }
+    
+    const attrs = {}
+    
+    let data
+    
+    if (listSize === 0 || !header) {
+        throw new Error('invalid node')
+    }
+    
+    // read the attributes in
+    const attributesLength = (listSize - 1) >> 1
+    for (let i = 0; i < attributesLength; i++) {
+        const key = readString(readByte())
+        const value = readString(readByte())
+        attrs[key] = value
+    }
+    
+    if (listSize % 2 === 0) {
+        const tag = readByte()
+        if (isListTag(tag)) {
+            data = readList(tag)
+        }
+        else {
+            let decoded
+            switch (tag) {
+                case TAGS.BINARY_8:
+                    decoded = readBytes(readByte())
+                    break
+                case TAGS.BINARY_20:
+                    decoded = readBytes(readInt20())
+                    break
+                case TAGS.BINARY_32:
+                    decoded = readBytes(readInt(4))
+                    break
+                default:
+                    decoded = readString(tag)
+                    break
+            }
+            data = decoded
+        }
+    }
+    return {
+        tag: header,
+        attrs,
+        content: data
+    }
+}
+
+const decodeBinaryNode = async (buff) => {
+    const decompBuff = await decompressingIfRequired(buff)
+    return decodeDecompressedBinaryNode(decompBuff, constants)
+}
+
+const encodeBinaryNode = (node, opts = constants, buffer = [0]) => {
+    const encoded = encodeBinaryNodeInner(node, opts, buffer)
+    return Buffer.from(encoded)
+}
+
+const encodeBinaryNodeInner = ({ tag, attrs, content }, opts, buffer) => {
+    const { TAGS, TOKEN_MAP } = opts
+    const pushByte = (value) => buffer.push(value & 0xff)
+    const pushInt = (value, n, littleEndian = false) => {
+        for (let i = 0; i < n; i++) {
+            const curShift = littleEndian ? i : n - 1 - i
+            buffer.push((value >> (curShift * 8)) & 0xff)
+        }
+    }
+    
+    const pushBytes = (bytes) => {
+        for (const b of bytes) {
+            buffer.push(b)
+        }
+    }
+    
+    const pushInt16 = (value) => {
+        pushBytes([(value >> 8) & 0xff, value & 0xff])
+    }
+    
+    const pushInt20 = (value) => (pushBytes([(value >> 16) & 0x0f, (value >> 8) & 0xff, value & 0xff]))
+    const writeByteLength = (length) => {
+        if (length >= 4294967296) {
+            throw new Error('string too large to encode: ' + length)
+        }
+        if (length >= 1 << 20) {
+            pushByte(TAGS.BINARY_32)
+            pushInt(length, 4) // 32 bit integer
+        }
+        else if (length >= 256) {
+            pushByte(TAGS.BINARY_20)
+            pushInt20(length)
+        }
+        else {
+            pushByte(TAGS.BINARY_8)
+            pushByte(length)
+        }
+    }
+    
+    const writeStringRaw = (str) => {
+        const bytes = Buffer.from(str, 'utf-8')
+        writeByteLength(bytes.length)
+        pushBytes(bytes)
+    }
+    
+    const writeJid = ({ domainType, device, user, server }) => {
+        if (typeof device !== 'undefined') {
+            pushByte(TAGS.AD_JID)
+            pushByte(domainType || 0)
+            pushByte(device || 0)
+            writeString(user)
+        }
+        else {
+            pushByte(TAGS.JID_PAIR)
+            if (user.length) {
+                writeString(user)
+            }
+            else {
+                pushByte(TAGS.LIST_EMPTY)
+            }
+            writeString(server)
+        }
+    }
+    
+    const packNibble = (char) => {
+        switch (char) {
+            case '-':
+                return 10
+            case '.':
+                return 11
+            case '\0':
+                return 15
+            default:
+                if (char >= '0' && char <= '9') {
+                    return char.charCodeAt(0) - '0'.charCodeAt(0)
+                }
+                throw new Error(`invalid byte for nibble "${char}"`)
+        }
+    }
+    
+    const packHex = (char) => {
+        if (char >= '0' && char <= '9') {
+            return char.charCodeAt(0) - '0'.charCodeAt(0)
+        }
+        if (char >= 'A' && char <= 'F') {
+            return 10 + char.charCodeAt(0) - 'A'.charCodeAt(0)
+        }
+        if (char >= 'a' && char <= 'f') {
+            return 10 + char.charCodeAt(0) - 'a'.charCodeAt(0)
+        }
+        if (char === '\0') {
+            return 15
+        }
+        throw new Error(`Invalid hex char "${char}"`)
+    }
+    
+    const writePackedBytes = (str, type) => {
+        if (str.length > TAGS.PACKED_MAX) {
+            throw new Error('Too many bytes to pack')
+        }
+        pushByte(type === 'nibble' ? TAGS.NIBBLE_8 : TAGS.HEX_8)
+        let roundedLength = Math.ceil(str.length / 2.0)
+        if (str.length % 2 !== 0) {
+            roundedLength |= 128
+        }
+        pushByte(roundedLength)
+        const packFunction = type === 'nibble' ? packNibble : packHex
+        const packBytePair = (v1, v2) => {
+            const result = (packFunction(v1) << 4) | packFunction(v2)
+            return result
+        }
+        const strLengthHalf = Math.floor(str.length / 2)
+        for (let i = 0; i < strLengthHalf; i++) {
+            pushByte(packBytePair(str[2 * i], str[2 * i + 1]))
+        }
+        if (str.length % 2 !== 0) {
+            pushByte(packBytePair(str[str.length - 1], '\x00'))
+        }
+    }
+    
+    const isNibble = (str) => {
+        if (!str || str.length > TAGS.PACKED_MAX) {
+            return false
+        }
+        for (const char of str) {
+            const isInNibbleRange = char >= '0' && char <= '9'
+            if (!isInNibbleRange && char !== '-' && char !== '.') {
+                return false
+            }
+        }
+        return true
+    }
+    
+    const isHex = (str) => {
+        if (!str || str.length > TAGS.PACKED_MAX) {
+            return false
+        }
+        for (const char of str) {
+            const isInNibbleRange = char >= '0' && char <= '9'
+            if (!isInNibbleRange && !(char >= 'A' && char <= 'F')) {
+                return false
+            }
+        }
+        return true
+    }
+    
+    const writeString = (str) => {
+    	if (str === undefined || str === null) {
+            pushByte(TAGS.LIST_EMPTY)
+            return
+        }
+        const tokenIndex = TOKEN_MAP[str]
+        if (tokenIndex) {
+            if (typeof tokenIndex.dict === 'number') {
+                pushByte(TAGS.DICTIONARY_0 + tokenIndex.dict)
+            }
+            pushByte(tokenIndex.index)
+        }
+        else if (isNibble(str)) {
+            writePackedBytes(str, 'nibble')
+        }
+        else if (isHex(str)) {
+            writePackedBytes(str, 'hex')
+        }
+        else if (str) {
+            const decodedJid = (0, jid_utils_1.jidDecode)(str)
+            if (decodedJid) {
+                writeJid(decodedJid)
+            }
+            else {
+                writeStringRaw(str)
+            }
+        }
+    }
+    
+    const writeListStart = (listSize) => {
+        if (listSize === 0) {
+            pushByte(TAGS.LIST_EMPTY)
+        }
+        else if (listSize < 256) {
+            pushBytes([TAGS.LIST_8, listSize])
+        }
+        else {
+            pushByte(TAGS.LIST_16)
+            pushInt16(listSize)
+        }
+    }
+    
+    if (!tag) {
+        throw new Error('Invalid node: tag cannot be undefined')
+    }
+    
+    const validAttributes = Object.keys(attrs).filter(k => (typeof attrs[k] !== 'undefined' && attrs[k] !== null))
+    writeListStart(2 * validAttributes.length + 1 + (typeof content !== 'undefined' ? 1 : 0))
+    writeString(tag)
+    for (const key of validAttributes) {
+        if (typeof attrs[key] === 'string') {
+            writeString(key)
+            writeString(attrs[key])
+        }
+    }
+    if (typeof content === 'string') {
+        writeString(content)
+    }
+    else if (Buffer.isBuffer(content) || content instanceof Uint8Array) {
+        writeByteLength(content.length)
+        pushBytes(content)
+    }
+    else if (Array.isArray(content)) {
+    	const validContent = content.filter(item => item && (item.tag || Buffer.isBuffer(item) || item instanceof Uint8Array || typeof item === 'string'))
+        writeListStart(validContent.length)
+        for (const item of validContent) {
+            encodeBinaryNodeInner(item, opts, buffer)
+        }
+    }
+    else if (typeof content === 'undefined') {
+        // do nothing
+    }
+    else {
+        throw new Error(`invalid children for header "${tag}": ${content} (${typeof content})`)
+    }
+    return buffer
+}
+
+module.exports = { decompressingIfRequired, decodeDecompressedBinaryNode, decodeBinaryNode, encodeBinaryNode }
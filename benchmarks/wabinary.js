@@ -0,0 +1,192 @@
+// Microbenchmark and correctness check of the WABinary codec, the engine's
+// optimized one against the one Baileys ships (benchmarks/wabinary-reference.js).
+//
+// Stanzas come from --corpus (recorded with PYBAILEYS_CAPTURE_STANZAS, or
+// written by benchmarks/stanzas.js), or a seeded synthetic corpus.
+//
+//     node benchmarks/wabinary.js                     # frames/s and MB/s, both codecs
+//     node benchmarks/wabinary.js --check             # exit 1 unless both agree on every frame
+//     node benchmarks/wabinary.js --corpus stanzas.ndjson --json results.json
+//
+// --check compares, for every frame: the inflated bytes, the decoded node, the
+// bytes each codec encodes that node to, and decoding them again. It then does
+// the same for hand-written edge cases, and for every frame cut short and with
+// a byte flipped, where both codecs must fail with the same error or agree.
+const fs = require('fs');
+const { isDeepStrictEqual } = require('util');
+const { performance } = require('perf_hooks');
+const reference = require('./wabinary-reference');
+const { makeStanzas, readStanzas } = require('./stanzas');
+
+const WABINARY = '../src/pybaileys/engine/vendor/baileys-main/lib/WABinary';
+const constants = require(`${WABINARY}/constants`);
+const optimized = { ...require(`${WABINARY}/decode`), ...require(`${WABINARY}/encode`) };
+
+const CODECS = { reference, optimized };
+
+const arg = (name, fallback) => {
+    const i = process.argv.indexOf(`--${name}`);
+    return i === -1 ? fallback : process.argv[i + 1];
+};
+
+// mulberry32
+const makeRandom = (seed) => () => {
+    seed = (seed + 0x6D2B79F5) | 0;
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+
+// Nodes the corpus may not cover: every string encoding, list and length
+// boundaries, attributes the encoder skips, unicode
+const EDGE_CASES = [
+    { tag: 'iq', attrs: {} },
+    { tag: 'iq', attrs: { id: '', type: 'result' }, content: '' },
+    { tag: 'x', attrs: { n: '0', odd: '123', dash: '-1.5', hex: 'ABCDEF0', lower: 'abcdef', mixed: '12AB-' } },
+    { tag: 'x', attrs: { long: '1'.repeat(127), longer: '1'.repeat(128), hexlong: 'F'.repeat(127) } },
+    { tag: 'x', attrs: { a: 'user@s.whatsapp.net', b: '@s.whatsapp.net', c: 'user:3@s.whatsapp.net', d: '123:7@lid', e: 'a_1:2@s.whatsapp.net', f: 'x@', g: 'status@broadcast' } },
+    { tag: 'x', attrs: { a: 'u:1:2@s.whatsapp.net', b: 'u:@lid', c: 'u:0@lid', d: 'a_b_c@x', e: 'u:x@s.whatsapp.net', f: 'u@s:1', g: '@', h: 'a@b@c', i: 'u_:3@lid' } },
+    { tag: 'x', attrs: { number: 5, nil: null, none: undefined, yes: true, ok: 'ok' } },
+    { tag: 'x', attrs: {}, content: 'héllo wörld ✓ 🌸 \u0000 end' },
+    { tag: 'x', attrs: { s: 'a'.repeat(255), m: 'b'.repeat(256), l: 'c'.repeat(70000) } },
+    { tag: 'x', attrs: {}, content: Buffer.alloc(0) },
+    { tag: 'x', attrs: {}, content: Buffer.alloc(255, 1) },
+    { tag: 'x', attrs: {}, content: Buffer.alloc(256, 2) },
+    { tag: 'x', attrs: {}, content: new Uint8Array(1 << 20).fill(3) },
+    { tag: 'x', attrs: {}, content: [] },
+    { tag: 'x', attrs: {}, content: Array.from({ length: 300 }, (_, i) => ({ tag: 'item', attrs: { i: String(i) } })) },
+    { tag: 'x', attrs: {}, content: [null, undefined, { tag: 'keep', attrs: {} }, { attrs: {} }, false] },
+    { tag: 'message', attrs: { type: 'text', to: 'read-self', 'read-self': 'fbns' }, content: [{ tag: 'enc', attrs: { v: '2' }, content: Buffer.from('cipher') }] }
+];
+
+const outcome = (fn) => {
+    try {
+        return { value: fn() };
+    } catch (err) {
+        return { error: err.message };
+    }
+};
+
+const sameOutcome = (a, b) => (a.error || b.error ? a.error === b.error : isDeepStrictEqual(a.value, b.value));
+
+const check = async (stanzas, seed) => {
+    const random = makeRandom(seed);
+    const failures = [];
+    const fail = (what, i, detail) => {
+        if (failures.length < 20) console.log(`[!] ${what} #${i}${detail ? `: ${detail}` : ''}`);
+        failures.push(what);
+    };
+    const decode = (codec, bytes) => outcome(() => CODECS[codec].decodeDecompressedBinaryNode(bytes, constants));
+    const encode = (codec, node) => outcome(() => CODECS[codec].encodeBinaryNode(node));
+
+    const checkNode = (node, i, kind) => {
+        const ref = encode('reference', node);
+        const opt = encode('optimized', node);
+        if (!sameOutcome(ref, opt)) return fail(`${kind}: encoded bytes differ`, i, ref.error || opt.error);
+        if (opt.error) return;
+        const back = decode('optimized', opt.value.subarray(1));
+        if (!sameOutcome(decode('reference', ref.value.subarray(1)), back)) fail(`${kind}: re-decoded nodes differ`, i);
+    };
+
+    for (const [i, { frame }] of stanzas.entries()) {
+        const inflated = await optimized.decompressingIfRequired(frame);
+        if (!inflated.equals(await reference.decompressingIfRequired(frame))) fail('inflated bytes differ', i);
+        const ref = decode('reference', inflated);
+        const opt = decode('optimized', inflated);
+        if (!sameOutcome(ref, opt)) fail('decoded nodes differ', i, ref.error || opt.error);
+        else if (!ref.error) checkNode(ref.value, i, 'corpus');
+
+        // cut short, and with one byte changed
+        const cut = inflated.subarray(0, Math.floor(random() * inflated.length));
+        if (!sameOutcome(decode('reference', cut), decode('optimized', cut))) fail('truncated frame decodes differently', i);
+        const flipped = Buffer.from(inflated);
+        flipped[Math.floor(random() * flipped.length)] = Math.floor(random() * 256);
+        if (!sameOutcome(decode('reference', flipped), decode('optimized', flipped))) fail('corrupted frame decodes differently', i);
+    }
+    for (const [i, node] of EDGE_CASES.entries()) checkNode(node, i, 'edge case');
+    return failures;
+};
+
+// Runs fn over all items until at least `ms` passed, returns items per second
+const measure = (fn, items, ms) => {
+    const deadline = performance.now() + ms;
+    let rounds = 0;
+    const start = performance.now();
+    do {
+        for (const item of items) fn(item);
+        rounds++;
+    } while (performance.now() < deadline);
+    return (rounds * items.length) / ((performance.now() - start) / 1000);
+};
+
+const measureAsync = async (fn, items, ms) => {
+    const deadline = performance.now() + ms;
+    let rounds = 0;
+    const start = performance.now();
+    do {
+        for (const item of items) await fn(item);
+        rounds++;
+    } while (performance.now() < deadline);
+    return (rounds * items.length) / ((performance.now() - start) / 1000);
+};
+
+const bench = async (stanzas, ms) => {
+    const frames = stanzas.map(({ frame }) => frame);
+    const inflated = await Promise.all(frames.map((frame) => reference.decompressingIfRequired(frame)));
+    const nodes = inflated.map((bytes) => reference.decodeDecompressedBinaryNode(bytes, constants));
+    const encodedBytes = nodes.reduce((sum, node) => sum + reference.encodeBinaryNode(node).length, 0);
+    const inflatedBytes = inflated.reduce((sum, bytes) => sum + bytes.length, 0);
+    const frameBytes = frames.reduce((sum, frame) => sum + frame.length, 0);
+
+    const cases = {
+        decode: { bytes: inflatedBytes / inflated.length, run: (codec, time = ms) => measure((bytes) => codec.decodeDecompressedBinaryNode(bytes, constants), inflated, time) },
+        encode: { bytes: encodedBytes / nodes.length, run: (codec, time = ms) => measure((node) => codec.encodeBinaryNode(node), nodes, time) },
+        // decodeBinaryNode, what every received frame goes through: inflate and decode
+        frame: { bytes: frameBytes / frames.length, run: (codec, time = ms) => measureAsync((frame) => codec.decodeBinaryNode(frame), frames, time) }
+    };
+
+    const results = {};
+    for (const [name, { bytes, run }] of Object.entries(cases)) {
+        // warm both up first
+        for (const codec of Object.values(CODECS)) await run(codec, ms / 4);
+        const perSecond = {};
+        for (const [codecName, codec] of Object.entries(CODECS)) perSecond[codecName] = await run(codec);
+        results[name] = {
+            reference_per_s: Math.round(perSecond.reference),
+            optimized_per_s: Math.round(perSecond.optimized),
+            optimized_mb_s: Math.round((perSecond.optimized * bytes) / 1e5) / 10,
+            speedup: Math.round((perSecond.optimized / perSecond.reference) * 100) / 100
+        };
+    }
+    return results;
+};
+
+const main = async () => {
+    const corpus = arg('corpus');
+    const seed = Number(arg('seed', 1));
+    const stanzas = corpus ? readStanzas(corpus) : makeStanzas({ frames: Number(arg('frames', 5000)), seed });
+    const compressed = stanzas.filter(({ frame }) => frame[0] & 2).length;
+    console.log(`${stanzas.length} frames from ${corpus || `a synthetic corpus (seed ${seed})`}, ${compressed} compressed`);
+
+    if (process.argv.includes('--check')) {
+        const failures = await check(stanzas, seed);
+        console.log(failures.length
+            ? `${failures.length} mismatches`
+            : `Both codecs agree on ${stanzas.length} frames, their corruptions and ${EDGE_CASES.length} edge cases`);
+        return failures.length ? 1 : 0;
+    }
+
+    const results = await bench(stanzas, Number(arg('ms', 2000)));
+    console.log(`${''.padEnd(8)}${'reference/s'.padStart(14)}${'optimized/s'.padStart(14)}${'MB/s'.padStart(10)}${'speedup'.padStart(10)}`);
+    for (const [name, r] of Object.entries(results)) {
+        console.log(`${name.padEnd(8)}${r.reference_per_s.toLocaleString().padStart(14)}${r.optimized_per_s.toLocaleString().padStart(14)}`
+            + `${String(r.optimized_mb_s).padStart(10)}${`${r.speedup}x`.padStart(10)}`);
+    }
+    if (arg('json')) fs.writeFileSync(arg('json'), JSON.stringify({ frames: stanzas.length, corpus: corpus || null, results }, null, 2));
+    return 0;
+};
+
+main().then((code) => process.exit(code), (err) => {
+    console.error(err);
+    process.exit(1);
+});
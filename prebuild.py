@@ -37,6 +37,15 @@ def pre_build():
     shutil.rmtree(os.path.join(VENDOR_DIR, 'node_modules'))
     run_command(['npm', 'install', '--production'], cwd=VENDOR_DIR)
 
+    # 5. Warm the V8 compile cache (Node 22.1+), so the engine skips parsing and
+    # compiling the Baileys module graph on its first start
+    print("5. Warming the engine compile cache...")
+    cache_dir = os.path.join(ENGINE_DIR, 'compile-cache')
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+    env = dict(os.environ, PYBAILEYS_WARM_COMPILE_CACHE='1', PYBAILEYS_COMPILE_CACHE=cache_dir)
+    subprocess.check_call(['node', 'bridge.js'], cwd=ENGINE_DIR, env=env, shell=(os.name == 'nt'))
+
     print("\n[SUCCESS] Assets pre-built! You can now run 'python -m build'")
 
 if __name__ == "__main__":
@@ -1 +1,6 @@
-from .client import BaileysClient
\ No newline at end of file
+from .client import BaileysClient
+from .aio import AsyncBaileysClient
+from .sessions import BaileysEngine, BaileysSession
+from .pool import EnginePool
+from .dispatch import EventDispatcher
+from .media import MediaFile
\ No newline at end of file
@@ -0,0 +1,327 @@
+import asyncio
+import contextlib
+import os
+import threading
+import uuid
+from .client import BaileysClient, BaileysError
+from .media import copy_out, temp_path
+from .transport import AsyncFramedConnection
+
+
+class _AsyncBatchCollector:
+    def __init__(self, loop, size, idle_timeout):
+        self.loop = loop
+        self.results = [None] * size
+        self.remaining = size
+        self.idle_timeout = idle_timeout
+        self.future = loop.create_future()
+        self.timer = loop.call_later(idle_timeout, self.fail, TimeoutError("Bridge batch timed out"))
+
+    def add(self, index, value):
+        self.results[index] = value
+        self.remaining -= 1
+        # The timeout restarts with every streamed item
+        self.timer.cancel()
+        if self.remaining == 0:
+            if not self.future.done():
+                self.future.set_result(self.results)
+        else:
+            self.timer = self.loop.call_later(self.idle_timeout, self.fail, TimeoutError("Bridge batch timed out"))
+
+    def finish(self, result):
+        pass
+
+    def fail(self, error):
+        self.timer.cancel()
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class _AsyncChunkStream:
+    _END = object()
+
+    def __init__(self):
+        self.chunks = asyncio.Queue()
+        self.done = False
+
+    def add(self, chunk):
+        self.chunks.put_nowait(chunk)
+
+    def finish(self, result):
+        self.chunks.put_nowait(self._END)
+
+    def fail(self, error):
+        self.chunks.put_nowait(error)
+
+    async def get(self, timeout):
+        try:
+            item = await asyncio.wait_for(self.chunks.get(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("Bridge stream timed out")
+        if item is self._END:
+            self.done = True
+            return None
+        if isinstance(item, Exception):
+            self.done = True
+            raise item
+        return item
+
+
+class AsyncBaileysClient(BaileysClient):
+    """asyncio flavour of BaileysClient.
+
+    Proxied calls return futures resolved by request id instead of blocking a
+    thread, so one event loop can keep thousands of RPCs in flight. Listeners
+    may be coroutines (run as tasks) or plain functions (run in the loop's
+    default executor). Calls made from other threads return a
+    concurrent.futures.Future instead.
+    """
+
+    def __init__(self, framing='json', transport='ws', metrics=False):
+        super().__init__(framing=framing, transport=transport, metrics=metrics)
+        self.loop = None
+        self._loop_thread = None
+        self._outbox = None
+        self._tasks = set()
+
+    async def start(self, auth_path="baileys_auth_info", **kwargs):
+        if self.transport == 'ws':
+            try:
+                import websockets
+            except ImportError:
+                raise RuntimeError("AsyncBaileysClient needs the 'websockets' package: pip install pybaileys[async]")
+
+        self._configure(auth_path, kwargs)
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+
+        # Spawning Node and waiting for the port is blocking, keep it off the loop
+        await self.loop.run_in_executor(None, self._start_engine)
+
+        connect_start = self.loop.time()
+        if self.transport == 'stdio':
+            print("[*] Connecting over the engine's stdin/stdout")
+            connect = AsyncFramedConnection.over_pipes(self.process.stdout, self.process.stdin)
+        elif self.transport == 'unix':
+            print(f"[*] Connecting to {self.socket_path}")
+            connect = AsyncFramedConnection.open_unix(self.socket_path)
+        else:
+            print(f"[*] Connecting to 127.0.0.1:{self.port}")
+            connect = websockets.connect(f"ws://127.0.0.1:{self.port}", max_size=None)
+        try:
+            self.ws = await asyncio.wait_for(connect, timeout=10)
+        except asyncio.TimeoutError:
+            raise TimeoutError("WS Connection timed out")
+        self.startup_timings['connect'] = round((self.loop.time() - connect_start) * 1000)
+        self.connected_event.set()
+
+        self._outbox = asyncio.Queue()
+        self._connection_lost.clear()
+        self._spawn(self._ws_writer())
+        self._spawn(self._ws_reader())
+
+        offer = self._framing_offer()
+        if offer:
+            self._binary = (await self._call_rpc('HELLO', {'formats': offer})) == 'msgpack'
+
+        # Listeners registered before start() could not subscribe yet
+        for event_name in self.event_listeners:
+            self._call_rpc('SUBSCRIBE', {'event': event_name}, wait=False)
+        for sub_id, (spec, _) in self._sub_listeners.items():
+            self._call_rpc('SUBSCRIBE', dict(spec, sub=sub_id), wait=False)
+
+        await self._call_rpc('INIT', self._init_payload())
+
+    def _spawn(self, coro):
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _ws_writer(self):
+        while True:
+            frame = await self._outbox.get()
+            await self.ws.send(frame)
+
+    async def _ws_reader(self):
+        try:
+            async for message in self.ws:
+                self._on_ws_message(self.ws, message)
+        except Exception as e:
+            print(f"[WS Error]: {e}")
+        finally:
+            self._connection_lost.set()
+            # Fails calls waiting for a response or for dispatch, sends,
+            # batches and downloads
+            self._fail_pending(BaileysError("Engine connection closed"))
+            self._dispatch_waiters.clear()
+
+    def _resolve(self, req_id, result):
+        if self._resolve_collector(req_id, result):
+            return
+        future = self._response_waiters.pop(req_id, None)
+        if future is None or future.done():
+            return
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    def _expire(self, req_id):
+        future = self._response_waiters.pop(req_id, None)
+        if future is not None and not future.done():
+            future.set_exception(TimeoutError("Bridge request timed out"))
+
+    def _start_timer(self, req_id, future, timeout):
+        timer = self.loop.call_later(timeout or self.rpc_timeout, self._expire, req_id)
+        future.add_done_callback(lambda _: self._forget(req_id, timer))
+
+    def _dispatched(self, req_id):
+        start = self._dispatch_waiters.pop(req_id, None)
+        if start is not None:
+            start()
+
+    def _forget(self, req_id, timer):
+        timer.cancel()
+        self._response_waiters.pop(req_id, None)
+
+    def _dispatch_event(self, name, payload, sub=None):
+        for callback in self._listeners(name, sub):
+            if asyncio.iscoroutinefunction(callback):
+                self._spawn(self._run_listener(callback, payload))
+            else:
+                self.loop.run_in_executor(None, callback, payload)
+
+    def _run_hook(self, hook_id, name, args):
+        if asyncio.iscoroutinefunction(self.hooks[name]):
+            self._spawn(self._answer_hook_async(hook_id, name, args))
+        else:
+            self.loop.run_in_executor(None, self._answer_hook, hook_id, name, args)
+
+    async def _answer_hook_async(self, hook_id, name, args):
+        try:
+            payload = {'hook': hook_id, 'result': await self.hooks[name](*args)}
+        except Exception as e:
+            payload = {'hook': hook_id, 'error': f"{name}: {e}"}
+        self._call_rpc('HOOK_RESULT', payload, wait=False)
+
+    async def _run_listener(self, callback, payload):
+        try:
+            await callback(payload)
+        except Exception as e:
+            print(f"Error in listener {callback.__name__}: {e}")
+
+    def _call_rpc(self, cmd, payload, wait=True, timeout=None, queued=False):
+        if self._outbox is None:
+            if wait:
+                raise BaileysError("Client not started")
+            # start() replays subscriptions once connected
+            return None
+        if threading.get_ident() != self._loop_thread:
+            return asyncio.run_coroutine_threadsafe(self._call_rpc_async(cmd, payload, wait, timeout, queued), self.loop)
+
+        req_id = payload.get('id') or str(uuid.uuid4())
+        payload['id'] = req_id
+        payload['cmd'] = cmd
+
+        future = None
+        if wait:
+            future = self.loop.create_future()
+            self._response_waiters[req_id] = future
+            if queued:
+                # The timeout of a queued send starts once the engine dispatches it
+                self._dispatch_waiters[req_id] = lambda: self._start_timer(req_id, future, timeout)
+                future.add_done_callback(lambda _: self._dispatch_waiters.pop(req_id, None))
+            else:
+                self._start_timer(req_id, future, timeout)
+
+        # Registered after the connection closed, nothing else would fail it
+        if self._connection_lost.is_set() and (wait or req_id in self._collectors):
+            self._resolve(req_id, BaileysError("Engine connection closed"))
+            return future
+
+        self._outbox.put_nowait(self._encode_frame(payload))
+        return future
+
+    async def metrics(self):
+        snapshot = self._metrics_snapshot()
+        snapshot['engine'] = await self._call_rpc('METRICS', {})
+        return snapshot
+
+    def send(self, jid, content, options=None, priority='normal'):
+        future = super().send(jid, content, options, priority)
+        if threading.get_ident() == self._loop_thread:
+            return asyncio.wrap_future(future, loop=self.loop)
+        return future
+
+    def batch(self, calls, concurrency=16):
+        if threading.get_ident() != self._loop_thread:
+            return asyncio.run_coroutine_threadsafe(self._batch_async(calls, concurrency), self.loop)
+        calls = [{'method': call[0], 'args': list(call[1:])} for call in calls]
+        if not calls:
+            future = self.loop.create_future()
+            future.set_result([])
+            return future
+        req_id = str(uuid.uuid4())
+        collector = _AsyncBatchCollector(self.loop, len(calls), self.rpc_timeout)
+        self._collectors[req_id] = collector
+        collector.future.add_done_callback(lambda _: self._collectors.pop(req_id, None))
+        self._call_rpc('BATCH', {'id': req_id, 'calls': calls, 'concurrency': concurrency}, wait=False)
+        return collector.future
+
+    async def _batch_async(self, calls, concurrency):
+        return await self.batch(calls, concurrency)
+
+    async def _call_rpc_async(self, cmd, payload, wait, timeout=None, queued=False):
+        future = self._call_rpc(cmd, payload, wait, timeout, queued)
+        return await future if future is not None else None
+
+    async def download_media_to(self, message, target, start=None, end=None):
+        if isinstance(target, (str, os.PathLike)):
+            return (await self._download(message, os.path.abspath(target), start, end))['size']
+        path = temp_path()
+        try:
+            size = (await self._download(message, path, start, end))['size']
+            await self.loop.run_in_executor(None, copy_out, path, target)
+            return size
+        finally:
+            os.remove(path)
+
+    async def download_media(self, message, chunk_size=64 * 1024, start=None, end=None, window=8):
+        req_id = str(uuid.uuid4())
+        stream = _AsyncChunkStream()
+        self._collectors[req_id] = stream
+        payload = {'id': req_id, 'message': message, 'chunk_size': chunk_size, 'start': start, 'end': end, 'window': window}
+        try:
+            self._call_rpc('STREAM', payload, wait=False)
+            while True:
+                chunk = await stream.get(self.rpc_timeout)
+                if chunk is None:
+                    return
+                yield chunk
+                self._call_rpc('STREAM_ACK', {'stream': req_id}, wait=False)
+        finally:
+            del self._collectors[req_id]
+            if not stream.done:
+                self._call_rpc('STREAM_CANCEL', {'stream': req_id}, wait=False)
+
+    @contextlib.asynccontextmanager
+    async def buffer(self):
+        """``async with client.buffer():`` -- see :meth:`BaileysClient.buffer`."""
+        await self._call_rpc('BUFFER', {})
+        try:
+            yield self
+        finally:
+            await self._call_rpc('FLUSH', {})
+
+    async def stop(self):
+        if self.ws is not None:
+            try:
+                await self._call_rpc('SHUTDOWN', {}, timeout=10)
+            except Exception as e:
+                print(f"[!] Engine shutdown failed: {e}")
+        for task in list(self._tasks):
+            task.cancel()
+        if self.ws is not None:
+            await self.ws.close()
+        await asyncio.get_running_loop().run_in_executor(None, self._teardown)
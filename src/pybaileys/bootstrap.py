@@ -24,8 +24,8 @@ def install_node_if_needed():
     print("[PyBaileys] System Node.js not found. Installing portable version...")
     try:
         import nodeenv
-        # Install Node 18
-        nodeenv.create_environment(env_dir=NODE_ENV_DIR, node_ver="18.16.0", quiet=False)
+        # node:sqlite (auth_backend='sqlite', message_store) is unflagged from 22.13
+        nodeenv.create_environment(env_dir=NODE_ENV_DIR, node_ver="22.13.0", quiet=False)
     except Exception as e:
         raise RuntimeError(f"Failed to install Node.js: {e}\nPlease install Node.js manually.")
 
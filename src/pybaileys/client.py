@@ -1,31 +1,173 @@
 import subprocess
+import contextlib
 import os
 import json
+import base64
 import time
 import threading
+import queue
+import socket
+import shutil
+import tempfile
+import io
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 import websocket
 import sys
 from . import bootstrap
+from .dispatch import EventDispatcher
+from .media import MediaFile, copy_out, decode_blob, temp_path
+from .store import MessageStore
+from .groups import GroupCache
+from .transport import TRANSPORTS, FramedConnection
+from .metrics import ClientMetrics, prometheus_text, serve
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 sys.stdout.reconfigure(line_buffering=True)
 
 class BaileysError(Exception):
     pass
 
-class BaileysClient:
+class _BatchCollector:
+    def __init__(self, size):
+        self.results = [None] * size
+        self.remaining = size
+        self.error = None
+        self.cond = threading.Condition()
+
+    def add(self, index, value):
+        with self.cond:
+            self.results[index] = value
+            self.remaining -= 1
+            self.cond.notify()
+
+    def finish(self, result):
+        pass
+
+    def fail(self, error):
+        with self.cond:
+            self.error = error
+            self.cond.notify()
+
+    def wait(self, idle_timeout):
+        with self.cond:
+            while self.remaining > 0 and self.error is None:
+                # The timeout restarts with every streamed item
+                if not self.cond.wait(timeout=idle_timeout):
+                    raise TimeoutError("Bridge batch timed out")
+            if self.error is not None:
+                raise self.error
+            return self.results
+
+class _ChunkStream:
+    _END = object()
+
     def __init__(self):
+        self.chunks = queue.Queue()
+        self.done = False
+
+    def add(self, chunk):
+        self.chunks.put(chunk)
+
+    def finish(self, result):
+        self.chunks.put(self._END)
+
+    def fail(self, error):
+        self.chunks.put(error)
+
+    def get(self, timeout):
+        try:
+            item = self.chunks.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("Bridge stream timed out")
+        if item is self._END:
+            self.done = True
+            return None
+        if isinstance(item, Exception):
+            self.done = True
+            raise item
+        return item
+
+class _SendFuture(Future):
+    """Resolved by the RESPONSE / ERROR of a queued SEND, however long it waits."""
+
+    def add(self, *item):
+        pass
+
+    def finish(self, result):
+        self.set_result(result)
+
+    def fail(self, error):
+        if not self.done():
+            self.set_exception(error)
+
+AUTH_BACKENDS = ('files', 'sqlite')
+
+# Lanes of the engine's send queue, most urgent first
+SEND_PRIORITIES = ('high', 'normal', 'bulk')
+
+# Predicates bridge.js understands in a SUBSCRIBE filter
+FILTER_KEYS = ('jid', 'from_me', 'type', 'text_prefix')
+
+# start() options that are Python callables bridged into the socket config
+HOOK_OPTIONS = {
+    'get_message': 'getMessage',
+    'cached_group_metadata': 'cachedGroupMetadata',
+}
+
+class BaileysClient:
+    rpc_timeout = 30
+    startup_timeout = 30
+    media_timeout = 300
+
+    def __init__(self, dispatcher=None, framing='json', transport='ws', metrics=False):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport '{transport}', expected one of {TRANSPORTS}")
+        if transport == 'unix' and not hasattr(socket, 'AF_UNIX'):
+            raise ValueError("The 'unix' transport is not available on this platform")
         self.process = None
         self.ws = None
         self.connected_event = threading.Event()
+        # Set when the engine connection's reader stops
+        self._connection_lost = threading.Event()
         self.responses = {} 
         self.event_listeners = {} 
+        self._sub_listeners = {}
         self._response_waiters = {}
+        # Queued sendMessage calls, released when the engine dispatches them
+        self._dispatch_waiters = {}
+        self._collectors = {}
         self.utils = self._UtilsProxy(self)
+        self.store = MessageStore(self)
+        self.groups = GroupCache()
         self.port = None
         self.auth_path = None 
         self.socket_config = {}
+        self.auth_backend = 'files'
+        self.hooks = {}
+        self.hook_cache = {}
+        self.key_cache = {}
+        self.send_queue = None
+        self.message_store = None
+        self.history = None
+        self._history_sink = None
+        self._hook_pool = None
+        # Threads the hook pool has started, counted as they start
+        self._hook_threads = []
         self.node_executable = None
+        self.dispatcher = dispatcher or EventDispatcher()
+        self.framing = framing
+        self.transport = transport
+        self.socket_path = None
+        self._binary = False
+        self._metrics = ClientMetrics() if metrics else None
+        self._metrics_server = None
+        self.session_id = None
+        self.startup_timings = {}
 
     class _UtilsProxy:
         def __init__(self, client):
@@ -36,18 +178,14 @@ class BaileysClient:
             return method_proxy
 
     def _reader_thread(self, pipe, prefix):
+        pipe = io.TextIOWrapper(pipe, encoding='utf-8', errors='replace')
         for line in iter(pipe.readline, ''):
             clean_line = line.strip()
             if clean_line:
                 print(f"[{prefix}] {clean_line}")
-                if prefix == "NODE" and "PORT:" in clean_line:
-                    self.port = clean_line.split(":")[1]
         pipe.close()
 
-    def start(self, auth_path="baileys_auth_info", **kwargs):
-        self.auth_path = os.path.abspath(auth_path)
-        self.socket_config = kwargs
-        
+    def _start_engine(self):
         # 1. Get Node Executable (Modules are already installed!)
         self.node_executable = bootstrap.setup()
         
@@ -64,51 +202,276 @@ class BaileysClient:
         if not os.path.exists(os.path.join(cwd_path, 'node_modules')):
             raise RuntimeError("Corrupt installation: node_modules missing in package.")
 
+        # The engine connects back to this socket once it listens, with its port and timings
+        ready = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        ready.bind(('127.0.0.1', 0))
+        ready.listen(1)
+        env = dict(os.environ, PYBAILEYS_READY_PORT=str(ready.getsockname()[1]),
+                   PYBAILEYS_TRANSPORT=self.transport)
+        if self._metrics is not None:
+            env['PYBAILEYS_METRICS'] = '1'
+        if self.transport == 'unix':
+            self.socket_path = os.path.join(tempfile.mkdtemp(prefix='pybaileys-'), 'engine.sock')
+            env['PYBAILEYS_SOCKET'] = self.socket_path
+
+        start_time = time.monotonic()
         self.process = subprocess.Popen(
             [self.node_executable, script_path],
+            # With the stdio transport stdin/stdout carry frames and logs go to stderr
+            stdin=subprocess.PIPE if self.transport == 'stdio' else None,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
             cwd=cwd_path,
-            bufsize=1,
-            universal_newlines=True
+            env=env,
+            bufsize=0,
         )
+        spawned = time.monotonic()
 
-        t_out = threading.Thread(target=self._reader_thread, args=(self.process.stdout, "NODE"))
-        t_out.daemon = True
-        t_out.start()
+        if self.transport != 'stdio':
+            t_out = threading.Thread(target=self._reader_thread, args=(self.process.stdout, "NODE"))
+            t_out.daemon = True
+            t_out.start()
 
         t_err = threading.Thread(target=self._reader_thread, args=(self.process.stderr, "NODE_ERR"))
         t_err.daemon = True
         t_err.start()
 
-        print("[*] Waiting for Port...")
-        
-        start_time = time.time()
-        while self.port is None:
-            if time.time() - start_time > 30:
+        print("[*] Waiting for Engine...")
+        try:
+            report = self._await_ready(ready, start_time)
+        finally:
+            ready.close()
+        self.port = report.get('port')
+        self.startup_timings = dict(
+            report.get('timings', {}),
+            spawn=round((spawned - start_time) * 1000),
+            ready=round((time.monotonic() - start_time) * 1000),
+        )
+        print(f"[*] Engine ready in {self.startup_timings['ready']} ms "
+              f"(compile cache: {report.get('compile_cache')})")
+
+    def _await_ready(self, ready, start_time):
+        # Short accept timeouts, so a crashed engine is noticed without waiting it out
+        ready.settimeout(0.5)
+        while True:
+            if time.monotonic() - start_time > self.startup_timeout:
                 raise TimeoutError("Timed out waiting for Node.js engine.")
             if self.process.poll() is not None:
                 raise RuntimeError("Node process died unexpectedly.")
-            time.sleep(0.1)
+            try:
+                conn, _ = ready.accept()
+            except socket.timeout:
+                continue
+            with conn:
+                conn.settimeout(5)
+                line = conn.makefile('r').readline()
+            if not line:
+                raise RuntimeError("Node.js engine closed the readiness handshake.")
+            return json.loads(line)
 
-        print(f"[*] Connecting to 127.0.0.1:{self.port}")
+    def _configure(self, auth_path, options):
+        self.auth_path = os.path.abspath(auth_path)
+        self.auth_backend = options.pop('auth_backend', 'files')
+        if self.auth_backend not in AUTH_BACKENDS:
+            raise ValueError(f"Unknown auth_backend '{self.auth_backend}', expected one of {AUTH_BACKENDS}")
+        self.hooks = {}
+        for option, name in HOOK_OPTIONS.items():
+            callback = options.pop(option, None)
+            if callback is not None:
+                self.hooks[name] = callback
+        if self._history_sink is not None:
+            self.hooks['historySink'] = self._history_sink
+        self.hook_cache = {
+            'size': options.pop('hook_cache_size', 1000),
+            'ttl': options.pop('hook_cache_ttl', 300),
+        }
+        key_cache = options.pop('key_cache', True)
+        if key_cache is True:
+            key_cache = {}
+        elif not key_cache:
+            key_cache = None
+        self.key_cache = key_cache
+        send_queue = options.pop('send_queue', True)
+        if send_queue is True:
+            send_queue = {}
+        elif not send_queue:
+            send_queue = None
+        self.send_queue = send_queue
+        group_cache = options.pop('group_cache', True)
+        if isinstance(group_cache, (str, os.PathLike)):
+            group_cache = {'snapshot': os.path.abspath(group_cache)}
+        elif group_cache:
+            group_cache = {'snapshot': None}
+        else:
+            group_cache = None
+        self.group_cache = group_cache
+        media_cache = options.pop('media_cache', False)
+        if media_cache:
+            if isinstance(media_cache, (str, os.PathLike)):
+                media_cache = {'path': media_cache}
+            elif media_cache is True:
+                media_cache = {}
+            media_cache = {
+                'path': os.path.abspath(media_cache.get('path') or os.path.join(self.auth_path, 'media-cache')),
+                'max_bytes': media_cache.get('max_bytes', 64 * 1024 * 1024),
+                'ttl': media_cache.get('ttl', 14 * 24 * 3600),
+            }
+        else:
+            media_cache = None
+        self.media_cache = media_cache
+        link_previews = options.pop('link_previews', True)
+        if link_previews:
+            link_previews = {
+                'size': 1000,
+                'ttl': 3600,
+                'failure_ttl': 300,
+                **(link_previews if isinstance(link_previews, dict) else {}),
+            }
+        self.link_previews = link_previews or None
+        thumbnails = options.pop('thumbnails', True)
+        if thumbnails:
+            thumbnails = {
+                'workers': 2,
+                'size': 500,
+                **(thumbnails if isinstance(thumbnails, dict) else {}),
+            }
+        self.thumbnails = thumbnails or None
+        message_store = options.pop('message_store', False)
+        if message_store is True:
+            message_store = os.path.join(self.auth_path, 'store.db')
+        self.message_store = os.path.abspath(message_store) if message_store else None
+        self.socket_config = options
 
-        self.ws = websocket.WebSocketApp(
-            f"ws://127.0.0.1:{self.port}",
-            on_message=self._on_ws_message,
-            on_open=self._on_ws_open,
-            on_error=self._on_ws_error
-        )
-        
-        t = threading.Thread(target=self.ws.run_forever)
+    def _init_payload(self):
+        return {
+            'auth_path': self.auth_path,
+            'auth_backend': self.auth_backend,
+            'config': self.socket_config,
+            'hooks': list(self.hooks),
+            'hook_cache': self.hook_cache,
+            'key_cache': self.key_cache,
+            'send_queue': self.send_queue,
+            'group_cache': self.group_cache,
+            'media_cache': self.media_cache,
+            'link_previews': self.link_previews,
+            'thumbnails': self.thumbnails,
+            'message_store': self.message_store,
+            'history': self.history,
+        }
+
+    def start(self, auth_path="baileys_auth_info", **kwargs):
+        """Boots the engine and connects. ``kwargs`` go to the Baileys socket config, except:
+
+        auth_backend -- 'files' (one JSON file per key, the default) or 'sqlite'
+            (a single WAL-mode database in auth_path, needs Node.js 22.13+; an
+            existing files folder is imported on first use).
+        get_message / cached_group_metadata -- Python callables used as Baileys'
+            getMessage(key) and cachedGroupMetadata(jid); their results are cached
+            in the engine (hook_cache_size entries for hook_cache_ttl seconds).
+        key_cache -- signal keys are cached in memory and written back in batches
+            (True, the default). Pass a dict like {'size': 10000, 'flush_ms': 1000}
+            to tune it, or False to hit the auth store on every read and write.
+            Pending writes are flushed by stop().
+        send_queue -- sendMessage calls are queued in the engine (True, the
+            default): per chat in order and prioritized by lane (see send()),
+            at most 8 at a time. They are not paced unless a rate is given in a
+            dict like {'rate': 20, 'burst': 20, 'jid_rate': 1, 'jid_burst': 5,
+            'concurrency': 8} (messages per second, globally and per chat).
+            rpc_timeout counts from when a message leaves the queue. Pass False
+            to call sock.sendMessage directly.
+        group_cache -- group metadata is cached in the engine (True, the
+            default): warmed with one query when the connection opens, patched
+            from group events and used for group sends instead of a
+            groupMetadata() query each time. client.groups mirrors it locally.
+            Pass a file path to also snapshot it there for warm restarts, or
+            False to disable it.
+        media_cache -- True (or a folder, auth_path/media-cache by default)
+            reuses uploads: media sent again, whether bytes, a file, a
+            MediaFile or a URL, is matched by content hash (URL for remote
+            media) and not encrypted and uploaded again. Uploads are kept
+            until WhatsApp's URL for them expires (at most 'ttl' seconds) and
+            the least recently used go past 'max_bytes'; tune both with a dict
+            like {'path': ..., 'max_bytes': 64 << 20, 'ttl': 14 * 86400}.
+            Hit rates are in engine_stats()['media_cache'].
+        link_previews -- link previews are cached by URL (True, the default):
+            a link sent again reuses its preview instead of fetching the page
+            (up to 3 s) once per message, and queued messages fetch theirs
+            while they wait. Tune it with a dict like {'size': 1000, 'ttl':
+            3600, 'failure_ttl': 300} (seconds; failed fetches are retried
+            after 'failure_ttl'), or pass False to let Baileys fetch each time.
+        thumbnails -- image and video thumbnails are made by a pool of worker
+            threads instead of on the engine's event loop, and cached by
+            content hash (True, the default). Tune it with a dict like
+            {'workers': 2, 'size': 500}; the pool serves every session of the
+            engine and the first session that starts it sizes it.
+        message_store -- True (or a database path) keeps chats, contacts and
+            messages in SQLite, queryable through client.store. It also answers
+            getMessage, before the get_message hook is asked. Needs Node.js 22.13+.
+        """
+        self._configure(auth_path, kwargs)
+        # Clients handed out by an EnginePool are connected already
+        if not self.connected_event.is_set():
+            self._connect()
+        self._send_init()
+
+    def _connect(self):
+        self._start_engine()
+
+        connect_start = time.monotonic()
+        if self.transport == 'ws':
+            print(f"[*] Connecting to 127.0.0.1:{self.port}")
+
+            self.ws = websocket.WebSocketApp(
+                f"ws://127.0.0.1:{self.port}",
+                on_message=self._on_ws_message,
+                on_open=self._on_ws_open,
+                on_error=self._on_ws_error
+            )
+        else:
+            self.ws = self._open_framed()
+            self.connected_event.set()
+        self._connection_lost.clear()
+        t = threading.Thread(target=self._read_connection)
         t.daemon = True
         t.start()
-        
+
         if not self.connected_event.wait(timeout=10):
             raise TimeoutError("WS Connection timed out")
-            
-        self._send_init()
+        self.startup_timings['connect'] = round((time.monotonic() - connect_start) * 1000)
+
+        offer = self._framing_offer()
+        if offer:
+            self._binary = self._call_rpc('HELLO', {'formats': offer}) == 'msgpack'
+
+    def _open_framed(self):
+        if self.transport == 'stdio':
+            print("[*] Connecting over the engine's stdin/stdout")
+            return FramedConnection.over_pipes(self.process.stdout, self.process.stdin, self._on_ws_message)
+        print(f"[*] Connecting to {self.socket_path}")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(10)
+        sock.connect(self.socket_path)
+        sock.settimeout(None)
+        return FramedConnection.over_socket(sock, self._on_ws_message)
+
+    def _read_connection(self):
+        try:
+            self.ws.run_forever()
+        finally:
+            self._connection_lost.set()
+            self.connected_event.clear()
+            self._fail_pending(BaileysError("Engine connection closed"))
+
+    def _engine_lost(self):
+        return self._connection_lost.is_set() or (self.process is not None and self.process.poll() is not None)
+
+    def _fail_pending(self, error):
+        # Nothing will answer what is still in flight; failing a response
+        # waiter also releases its dispatch waiter
+        for req_id in list(self._response_waiters):
+            self._resolve(req_id, error)
+        for collector in list(self._collectors.values()):
+            collector.fail(error)
 
     def _on_ws_open(self, ws):
         self.connected_event.set()
@@ -116,58 +479,190 @@ class BaileysClient:
     def _on_ws_error(self, ws, error):
         print(f"[WS Error]: {error}")
 
+    def _framing_offer(self):
+        if self.framing != 'msgpack':
+            return None
+        if msgpack is None:
+            print("[*] msgpack is not installed, falling back to JSON framing")
+            return None
+        return ['msgpack', 'json']
+
+    def _encode_value(self, value):
+        if isinstance(value, MediaFile):
+            return value.to_wire()
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            # JSON only; revived into a Buffer by the bridge
+            return {'type': 'Buffer', 'data': base64.b64encode(value).decode()}
+        raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+    def _encode_frame(self, payload):
+        started = time.perf_counter() if self._metrics is not None else None
+        if self._binary:
+            frame = msgpack.packb(payload, use_bin_type=True, default=self._encode_value)
+        else:
+            frame = json.dumps(payload, default=self._encode_value)
+        if started is not None:
+            self._metrics.sent(payload, frame, started)
+        return frame
+
+    def _decode_frame(self, message):
+        if isinstance(message, bytes):
+            return msgpack.unpackb(message, raw=False)
+        return json.loads(message)
+
+    def _send_frame(self, payload):
+        frame = self._encode_frame(payload)
+        if isinstance(frame, bytes):
+            self.ws.send(frame, opcode=websocket.ABNF.OPCODE_BINARY)
+        else:
+            self.ws.send(frame)
+
     def _on_ws_message(self, ws, message):
         try:
-            data = json.loads(message)
+            data = self._decode_frame(message)
             msg_type = data.get('type')
+            if self._metrics is not None:
+                self._metrics.received(data, len(message))
 
             if msg_type == 'RESPONSE':
-                req_id = data['id']
-                self.responses[req_id] = data['result']
-                if req_id in self._response_waiters:
-                    self._response_waiters[req_id].set()
+                self._resolve(data['id'], data.get('result'))
+
+            elif msg_type == 'DISPATCHED':
+                self._dispatched(data['id'])
+
+            elif msg_type == 'BATCH_ITEM':
+                value = BaileysError(data['error']) if 'error' in data else data.get('result')
+                self._collect(data['id'], data['index'], value)
+
+            elif msg_type == 'CHUNK':
+                self._collect(data['id'], decode_blob(data['data']))
 
             elif msg_type == 'ERROR':
                 req_id = data.get('id')
                 err_msg = data.get('error', 'Unknown Error')
                 if req_id:
-                    self.responses[req_id] = BaileysError(err_msg)
-                    if req_id in self._response_waiters:
-                        self._response_waiters[req_id].set()
+                    self._resolve(req_id, BaileysError(err_msg))
                 else:
                     print(f"[Engine Error]: {err_msg}")
 
             elif msg_type == 'EVENT':
-                name = data['name']
-                payload = data['data']
-                if name in self.event_listeners:
-                    for callback in self.event_listeners[name]:
-                        threading.Thread(target=callback, args=(payload,)).start()
+                target = self._session_client(data.get('session'))
+                if target is not None:
+                    target._dispatch_event(data['name'], data['data'], data.get('sub'))
+
+            elif msg_type == 'GROUPS':
+                target = self._session_client(data.get('session'))
+                if target is not None:
+                    target.groups._apply(data['groups'], data.get('reset', False))
+
+            elif msg_type == 'HOOK':
+                target = self._session_client(data.get('session'))
+                if target is not None:
+                    target._run_hook(data['id'], data['name'], data.get('args') or [])
 
         except Exception as e:
             print(f"Error parsing message: {e}")
 
+    def _session_client(self, session):
+        # A standalone client owns the engine's only session
+        return self
+
+    def _resolve_collector(self, req_id, result):
+        # Batches and streams get their items as separate frames, the final
+        # RESPONSE / ERROR only closes them
+        collector = self._collectors.get(req_id)
+        if collector is None:
+            return False
+        if isinstance(result, Exception):
+            collector.fail(result)
+        else:
+            collector.finish(result)
+        return True
+
+    def _dispatched(self, req_id):
+        waiter = self._dispatch_waiters.pop(req_id, None)
+        if waiter is not None:
+            waiter.set()
+
+    def _resolve(self, req_id, result):
+        if self._resolve_collector(req_id, result):
+            return
+        self._dispatched(req_id)
+        self.responses[req_id] = result
+        if req_id in self._response_waiters:
+            self._response_waiters[req_id].set()
+
+    def _collect(self, req_id, *item):
+        collector = self._collectors.get(req_id)
+        if collector is not None:
+            collector.add(*item)
+
+    def _listeners(self, name, sub):
+        if sub is not None:
+            listener = self._sub_listeners.get(sub)
+            return [listener[1]] if listener else []
+        return self.event_listeners.get(name, [])
+
+    def _dispatch_event(self, name, payload, sub=None):
+        for callback in self._listeners(name, sub):
+            self.dispatcher.submit(name, callback, payload)
+
     def _send_init(self):
-        payload = {'auth_path': self.auth_path, 'config': self.socket_config}
-        self._call_rpc('INIT', payload, wait=False)
+        self._call_rpc('INIT', self._init_payload(), wait=False)
 
-    def _call_rpc(self, cmd, payload, wait=True):
-        req_id = str(uuid.uuid4())
+    def _hook_executor(self):
+        if self._hook_pool is None:
+            self._hook_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='pybaileys-hook',
+                                                 initializer=self._hook_thread_started)
+        return self._hook_pool
+
+    def _hook_thread_started(self):
+        self._hook_threads.append(threading.current_thread().name)
+
+    def _run_hook(self, hook_id, name, args):
+        # Hooks may call back into the client, keep them off the reader thread
+        self._hook_executor().submit(self._answer_hook, hook_id, name, args)
+
+    def _answer_hook(self, hook_id, name, args):
+        try:
+            payload = {'hook': hook_id, 'result': self.hooks[name](*args)}
+        except Exception as e:
+            payload = {'hook': hook_id, 'error': f"{name}: {e}"}
+        self._call_rpc('HOOK_RESULT', payload, wait=False)
+
+    def _call_rpc(self, cmd, payload, wait=True, timeout=None, queued=False):
+        req_id = payload.get('id') or str(uuid.uuid4())
         payload['id'] = req_id
         payload['cmd'] = cmd
         
         if wait:
             waiter = threading.Event()
             self._response_waiters[req_id] = waiter
+            if queued:
+                dispatched = threading.Event()
+                self._dispatch_waiters[req_id] = dispatched
         
         try:
-            self.ws.send(json.dumps(payload))
+            self._send_frame(payload)
         except Exception as e:
-            if wait: del self._response_waiters[req_id]
+            if wait:
+                del self._response_waiters[req_id]
+                self._dispatch_waiters.pop(req_id, None)
             raise e
         
+        # Registered after the connection closed, nothing else would fail it
+        if self._connection_lost.is_set() and (wait or req_id in self._collectors):
+            self._resolve(req_id, BaileysError("Engine connection closed"))
+
         if wait:
-            sent = waiter.wait(timeout=30)
+            if queued:
+                # However long it waits in the send queue, the timeout only
+                # starts once the engine dispatches it; until then only the
+                # engine going away ends the wait
+                while not dispatched.wait(timeout=1):
+                    if self._engine_lost():
+                        self._fail_pending(BaileysError("Engine connection closed"))
+            sent = waiter.wait(timeout=timeout or self.rpc_timeout)
             del self._response_waiters[req_id]
             if not sent:
                 raise TimeoutError("Bridge request timed out")
@@ -179,10 +674,132 @@ class BaileysClient:
 
     def __getattr__(self, name):
         def method_proxy(*args):
-            return self._call_rpc('CALL', {'method': name, 'args': args})
+            queued = name == 'sendMessage' and self.send_queue is not None
+            return self._call_rpc('CALL', {'method': name, 'args': args}, queued=queued)
         return method_proxy
 
-    def on(self, event_name):
+    def send(self, jid, content, options=None, priority='normal'):
+        """Queues a message and returns a concurrent.futures.Future of the sent WAMessage.
+
+        ``priority`` is the send queue lane: 'high' for interactive replies,
+        'normal' (what sendMessage uses) or 'bulk' (what batch() / map() sends
+        use). Messages to one chat are always sent in the order they were queued.
+        """
+        if priority not in SEND_PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {SEND_PRIORITIES}")
+        req_id = str(uuid.uuid4())
+        future = _SendFuture()
+        self._collectors[req_id] = future
+        future.add_done_callback(lambda _: self._collectors.pop(req_id, None))
+        payload = {'id': req_id, 'jid': jid, 'content': content, 'options': options, 'priority': priority}
+        try:
+            self._call_rpc('SEND', payload, wait=False)
+        except Exception as e:
+            future.fail(e)
+        return future
+
+    def prewarm(self, jids, batch_size=500):
+        """Fetches device lists and signal sessions for ``jids`` ahead of a broadcast.
+
+        Without it every first message to a user waits for a device query and a
+        pre-key fetch; here they run once per ``batch_size`` users. Returns
+        ``{'warmed': [jid, ...], 'failed': {jid: reason}, 'devices': count}``;
+        users without devices (not on WhatsApp) are reported as failed.
+        """
+        jids = list(jids)
+        timeout = self.rpc_timeout * (1 + len(jids) // batch_size)
+        return self._call_rpc('PREWARM', {'jids': jids, 'batch_size': batch_size}, timeout=timeout)
+
+    def batch(self, calls, concurrency=16):
+        """Runs many socket calls in one BATCH frame.
+
+        ``calls`` is an iterable of ``(method, *args)`` tuples. Results come back
+        in call order; a call that failed holds its BaileysError instead.
+        sendMessage calls go through the send queue's 'bulk' lane.
+        """
+        calls = [{'method': call[0], 'args': list(call[1:])} for call in calls]
+        if not calls:
+            return []
+        req_id = str(uuid.uuid4())
+        collector = _BatchCollector(len(calls))
+        self._collectors[req_id] = collector
+        try:
+            self._call_rpc('BATCH', {'id': req_id, 'calls': calls, 'concurrency': concurrency}, wait=False)
+            return collector.wait(self.rpc_timeout)
+        finally:
+            del self._collectors[req_id]
+
+    def map(self, method, targets, *args, concurrency=16):
+        """``client.map('sendMessage', jids, content)`` calls ``method(target, *args)`` for every target."""
+        return self.batch([(method, target, *args) for target in targets], concurrency=concurrency)
+
+    def download_media_to(self, message, target, start=None, end=None):
+        """Downloads a media message without passing its bytes through the RPC frame.
+
+        With a path as ``target`` Node streams the decrypted media straight into
+        that file; with a binary file object it goes through a temp file and is
+        copied over in chunks. ``start``/``end`` select a byte range. Returns the
+        number of bytes written.
+        """
+        if isinstance(target, (str, os.PathLike)):
+            return self._download(message, os.path.abspath(target), start, end)['size']
+        path = temp_path()
+        try:
+            size = self._download(message, path, start, end)['size']
+            copy_out(path, target)
+            return size
+        finally:
+            os.remove(path)
+
+    def download_media(self, message, chunk_size=64 * 1024, start=None, end=None, window=8):
+        """Iterates over the decrypted bytes of a media message in ``chunk_size`` pieces.
+
+        The engine keeps at most ``window`` unconsumed chunks in flight, so neither
+        process holds the whole file. ``start``/``end`` select a byte range.
+        """
+        req_id = str(uuid.uuid4())
+        stream = _ChunkStream()
+        self._collectors[req_id] = stream
+        payload = {'id': req_id, 'message': message, 'chunk_size': chunk_size, 'start': start, 'end': end, 'window': window}
+        try:
+            self._call_rpc('STREAM', payload, wait=False)
+            while True:
+                chunk = stream.get(self.rpc_timeout)
+                if chunk is None:
+                    return
+                yield chunk
+                self._call_rpc('STREAM_ACK', {'stream': req_id}, wait=False)
+        finally:
+            del self._collectors[req_id]
+            if not stream.done:
+                self._call_rpc('STREAM_CANCEL', {'stream': req_id}, wait=False)
+
+    def _download(self, message, path, start, end):
+        payload = {'message': message, 'path': path, 'start': start, 'end': end}
+        return self._call_rpc('DOWNLOAD', payload, timeout=self.media_timeout)
+
+    def on(self, event_name, filter=None, fields=None, batch=None):
+        """Registers a listener for a Baileys event.
+
+        ``filter`` and ``fields`` are applied inside the engine, before the event
+        is sent over:
+
+            @client.on('messages.upsert', filter={'jid': '*@g.us', 'from_me': False,
+                                                  'type': 'text', 'text_prefix': '!'},
+                       fields=['key', 'message.conversation', 'message.extendedTextMessage.text'])
+
+        filter -- any of jid (glob or list of globs), from_me, type (message
+            content type(s), 'text' for plain and extended text) and text_prefix.
+            Events with a message list are filtered per message and skipped
+            when none match.
+        fields -- dotted paths to keep of every message / item.
+        batch -- True or {'window_ms': 50, 'max_items': 1000}: payloads are
+            collected for window_ms (or until max_items messages / items are
+            pending) and the listener gets them as one list.
+        """
+        if filter is not None or fields is not None or batch:
+            return self._on_subscription(event_name, filter, fields, batch)
+
         def decorator(func):
             if event_name not in self.event_listeners:
                 self.event_listeners[event_name] = []
@@ -191,6 +808,123 @@ class BaileysClient:
             return func
         return decorator
 
+    def _on_subscription(self, event_name, filter, fields, batch):
+        unknown = set(filter or ()) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown filter keys {sorted(unknown)}, expected some of {FILTER_KEYS}")
+        spec = {
+            'event': event_name,
+            'filter': filter,
+            'fields': list(fields) if fields is not None else None,
+            'batch': ({} if batch is True else batch) or None,
+        }
+
+        def decorator(func):
+            # Each filtered / batched listener is its own subscription
+            sub_id = str(uuid.uuid4())
+            self._sub_listeners[sub_id] = (spec, func)
+            self._call_rpc('SUBSCRIBE', dict(spec, sub=sub_id), wait=False)
+            return func
+        return decorator
+
+    def on_history(self, sink, chunk_size=500):
+        """Streams history sync into ``sink`` chunk by chunk, instead of one huge
+        messaging-history.set event per sync. Call before start().
+
+        sink -- a callable (or an object with write()) taking
+            {'chats', 'contacts', 'messages', 'syncType', 'progress'}; the next
+            chunk is sent once it returns. A path is written by the engine itself:
+            SQLite for .db / .sqlite files, NDJSON lines otherwise.
+        chunk_size -- messages per chunk (whole conversations are kept together).
+
+        Progress arrives as 'history.progress' events with running chats /
+        contacts / messages / chunks totals and done=True at the end of a sync.
+        """
+        if isinstance(sink, (str, os.PathLike)):
+            self.history = {'chunk_size': chunk_size, 'path': os.path.abspath(sink)}
+            self._history_sink = None
+        else:
+            self.history = {'chunk_size': chunk_size, 'python': True}
+            self._history_sink = getattr(sink, 'write', sink)
+
+    @contextlib.contextmanager
+    def buffer(self):
+        """Holds bufferable Baileys events while the block runs and releases them
+        coalesced (sock.ev.buffer / flush), e.g. around bulk sends or fetches."""
+        self._call_rpc('BUFFER', {})
+        try:
+            yield self
+        finally:
+            self._call_rpc('FLUSH', {})
+
+    def engine_stats(self):
+        """Counters from the engine: {'key_cache': {...} or None, 'hook_cache': {...},
+        'send_queue': {'queued', 'lanes', 'in_flight', 'chats', 'sent', 'failed', 'avg_wait_ms'} or None,
+        'group_cache': {'size', 'hits', 'misses', 'fetches'} or None,
+        'media_cache': {'entries', 'bytes', 'hits', 'misses', 'hit_rate', 'uploads', 'joined', 'evictions', 'expired'} or None,
+        'link_previews': {'size', 'hits', 'misses', 'fetched', 'failed', 'joined', 'fetching'} or None,
+        'thumbnails': {'workers', 'busy', 'queued', 'done', 'failed', 'size', 'hits', 'misses', 'joined', 'making'} or None}."""
+        return self._call_rpc('STATS', {})
+
+    def metrics(self):
+        """Request latencies, event and frame counts, and queue depths; needs ``metrics=True``.
+
+        ``rpc`` maps each method (or command) to its count, errors and latency
+        histograms per phase: 'total', 'serialize' (encoding in Python),
+        'node' (the engine's own work), 'whatsapp' (inside the socket call,
+        including any send queue wait) and 'ipc' (the rest: transport and
+        decoding). ``engine`` holds the engine's frame counts, event loop
+        delay and memory.
+        """
+        snapshot = self._metrics_snapshot()
+        snapshot['engine'] = self._call_rpc('METRICS', {})
+        return snapshot
+
+    def _metrics_snapshot(self):
+        if self._metrics is None:
+            raise RuntimeError("Metrics are off, create the client with metrics=True")
+        snapshot = self._metrics.snapshot()
+        snapshot['pending_requests'] = len(self._response_waiters)
+        snapshot['dispatcher'] = self.dispatcher.stats()
+        snapshot['hook_threads'] = len(self._hook_threads)
+        return snapshot
+
+    def serve_metrics(self, port=9464, host='127.0.0.1'):
+        """Serves ``metrics()`` as Prometheus text at http://host:port/ until stop(); returns the server."""
+        def render():
+            snapshot = self._metrics_snapshot()
+            engine = self._call_rpc('METRICS', {}, timeout=5)
+            # AsyncBaileysClient hands calls from other threads a Future
+            snapshot['engine'] = engine.result(timeout=5) if isinstance(engine, Future) else engine
+            return prometheus_text(snapshot)
+
+        self._metrics_snapshot()
+        self._metrics_server = serve(render, host, port)
+        return self._metrics_server
+
     def stop(self):
+        # SHUTDOWN flushes cached keys and creds before node exits on its own
+        if self.connected_event.is_set():
+            try:
+                self._call_rpc('SHUTDOWN', {}, timeout=10)
+            except Exception as e:
+                print(f"[!] Engine shutdown failed: {e}")
+            self.ws.close()
+            self.connected_event.clear()
+        self._teardown()
+
+    def _teardown(self):
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+            self._metrics_server = None
+        self.dispatcher.shutdown()
+        if self._hook_pool is not None:
+            self._hook_pool.shutdown(wait=False)
         if self.process:
-            self.process.terminate()
\ No newline at end of file
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.terminate()
+        if self.socket_path:
+            shutil.rmtree(os.path.dirname(self.socket_path), ignore_errors=True)
+            self.socket_path = None
\ No newline at end of file
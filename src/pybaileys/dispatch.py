@@ -0,0 +1,197 @@
+import threading
+from collections import deque
+
+POLICIES = ('block', 'drop_oldest', 'coalesce')
+
+# Never dropped or merged: losing one loses a QR code, a close/reconnect or credentials
+LIFECYCLE_EVENTS = frozenset(('connection.update', 'creds.update'))
+
+
+def chat_key(payload):
+    """Best-effort remoteJid of an event payload, used for per-chat ordering."""
+    if isinstance(payload, dict):
+        messages = payload.get('messages')
+        if messages:
+            payload = messages
+        else:
+            return payload.get('remoteJid') or payload.get('id') or payload.get('jid')
+    if isinstance(payload, list) and payload and isinstance(payload[0], dict):
+        first = payload[0]
+        return first.get('key', {}).get('remoteJid') or first.get('id')
+    return None
+
+
+def merge_payloads(old, new):
+    """Folds a newer event payload into a pending one: lists are concatenated, anything else is replaced."""
+    if isinstance(old, list) and isinstance(new, list):
+        return old + new
+    if isinstance(old, dict) and isinstance(new, dict):
+        merged = dict(old)
+        for k, v in new.items():
+            if isinstance(v, list) and isinstance(merged.get(k), list):
+                merged[k] = merged[k] + v
+            else:
+                merged[k] = v
+        return merged
+    return new
+
+
+class _Job:
+    __slots__ = ('name', 'callback', 'payload', 'key')
+
+    def __init__(self, name, callback, payload, key):
+        self.name = name
+        self.callback = callback
+        self.payload = payload
+        self.key = key
+
+
+class _BoundedQueue:
+    def __init__(self, maxsize, policy):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = deque()
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+
+    def put(self, job):
+        """Queues ``job``; returns True when an event had to be dropped for it."""
+        with self.lock:
+            while self._full() and self.policy == 'block':
+                self.not_full.wait()
+            if not self._full():
+                self._append(job)
+                return False
+            if self.policy == 'coalesce' and self._coalesce(job):
+                return False
+            # Nothing to merge into: drop the oldest job. Lifecycle events are
+            # never dropped, the queue goes over its size for them instead
+            oldest = next((i for i, pending in enumerate(self.items) if pending.name not in LIFECYCLE_EVENTS), None)
+            if oldest is None and job.name in LIFECYCLE_EVENTS:
+                self._append(job)
+                return False
+            self.dropped += 1
+            if oldest is not None:
+                del self.items[oldest]
+                self._append(job)
+            return True
+
+    def _full(self):
+        return len(self.items) >= self.maxsize and not self.closed
+
+    def _append(self, job):
+        self.items.append(job)
+        self.not_empty.notify()
+
+    def _coalesce(self, job):
+        if job.name in LIFECYCLE_EVENTS:
+            return False
+        for pending in reversed(self.items):
+            if pending.name == job.name and pending.callback is job.callback and pending.key == job.key:
+                pending.payload = merge_payloads(pending.payload, job.payload)
+                self.coalesced += 1
+                return True
+        return False
+
+    def get(self):
+        with self.lock:
+            while not self.items:
+                if self.closed:
+                    return None
+                self.not_empty.wait()
+            job = self.items.popleft()
+            self.not_full.notify()
+            return job
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+
+
+class EventDispatcher:
+    """Runs event listeners on a fixed pool of worker threads.
+
+    Jobs wait in a bounded queue; when it is full ``policy`` decides what happens:
+    'drop_oldest' (the default) discards the oldest pending job, 'coalesce'
+    merges the event into a pending one for the same listener and chat, and
+    'block' stalls the websocket reader until a worker frees a slot. As RPC
+    responses come through that reader too, 'block' deadlocks when listeners
+    make calls of their own (sendMessage, ...) while the queue is full.
+
+    connection.update and creds.update are never dropped or merged, the queue
+    goes over its size for them instead. The first dropped event prints a
+    warning; ``stats()`` counts them.
+
+    With ``per_chat_ordering`` every chat (remoteJid) is pinned to one worker, so
+    its handlers run serially while different chats run in parallel.
+    """
+
+    def __init__(self, workers=8, queue_size=10000, policy='drop_oldest', per_chat_ordering=False):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy '{policy}', expected one of {POLICIES}")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.policy = policy
+        self.per_chat_ordering = per_chat_ordering
+        self._queues = []
+        self._threads = []
+        self._lock = threading.Lock()
+        self._warned_drop = False
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._threads:
+                return
+            shards = self.workers if self.per_chat_ordering else 1
+            self._queues = [_BoundedQueue(self.queue_size, self.policy) for _ in range(shards)]
+            for i in range(self.workers):
+                q = self._queues[i % shards]
+                t = threading.Thread(target=self._worker, args=(q,), name=f"pybaileys-dispatch-{i}")
+                t.daemon = True
+                t.start()
+                self._threads.append(t)
+
+    def _worker(self, q):
+        while True:
+            job = q.get()
+            if job is None:
+                return
+            try:
+                job.callback(job.payload)
+            except Exception as e:
+                print(f"Error in listener {getattr(job.callback, '__name__', job.callback)}: {e}")
+
+    def submit(self, name, callback, payload):
+        self._ensure_started()
+        key = chat_key(payload)
+        if self.per_chat_ordering:
+            q = self._queues[hash(key if key is not None else name) % len(self._queues)]
+        else:
+            q = self._queues[0]
+        if q.put(_Job(name, callback, payload, key)) and not self._warned_drop:
+            self._warned_drop = True
+            print(f"[!] Event queue full ({self.queue_size} pending), dropping the oldest events; "
+                  f"see dispatcher.stats() or raise workers / queue_size")
+
+    def stats(self):
+        return {
+            'workers': len(self._threads),
+            'pending': sum(len(q.items) for q in self._queues),
+            'dropped': sum(q.dropped for q in self._queues),
+            'coalesced': sum(q.coalesced for q in self._queues),
+        }
+
+    def shutdown(self, wait=False):
+        for q in self._queues:
+            q.close()
+        if wait:
+            for t in self._threads:
+                t.join()
+        self._queues = []
+        self._threads = []
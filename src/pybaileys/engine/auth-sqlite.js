@@ -0,0 +1,145 @@
+// Single-file SQLite auth state, a drop-in for Baileys' useMultiFileAuthState.
+// Uses the built-in node:sqlite module (Node.js 22.13+) in WAL mode. Keys are
+// stored under the same names useMultiFileAuthState gives its files, so an
+// existing auth folder is imported once without any guessing.
+const fs = require('fs');
+const path = require('path');
+const { BufferJSON, initAuthCreds, proto } = require('./vendor/baileys-main/lib/index');
+const { openDatabase, transaction } = require('./sqlite');
+
+const DB_FILE = 'auth.db';
+// SQLite's default limit on bound parameters is 999 on older builds
+const MAX_IN_PARAMS = 500;
+// Longest first, so 'sender-key-memory' wins over 'sender-key'
+const KEY_TYPES = [
+    'app-state-sync-version',
+    'app-state-sync-key',
+    'sender-key-memory',
+    'device-list',
+    'lid-mapping',
+    'sender-key',
+    'pre-key',
+    'session',
+    'tctoken'
+];
+
+const fixFileName = (file) => file?.replace(/\//g, '__')?.replace(/:/g, '-');
+
+const SCHEMA = `
+    CREATE TABLE IF NOT EXISTS keys (
+        type TEXT NOT NULL,
+        id TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (type, id)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS meta (
+        name TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+`;
+
+// One-time import of a useMultiFileAuthState folder
+const migrateFolder = (db, folder, logger) => {
+    if (db.prepare('SELECT 1 FROM meta WHERE name = ?').get('migrated')) return;
+
+    const insert = db.prepare('INSERT OR REPLACE INTO keys (type, id, value) VALUES (?, ?, ?)');
+    const setMeta = db.prepare('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)');
+    let imported = 0;
+
+    transaction(db, () => {
+        for (const file of fs.readdirSync(folder)) {
+            if (!file.endsWith('.json')) continue;
+            const raw = fs.readFileSync(path.join(folder, file), 'utf-8');
+            if (file === 'creds.json') {
+                setMeta.run('creds', raw);
+                imported++;
+                continue;
+            }
+            const type = KEY_TYPES.find((t) => file.startsWith(`${t}-`));
+            if (!type) {
+                logger?.warn({ file }, 'skipping unknown auth file during migration');
+                continue;
+            }
+            insert.run(type, file.slice(type.length + 1, -'.json'.length), raw);
+            imported++;
+        }
+        setMeta.run('migrated', String(imported));
+    });
+
+    if (imported) {
+        logger?.info({ imported }, 'migrated auth folder into SQLite, the old JSON files are no longer read');
+    }
+};
+
+const useSQLiteAuthState = async (folder, logger) => {
+    fs.mkdirSync(folder, { recursive: true });
+    const db = openDatabase(path.join(folder, DB_FILE), SCHEMA, "auth_backend 'sqlite'");
+    migrateFolder(db, folder, logger);
+
+    const upsert = db.prepare(
+        'INSERT INTO keys (type, id, value) VALUES (?, ?, ?) ON CONFLICT (type, id) DO UPDATE SET value = excluded.value'
+    );
+    const remove = db.prepare('DELETE FROM keys WHERE type = ? AND id = ?');
+    const setMeta = db.prepare('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)');
+    const selects = new Map();
+
+    const selectFor = (count) => {
+        let stmt = selects.get(count);
+        if (!stmt) {
+            const params = new Array(count).fill('?').join(', ');
+            stmt = db.prepare(`SELECT id, value FROM keys WHERE type = ? AND id IN (${params})`);
+            selects.set(count, stmt);
+        }
+        return stmt;
+    };
+
+    const credsRow = db.prepare('SELECT value FROM meta WHERE name = ?').get('creds');
+    const creds = credsRow ? JSON.parse(credsRow.value, BufferJSON.reviver) : initAuthCreds();
+
+    return {
+        state: {
+            creds,
+            keys: {
+                get: async (type, ids) => {
+                    const data = {};
+                    const byName = new Map(ids.map((id) => [fixFileName(id), id]));
+                    const names = [...byName.keys()];
+                    for (let i = 0; i < names.length; i += MAX_IN_PARAMS) {
+                        const chunk = names.slice(i, i + MAX_IN_PARAMS);
+                        for (const row of selectFor(chunk.length).all(type, ...chunk)) {
+                            let value = JSON.parse(row.value, BufferJSON.reviver);
+                            if (type === 'app-state-sync-key' && value) {
+                                value = proto.Message.AppStateSyncKeyData.fromObject(value);
+                            }
+                            data[byName.get(row.id)] = value;
+                        }
+                    }
+                    for (const id of ids) {
+                        if (!(id in data)) data[id] = null;
+                    }
+                    return data;
+                },
+                set: async (data) => {
+                    transaction(db, () => {
+                        for (const type in data) {
+                            for (const id in data[type]) {
+                                const value = data[type][id];
+                                if (value) upsert.run(type, fixFileName(id), JSON.stringify(value, BufferJSON.replacer));
+                                else remove.run(type, fixFileName(id));
+                            }
+                        }
+                    });
+                },
+                clear: async () => {
+                    db.exec('DELETE FROM keys');
+                }
+            }
+        },
+        saveCreds: async () => {
+            setMeta.run('creds', JSON.stringify(creds, BufferJSON.replacer));
+        },
+        close: () => db.close()
+    };
+};
+
+module.exports = { useSQLiteAuthState };
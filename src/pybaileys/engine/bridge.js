@@ -1,14 +1,162 @@
+// 'ws' (TCP WebSocket), 'unix' (framed, Unix domain socket / named pipe) or
+// 'stdio' (framed, over stdin / stdout). With stdio, stdout carries frames and
+// every log line goes to stderr.
+const TRANSPORT = process.env.PYBAILEYS_TRANSPORT || 'ws';
+if (TRANSPORT === 'stdio') console.log = console.error;
+
 console.log("Node process started...");
+const { performance } = require('perf_hooks');
 const path = require('path');
+const os = require('os');
+const net = require('net');
+const Module = require('module');
+
+// Startup phases in ms, reported to the client with the readiness handshake
+const startupTimings = { node_bootstrap: Math.round(performance.now()) };
+let phaseStart = performance.now();
+const phase = (name) => {
+    const now = performance.now();
+    startupTimings[name] = Math.round(now - phaseStart);
+    phaseStart = now;
+};
+
+// V8 code cache for the module graph below (Node 22.1+). prebuild.py fills the
+// packaged directory; when it isn't writable a per-user temp one is used. The
+// POSIX temp dir is shared, hence the uid in its name; on Windows it is per user.
+const enableCompileCache = () => {
+    if (!Module.enableCompileCache) return 'unsupported';
+    const { FAILED } = Module.constants.compileCacheStatus;
+    const tempDir = path.join(os.tmpdir(), process.getuid ? `pybaileys-compile-cache-${process.getuid()}` : 'pybaileys-compile-cache');
+    const dirs = [process.env.PYBAILEYS_COMPILE_CACHE || path.join(__dirname, 'compile-cache'), tempDir];
+    for (const dir of dirs) {
+        const { status } = Module.enableCompileCache(dir);
+        if (status !== FAILED) return dir;
+    }
+    return 'failed';
+};
+const compileCache = enableCompileCache();
+
+const fs = require('fs');
+const { pipeline } = require('stream/promises');
 const WebSocket = require('ws');
 const P = require('pino');
-const Baileys = require('./vendor/baileys-main/lib/index'); 
+phase('engine_modules');
+const Baileys = require('./vendor/baileys-main/lib/index');
+phase('baileys');
+const msgpack = require('./msgpack');
+const { LRUCache } = require('./cache');
+const { useSQLiteAuthState } = require('./auth-sqlite');
+const { makeWriteBehindKeyStore } = require('./key-cache');
+const { openMessageStore } = require('./message-store');
+const { makeEventTransform } = require('./event-filter');
+const { streamHistory, makeNdjsonSink } = require('./history-stream');
+const { makeSendScheduler } = require('./send-scheduler');
+const { prewarm } = require('./prewarm');
+const { makeGroupCache } = require('./group-cache');
+const { makeMediaCache } = require('./media-cache');
+const { makeLinkPreviews } = require('./link-previews');
+const { installThumbnails } = require('./thumbnails');
+const { FramedConnection } = require('./framed');
+const { makeMetrics } = require('./metrics');
+const { makeReplaySocket } = require('./replay-socket');
+phase('engine_features');
+
+// prebuild.py runs the engine once with this set, to fill the compile cache
+if (process.env.PYBAILEYS_WARM_COMPILE_CACHE) {
+    Module.flushCompileCache?.();
+    console.log(`Compile cache: ${compileCache}`);
+    process.exit(0);
+}
+
+// Sessions hosted by this engine, keyed by the id clients send as `session`.
+// A standalone BaileysClient never sends one and gets the default session.
+const DEFAULT_SESSION = 'default';
+const sessions = new Map();
+
+const getSession = (id = DEFAULT_SESSION) => {
+    let session = sessions.get(id);
+    if (!session) {
+        session = {
+            id,
+            sock: null,
+            auth: null,
+            keyStore: null,
+            store: null,
+            // Group metadata served as cachedGroupMetadata and mirrored to Python
+            groups: null,
+            // Uploaded media reused by content hash / URL, served as mediaCache
+            media: null,
+            // Link previews cached by URL, filled in before sendMessage
+            previews: null,
+            // Engine-wide thumbnail worker pool, when this session asked for it
+            thumbnails: null,
+            // Send queue of the current socket, sendMessage goes through it when enabled
+            sender: null,
+            // Batched subscriptions of the current socket, flushed when it stops
+            batchers: [],
+            bufferDepth: 0,
+            // Streaming history sync: chunk size, sinks, and the queue keeping syncs in order
+            history: null,
+            hookCache: new LRUCache(),
+            // Keyed by event name, or by subscription id for filtered ones
+            subscriptions: new Map(),
+            // Connection that owns the session, events and hooks go there
+            ws: null
+        };
+        sessions.set(id, session);
+    }
+    return session;
+};
+
+// Offline mode for benchmarks/replay.py: sockets replay this event capture
+// instead of connecting to WhatsApp
+const REPLAY = process.env.PYBAILEYS_REPLAY;
+
+// Appends every decrypted frame the WABinary codec reads or writes to `file`,
+// as {dir: 'in' | 'out', frame: base64} lines: the corpus of benchmarks/wabinary.js
+const captureStanzas = (file) => {
+    const out = fs.createWriteStream(file, { flags: 'a' });
+    const record = (dir, frame) => out.write(`${JSON.stringify({ dir, frame: Buffer.from(frame).toString('base64') })}\n`);
+    // Baileys calls both through these exports
+    const decoder = require('./vendor/baileys-main/lib/WABinary/decode');
+    const encoder = require('./vendor/baileys-main/lib/WABinary/encode');
+    const { decodeBinaryNode } = decoder;
+    const { encodeBinaryNode } = encoder;
+    decoder.decodeBinaryNode = (frame) => {
+        record('in', frame);
+        return decodeBinaryNode(frame);
+    };
+    encoder.encodeBinaryNode = (...args) => {
+        const frame = encodeBinaryNode(...args);
+        record('out', frame);
+        return frame;
+    };
+};
+if (process.env.PYBAILEYS_CAPTURE_STANZAS && !REPLAY) captureStanzas(process.env.PYBAILEYS_CAPTURE_STANZAS);
+
+// Set when the client asked for metrics, otherwise nothing is measured
+const metrics = process.env.PYBAILEYS_METRICS ? makeMetrics() : null;
+
+const timedCall = (id, fn) => (metrics ? metrics.timeCall(id, fn) : fn());
+
+const requireSock = (session) => {
+    if (!session.sock) throw new Error("Socket not initialized");
+    return session.sock;
+};
 
-const wss = new WebSocket.Server({ host: '0.0.0.0', port: 0 });
+// sendMessage goes through the session's send queue when it has one
+const invoke = (session, method, args, priority, onDispatch) => {
+    if (method === 'sendMessage' && session.sender) {
+        const [jid, ...rest] = args;
+        // Fetched while the message waits in the queue
+        session.previews?.prefetch(rest[0]);
+        return session.sender.enqueue(jid, rest, priority, onDispatch);
+    }
+    return requireSock(session)[method](...args);
+};
 
-let sock;
-let activeSocket = null;
-const subscriptions = new Set();
+// Flow control of running STREAM downloads, keyed by request id
+const streams = new Map();
 
 const jsonReplacer = (key, value) => {
     if (typeof value === 'bigint') return value.toString();
@@ -18,79 +166,648 @@ const jsonReplacer = (key, value) => {
     return value;
 };
 
-wss.on('connection', (ws) => {
-    activeSocket = ws;
+// Wire formats a client may negotiate with HELLO, JSON stays the default
+const FORMATS = ['msgpack', 'json'];
+
+const encodeFrame = (ws, frame) => (
+    ws.format === 'msgpack' ? msgpack.encode(frame) : JSON.stringify(frame, jsonReplacer)
+);
+
+// Media handed over through the filesystem by pybaileys.MediaFile. Baileys
+// streams {url: <local path>} with fs.createReadStream.
+let pendingTempFiles = [];
+
+const reviveBlob = (value) => {
+    if (value && typeof value.$file === 'string') {
+        if (value.cleanup) pendingTempFiles.push(value.$file);
+        return { url: value.$file };
+    }
+    return value;
+};
+
+const jsonReviver = (key, value) => reviveBlob(Baileys.BufferJSON.reviver(key, value));
+
+const decodeFrame = (message, isBinary) => (
+    isBinary ? msgpack.decode(message, reviveBlob) : JSON.parse(message, jsonReviver)
+);
+
+const takeTempFiles = () => {
+    const files = pendingTempFiles;
+    pendingTempFiles = [];
+    return files;
+};
+
+const downloadStream = (sock, request) => Baileys.downloadMediaMessage(
+    request.message,
+    'stream',
+    { startByte: request.start, endByte: request.end },
+    { logger: sock.logger, reuploadRequest: sock.updateMediaMessage }
+);
+
+const wakeStream = (flow) => {
+    if (flow.wake) {
+        const wake = flow.wake;
+        flow.wake = null;
+        wake();
+    }
+};
+
+const streamToFile = async (stream, filePath) => {
+    const out = fs.createWriteStream(filePath);
+    await pipeline(stream, out);
+    return out.bytesWritten;
+};
+
+const reply = (ws, frame) => {
+    if (!metrics) return ws.send(encodeFrame(ws, frame));
+    if (frame.type === 'RESPONSE' || frame.type === 'ERROR') frame.timing = metrics.finish(frame.id);
+    const data = encodeFrame(ws, frame);
+    // JSON frames are strings, count their UTF-8 bytes rather than characters
+    metrics.sent(frame, typeof data === 'string' ? Buffer.byteLength(data) : data.length);
+    return ws.send(data);
+};
+
+const sendEvent = (session, name, data, sub) => {
+    if (session.ws) reply(session.ws, { type: 'EVENT', session: session.id, sub, name, data });
+};
+
+// Collects payloads and emits them as one list after windowMs, or earlier once
+// maxItems messages / items are pending
+const makeBatcher = ({ window_ms: windowMs = 50, max_items: maxItems = 1000 } = {}, emit) => {
+    let pending = [];
+    let count = 0;
+    let timer = null;
+    const flush = () => {
+        clearTimeout(timer);
+        timer = null;
+        if (!pending.length) return;
+        const batch = pending;
+        pending = [];
+        count = 0;
+        emit(batch);
+    };
+    const push = (payload) => {
+        pending.push(payload);
+        count += Array.isArray(payload) ? payload.length : payload?.messages?.length || 1;
+        if (count >= maxItems) flush();
+        else if (!timer) timer = setTimeout(flush, windowMs);
+    };
+    return { push, flush };
+};
+
+const listen = (session, { event, sub, transform, batch }) => {
+    let send = (out) => sendEvent(session, event, out, sub);
+    if (batch) {
+        const batcher = makeBatcher(batch, send);
+        session.batchers.push(batcher);
+        send = batcher.push;
+    }
+    session.sock.ev.on(event, (data) => {
+        const out = transform ? transform(data) : data;
+        if (out !== undefined) send(out);
+    });
+};
+
+// Socket config callbacks implemented in Python (reverse RPC). Results are
+// cached per session so repeated lookups don't cross the process boundary.
+const HOOK_TIMEOUT_MS = 10000;
+const HOOK_KEYS = {
+    getMessage: (key) => `${key.remoteJid}:${key.id}`,
+    cachedGroupMetadata: (jid) => jid
+};
+// Python answers with plain JSON; a getMessage result must be a proto.Message
+// again, or its enums are encoded as 0 when the message is resent
+const HOOK_RESULTS = {
+    getMessage: (message) => Baileys.proto.Message.fromObject(message)
+};
+const hookWaiters = new Map();
+let hookSeq = 0;
+
+const callHook = (session, name, args, timeoutMs = HOOK_TIMEOUT_MS) => new Promise((resolve) => {
+    if (!session.ws) return resolve(undefined);
+    const id = `hook-${++hookSeq}`;
+    const timer = setTimeout(() => {
+        hookWaiters.delete(id);
+        resolve(undefined);
+    }, timeoutMs);
+    hookWaiters.set(id, (result) => {
+        clearTimeout(timer);
+        resolve(result);
+    });
+    reply(session.ws, { type: 'HOOK', session: session.id, id, name, args });
+});
+
+const makeHook = (session, name) => async (...args) => {
+    const cacheKey = `${name}:${HOOK_KEYS[name](...args)}`;
+    const cached = session.hookCache.get(cacheKey);
+    if (cached !== undefined) return cached;
+    let result = await callHook(session, name, args);
+    if (result === undefined || result === null) return undefined;
+    if (HOOK_RESULTS[name]) result = HOOK_RESULTS[name](result);
+    session.hookCache.set(cacheKey, result);
+    return result;
+};
+
+const invalidateGroup = (session, jid) => session.hookCache.delete(`cachedGroupMetadata:${jid}`);
+
+// The Python sink may write to a database, give it longer than a lookup hook
+const HISTORY_SINK_TIMEOUT_MS = 120000;
+
+const openHistory = (session, opts, logger) => {
+    const sinks = [];
+    const closers = [];
+    if (opts.python) {
+        sinks.push((chunk) => callHook(session, 'historySink', [chunk], HISTORY_SINK_TIMEOUT_MS));
+    }
+    if (opts.path && /\.(db|sqlite3?)$/.test(opts.path)) {
+        const store = openMessageStore(opts.path, logger);
+        sinks.push(async (chunk) => store.ingest(chunk));
+        closers.push(async () => store.close());
+    } else if (opts.path) {
+        const file = makeNdjsonSink(opts.path);
+        sinks.push(file.write);
+        closers.push(file.close);
+    }
+    return { chunkSize: opts.chunk_size || 500, sinks, closers, queue: Promise.resolve() };
+};
+
+const runHistory = async (session, notification, { sock, history, options, logger }) => {
+    const progress = (result, done) => sock.ev.emit('history.progress', { ...result, done });
+    const result = await streamHistory(notification, {
+        chunkSize: history.chunkSize,
+        options,
+        logger,
+        sink: async (chunk, totals) => {
+            session.store?.ingest(chunk);
+            await Promise.all(history.sinks.map((write) => write(chunk)));
+            progress({ syncType: chunk.syncType, progress: chunk.progress, ...totals }, false);
+        }
+    });
+    progress(result, true);
+};
+
+const sessionStats = (session) => ({
+    key_cache: session.keyStore ? session.keyStore.stats() : null,
+    send_queue: session.sender ? session.sender.stats() : null,
+    group_cache: session.groups ? session.groups.stats() : null,
+    media_cache: session.media ? session.media.stats() : null,
+    link_previews: session.previews ? session.previews.stats() : null,
+    thumbnails: session.thumbnails ? session.thumbnails.stats() : null,
+    hook_cache: session.hookCache.stats()
+});
+
+const startSession = async (session, request) => {
+    const authPath = request.auth_path || 'baileys_auth_info';
+    console.log(`[Node] Using Auth Path: ${authPath}`);
+
+    const logLevel = request.config.log_level || 'info';
+    const logger = TRANSPORT === 'stdio' ? P({ level: logLevel }, P.destination(2)) : P({ level: logLevel });
+    delete request.config.log_level;
+
+    session.auth = request.auth_backend === 'sqlite'
+        ? await useSQLiteAuthState(authPath, logger)
+        : await Baileys.useMultiFileAuthState(authPath);
+    const { state, saveCreds } = session.auth;
+
+    const keyCacheOpts = request.key_cache;
+    session.keyStore = keyCacheOpts
+        ? makeWriteBehindKeyStore(state.keys, { max: keyCacheOpts.size, flushMs: keyCacheOpts.flush_ms, logger })
+        : null;
+
+    const config = {
+        auth: { creds: state.creds, keys: session.keyStore || state.keys },
+        printQRInTerminal: false,
+        logger: logger,
+        ...request.config
+    };
+
+    const cacheOpts = request.hook_cache || {};
+    session.hookCache = new LRUCache({ max: cacheOpts.size || 1000, ttlMs: (cacheOpts.ttl || 300) * 1000 });
+    for (const name of request.hooks || []) {
+        if (HOOK_KEYS[name]) config[name] = makeHook(session, name);
+    }
+
+    if (request.history) {
+        session.history = openHistory(session, request.history, logger);
+        // Baileys would inflate and emit each sync as one object, we stream it instead
+        config.shouldSyncHistoryMessage = () => false;
+    }
+
+    if (request.message_store) {
+        const store = openMessageStore(request.message_store, logger);
+        session.store = store;
+        // Retries are answered from disk, the Python hook only sees misses
+        const fallback = config.getMessage;
+        config.getMessage = async (key) => store.getMessage(key) || (fallback ? fallback(key) : undefined);
+    }
+
+    if (request.group_cache) {
+        const groups = makeGroupCache({
+            snapshot: request.group_cache.snapshot,
+            logger,
+            onChange: (changes, reset) => {
+                if (session.ws) reply(session.ws, { type: 'GROUPS', session: session.id, reset, groups: changes });
+            }
+        });
+        session.groups = groups;
+        // Engine cache first, then the Python hook, then one shared query that fills the cache
+        const fallback = config.cachedGroupMetadata;
+        config.cachedGroupMetadata = async (jid) => groups.get(jid)
+            || (fallback && await fallback(jid))
+            || groups.fetch(sock, jid);
+    }
+
+    if (request.media_cache) {
+        const opts = request.media_cache;
+        session.media = makeMediaCache({ dir: opts.path, maxBytes: opts.max_bytes, ttlMs: opts.ttl * 1000, logger });
+        config.mediaCache = session.media.store;
+    }
+
+    if (request.thumbnails) {
+        const opts = request.thumbnails;
+        session.thumbnails = installThumbnails({ workers: opts.workers, max: opts.size, logger });
+    }
+
+    const sock = REPLAY
+        ? makeReplaySocket(config, {
+            file: REPLAY,
+            speed: Number(process.env.PYBAILEYS_REPLAY_SPEED || 0),
+            latencyMs: Number(process.env.PYBAILEYS_REPLAY_LATENCY_MS || 0)
+        })
+        : Baileys.default(config);
+    session.sock = sock;
+    // Every way to sendMessage (CALL, the send queue, BATCH) goes through these
+    if (session.media) {
+        const sendMessage = sock.sendMessage;
+        sock.sendMessage = (jid, content, options) => session.media.send(content, () => sendMessage(jid, content, options));
+    }
+    if (request.link_previews) {
+        const opts = request.link_previews;
+        // What Baileys' sendMessage would fetch itself, with the same options
+        const getUrlInfo = (url) => Baileys.getUrlInfo(url, {
+            thumbnailWidth: config.linkPreviewImageThumbnailWidth ?? Baileys.DEFAULT_CONNECTION_CONFIG.linkPreviewImageThumbnailWidth,
+            fetchOpts: { timeout: 3000, ...config.options },
+            logger,
+            uploadImage: config.generateHighQualityLinkPreview ? sock.waUploadToServer : undefined
+        });
+        session.previews = makeLinkPreviews({
+            max: opts.size,
+            ttlMs: opts.ttl * 1000,
+            failureTtlMs: opts.failure_ttl * 1000,
+            getUrlInfo,
+            logger
+        });
+        const sendMessage = sock.sendMessage;
+        sock.sendMessage = async (jid, content, options) => {
+            await session.previews.apply(content);
+            return sendMessage(jid, content, options);
+        };
+    }
+    // Records a live session's events for replaying them later
+    if (process.env.PYBAILEYS_CAPTURE_EVENTS && !REPLAY) {
+        Baileys.captureEventStream(sock.ev, process.env.PYBAILEYS_CAPTURE_EVENTS);
+    }
+    session.batchers = [];
+    session.bufferDepth = 0;
+    if (request.send_queue) {
+        session.sender = makeSendScheduler(request.send_queue, {
+            send: (jid, content, options) => sock.sendMessage(jid, content, options),
+            prefetch: (jids) => sock.getUSyncDevices(jids, true, false),
+            logger
+        });
+    }
+
+    const { history } = session;
+    if (history) {
+        const context = { sock, history, options: config.options, logger };
+        sock.ev.on('messages.upsert', ({ messages }) => {
+            for (const msg of messages) {
+                const notification = Baileys.getHistoryMsg(msg.message);
+                if (!notification || !Baileys.PROCESSABLE_HISTORY_TYPES.includes(notification.syncType)) continue;
+                history.queue = history.queue
+                    .then(() => runHistory(session, notification, context))
+                    .catch((err) => logger.error({ err }, 'history sync streaming failed'));
+            }
+        });
+    }
+    session.store?.bind(sock.ev);
+    if (session.groups) {
+        session.groups.bind(sock);
+        session.groups.sync();
+    }
+
+    sock.ev.on('creds.update', saveCreds);
+    sock.ev.on('groups.update', (updates) => updates.forEach((u) => invalidateGroup(session, u.id)));
+    sock.ev.on('group-participants.update', (u) => invalidateGroup(session, u.id));
+    sock.ev.on('connection.update', (u) => sendEvent(session, 'connection.update', u));
+
+    for (const subscription of session.subscriptions.values()) {
+        listen(session, subscription);
+    }
+};
+
+// Ends the socket and writes cached signal keys and creds out
+const stopSession = async (session) => {
+    const { sock, keyStore, auth, store, history, sender, groups, media } = session;
+    session.sock = null;
+    session.groups = null;
+    session.media = null;
+    session.previews = null;
+    session.thumbnails = null;
+    session.sender = null;
+    session.keyStore = null;
+    session.auth = null;
+    session.store = null;
+    session.history = null;
+    sender?.close();
+    if (sock) {
+        sock.ev.removeAllListeners();
+        sock.end(undefined);
+    }
+    for (const batcher of session.batchers) batcher.flush();
+    if (keyStore) await keyStore.flush().catch((err) => console.log(`[Node] Key flush failed: ${err.message}`));
+    if (auth) {
+        await auth.saveCreds();
+        auth.close?.();
+    }
+    if (history) await Promise.all(history.closers.map((close) => close()));
+    store?.close();
+    groups?.close();
+    media?.close();
+};
+
+// Must run before the process exits
+const shutdown = () => Promise.all([...sessions.values()].map(stopSession));
+
+for (const signal of ['SIGTERM', 'SIGINT']) {
+    process.on(signal, () => shutdown().finally(() => process.exit(0)));
+}
+
+// `ws` is a WebSocket or a FramedConnection, both emit 'message' / 'close' and have send()
+const handleConnection = (ws) => {
     console.log('Client connected');
 
-    ws.on('message', async (message) => {
+    ws.format = 'json';
+
+    ws.on('message', async (message, isBinary) => {
+        let tempFiles = [];
+        let request = null;
         try {
-            const request = JSON.parse(message);
+            request = decodeFrame(message, isBinary);
+            tempFiles = takeTempFiles();
+            metrics?.received(request.id, message.length);
             
-            if (request.cmd === 'INIT') {
-                const authPath = request.auth_path || 'baileys_auth_info';
-                console.log(`[Node] Using Auth Path: ${authPath}`);
-
-                const { state, saveCreds } = await Baileys.useMultiFileAuthState(authPath);
-                
-                const logLevel = request.config.log_level || 'info';
-                const logger = P({ level: logLevel });
-                delete request.config.log_level;
-
-                const config = {
-                    auth: state,
-                    printQRInTerminal: false,
-                    logger: logger,
-                    ...request.config
+            if (request.cmd === 'HELLO') {
+                const format = (request.formats || []).find((f) => FORMATS.includes(f)) || 'json';
+                reply(ws, { type: 'RESPONSE', id: request.id, result: format });
+                ws.format = format;
+            }
+
+            else if (request.cmd === 'PING') {
+                // Round trip with an optional payload, for health checks and transport benchmarks
+                reply(ws, { type: 'RESPONSE', id: request.id, result: request.data ?? 'pong' });
+            }
+
+            else if (request.cmd === 'INIT') {
+                const session = getSession(request.session);
+                // Re-initializing replaces the session's socket
+                if (session.sock) await stopSession(session);
+                session.ws = ws;
+                await startSession(session, request);
+                reply(ws, { type: 'RESPONSE', id: request.id, result: 'Initialized' });
+            }
+
+            else if (request.cmd === 'CLOSE') {
+                const session = sessions.get(request.session || DEFAULT_SESSION);
+                if (session) {
+                    sessions.delete(session.id);
+                    await stopSession(session);
+                }
+                reply(ws, { type: 'RESPONSE', id: request.id, result: 'Closed' });
+            }
+
+            else if (request.cmd === 'CALL') {
+                const session = getSession(request.session);
+                // Callers time a queued send from when it leaves the queue
+                const dispatched = () => reply(ws, { type: 'DISPATCHED', id: request.id });
+                const result = await timedCall(request.id, () => invoke(session, request.method, request.args, 'normal', dispatched));
+                reply(ws, { type: 'RESPONSE', id: request.id, result });
+            }
+
+            else if (request.cmd === 'SEND') {
+                const session = getSession(request.session);
+                requireSock(session);
+                const args = [request.jid, request.content, request.options || {}];
+                const result = await timedCall(request.id, () => invoke(session, 'sendMessage', args, request.priority || 'normal'));
+                reply(ws, { type: 'RESPONSE', id: request.id, result });
+            }
+
+            else if (request.cmd === 'PREWARM') {
+                const sock = requireSock(getSession(request.session));
+                const result = await timedCall(request.id, () => prewarm(sock, request.jids || [], { batchSize: request.batch_size, logger: sock.logger }));
+                reply(ws, { type: 'RESPONSE', id: request.id, result });
+            }
+
+            else if (request.cmd === 'BATCH') {
+                const session = getSession(request.session);
+                requireSock(session);
+                const calls = request.calls || [];
+                const concurrency = Math.max(1, request.concurrency || 16);
+                let next = 0;
+
+                // Queue every send up front so the scheduler sees (and prefetches) the whole batch
+                const queued = calls.map(({ method, args }) => {
+                    if (method !== 'sendMessage' || !session.sender) return null;
+                    const sent = invoke(session, method, args || [], request.priority || 'bulk');
+                    sent.catch(() => {});
+                    return sent;
+                });
+
+                // Each lane pulls the next pending call, results stream back as they settle
+                const lane = async () => {
+                    while (next < calls.length) {
+                        const index = next++;
+                        const { method, args } = calls[index];
+                        try {
+                            const result = await (queued[index] || invoke(session, method, args || []));
+                            reply(ws, { type: 'BATCH_ITEM', id: request.id, index, result });
+                        } catch (err) {
+                            reply(ws, { type: 'BATCH_ITEM', id: request.id, index, error: err.message });
+                        }
+                    }
                 };
+                await Promise.all(Array.from({ length: Math.min(concurrency, calls.length) }, lane));
+                reply(ws, { type: 'RESPONSE', id: request.id, result: calls.length });
+            }
 
-                sock = Baileys.default(config);
+            else if (request.cmd === 'DOWNLOAD') {
+                const sock = requireSock(getSession(request.session));
+                const stream = await downloadStream(sock, request);
+                const size = await streamToFile(stream, request.path);
+                reply(ws, { type: 'RESPONSE', id: request.id, result: { path: request.path, size } });
+            }
 
-                sock.ev.on('creds.update', saveCreds);
-                sock.ev.on('connection.update', (u) => sendEvent('connection.update', u));
+            else if (request.cmd === 'STREAM') {
+                const sock = requireSock(getSession(request.session));
+                const chunkSize = request.chunk_size || 64 * 1024;
+                // The client acks every chunk it consumes, at most `window` are in flight
+                const flow = { credit: request.window || 8, wake: null, cancelled: false };
+                streams.set(request.id, flow);
+                let stream;
+                try {
+                    stream = await downloadStream(sock, request);
+                    let size = 0;
+                    let pending = null;
+                    const emit = async (chunk) => {
+                        while (flow.credit <= 0 && !flow.cancelled) {
+                            await new Promise((resolve) => { flow.wake = resolve; });
+                        }
+                        if (flow.cancelled) throw new Error('Stream cancelled');
+                        flow.credit--;
+                        size += chunk.length;
+                        reply(ws, { type: 'CHUNK', id: request.id, data: chunk });
+                    };
+                    for await (const data of stream) {
+                        pending = pending ? Buffer.concat([pending, data]) : data;
+                        while (pending.length >= chunkSize) {
+                            await emit(pending.subarray(0, chunkSize));
+                            pending = pending.subarray(chunkSize);
+                        }
+                    }
+                    if (pending && pending.length) await emit(pending);
+                    reply(ws, { type: 'RESPONSE', id: request.id, result: { size } });
+                } finally {
+                    streams.delete(request.id);
+                    if (stream && !stream.destroyed) stream.destroy();
+                }
+            }
 
-                for (const eventName of subscriptions) {
-                    sock.ev.on(eventName, (d) => sendEvent(eventName, d));
+            else if (request.cmd === 'STREAM_ACK' || request.cmd === 'STREAM_CANCEL') {
+                const flow = streams.get(request.stream);
+                if (flow) {
+                    if (request.cmd === 'STREAM_CANCEL') flow.cancelled = true;
+                    else flow.credit += request.count || 1;
+                    wakeStream(flow);
                 }
+            }
 
-                ws.send(JSON.stringify({ type: 'RESPONSE', id: request.id, result: 'Initialized' }));
+            else if (request.cmd === 'HOOK_RESULT') {
+                const done = hookWaiters.get(request.hook);
+                if (done) {
+                    hookWaiters.delete(request.hook);
+                    if (request.error) console.log(`[Node] Hook failed: ${request.error}`);
+                    done(request.error ? undefined : request.result);
+                }
             }
 
-            else if (request.cmd === 'CALL') {
-                if (!sock) throw new Error("Socket not initialized");
-                const result = await sock[request.method](...request.args);
-                ws.send(JSON.stringify({ type: 'RESPONSE', id: request.id, result }, jsonReplacer));
+            else if (request.cmd === 'BUFFER') {
+                const session = getSession(request.session);
+                requireSock(session).ev.buffer();
+                session.bufferDepth++;
+                reply(ws, { type: 'RESPONSE', id: request.id, result: session.bufferDepth });
+            }
+
+            else if (request.cmd === 'FLUSH') {
+                // Nested buffer() blocks only flush when the outermost one ends
+                const session = getSession(request.session);
+                const sock = requireSock(session);
+                session.bufferDepth = Math.max(0, session.bufferDepth - 1);
+                const flushed = session.bufferDepth === 0 && sock.ev.flush();
+                reply(ws, { type: 'RESPONSE', id: request.id, result: flushed });
+            }
+
+            else if (request.cmd === 'STORE') {
+                const { store } = getSession(request.session);
+                if (!store) throw new Error("Message store not enabled, start with message_store=True");
+                if (!Object.hasOwn(store.queries, request.op)) throw new Error(`Unknown store query ${request.op}`);
+                reply(ws, { type: 'RESPONSE', id: request.id, result: store.queries[request.op](request.args || {}) });
+            }
+
+            else if (request.cmd === 'STATS') {
+                const session = sessions.get(request.session || DEFAULT_SESSION);
+                const result = { sessions: sessions.size, ...(session ? sessionStats(session) : {}) };
+                reply(ws, { type: 'RESPONSE', id: request.id, result });
+            }
+
+            else if (request.cmd === 'METRICS') {
+                reply(ws, { type: 'RESPONSE', id: request.id, result: metrics ? metrics.snapshot() : null });
+            }
+
+            else if (request.cmd === 'SHUTDOWN') {
+                await shutdown();
+                ws.send(encodeFrame(ws, { type: 'RESPONSE', id: request.id, result: 'Stopped' }), () => process.exit(0));
             }
 
             else if (request.cmd === 'STATIC_CALL') {
                 const result = await Baileys[request.method](...request.args);
-                ws.send(JSON.stringify({ type: 'RESPONSE', id: request.id, result }, jsonReplacer));
+                reply(ws, { type: 'RESPONSE', id: request.id, result });
             }
 
             else if (request.cmd === 'SUBSCRIBE') {
-                const eventName = request.event;
-                subscriptions.add(eventName);
-                if (sock && sock.ev) {
-                    sock.ev.on(eventName, (d) => sendEvent(eventName, d));
+                const session = getSession(request.session);
+                const subscription = {
+                    event: request.event,
+                    sub: request.sub,
+                    transform: makeEventTransform(request.filter, request.fields),
+                    batch: request.batch
+                };
+                const key = request.sub || request.event;
+                session.ws = ws;
+                if (!session.subscriptions.has(key)) {
+                    session.subscriptions.set(key, subscription);
+                    if (session.sock) listen(session, subscription);
                 }
             }
 
         } catch (err) {
-            if (activeSocket) {
-                const reqId = tryGetId(message);
-                activeSocket.send(JSON.stringify({ type: 'ERROR', id: reqId, error: err.message }));
-            }
+            const reqId = tryGetId(message, isBinary);
+            reply(ws, { type: 'ERROR', id: reqId, error: err.message });
+        } finally {
+            for (const file of tempFiles) fs.unlink(file, () => {});
+            // Commands without a reply still need their clock stopped
+            if (metrics && request) metrics.finish(request.id);
         }
     });
 
-    function tryGetId(msg) {
-        try { return JSON.parse(msg).id; } catch { return null; }
+    function tryGetId(msg, isBinary) {
+        try { return decodeFrame(msg, isBinary).id; } catch { return null; }
     }
 
-    function sendEvent(name, data) {
-        if (activeSocket) {
-            activeSocket.send(JSON.stringify({ type: 'EVENT', name, data }, jsonReplacer));
+    ws.on('close', () => {
+        for (const session of sessions.values()) {
+            if (session.ws === ws) session.ws = null;
         }
-    }
-});
+    });
+};
+
+// The client passes a port to connect back to once we listen, instead of
+// waiting for the PORT line on stdout. `address` is {port} or {socket}.
+const announceReady = (address) => {
+    phase('listen');
+    if (address.port) console.log(`PORT:${address.port}`);
+    const readyPort = Number(process.env.PYBAILEYS_READY_PORT);
+    if (!readyPort) return;
+    const conn = net.connect(readyPort, '127.0.0.1', () => {
+        conn.end(`${JSON.stringify({ ...address, transport: TRANSPORT, compile_cache: compileCache, timings: startupTimings })}\n`);
+    });
+    conn.on('error', (err) => console.log(`[Node] Ready handshake failed: ${err.message}`));
+};
 
-wss.on('listening', () => console.log(`PORT:${wss.address().port}`));
\ No newline at end of file
+if (TRANSPORT === 'ws') {
+    const wss = new WebSocket.Server({ host: '0.0.0.0', port: 0 });
+    wss.on('connection', handleConnection);
+    wss.on('listening', () => announceReady({ port: wss.address().port }));
+} else if (TRANSPORT === 'unix') {
+    const socketPath = process.env.PYBAILEYS_SOCKET;
+    if (process.platform !== 'win32' && fs.existsSync(socketPath)) fs.unlinkSync(socketPath);
+    const server = net.createServer((socket) => handleConnection(new FramedConnection(socket, socket)));
+    server.listen(socketPath, () => announceReady({ socket: socketPath }));
+} else if (TRANSPORT === 'stdio') {
+    const conn = new FramedConnection(process.stdin, process.stdout);
+    handleConnection(conn);
+    // Our parent is the only client, without it there is nothing left to serve
+    conn.on('close', () => shutdown().finally(() => process.exit(0)));
+    announceReady({});
+} else {
+    throw new Error(`Unknown transport ${TRANSPORT}`);
+}
\ No newline at end of file
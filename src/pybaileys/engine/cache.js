@@ -0,0 +1,52 @@
+// Small LRU map with optional per-entry TTL, used for the engine's caches.
+// Map keeps insertion order, so re-inserting on access makes the first key
+// the least recently used one.
+
+class LRUCache {
+    constructor({ max = 1000, ttlMs = 0 } = {}) {
+        this.max = max;
+        this.ttlMs = ttlMs;
+        this.map = new Map();
+        this.hits = 0;
+        this.misses = 0;
+    }
+
+    get(key) {
+        const entry = this.map.get(key);
+        if (!entry || (entry.expires && entry.expires <= Date.now())) {
+            if (entry) this.map.delete(key);
+            this.misses++;
+            return undefined;
+        }
+        this.map.delete(key);
+        this.map.set(key, entry);
+        this.hits++;
+        return entry.value;
+    }
+
+    set(key, value, ttlMs = this.ttlMs) {
+        this.map.delete(key);
+        this.map.set(key, { value, expires: ttlMs ? Date.now() + ttlMs : 0 });
+        while (this.map.size > this.max) {
+            this.map.delete(this.map.keys().next().value);
+        }
+    }
+
+    has(key) {
+        return this.get(key) !== undefined;
+    }
+
+    delete(key) {
+        return this.map.delete(key);
+    }
+
+    clear() {
+        this.map.clear();
+    }
+
+    stats() {
+        return { size: this.map.size, hits: this.hits, misses: this.misses };
+    }
+}
+
+module.exports = { LRUCache };
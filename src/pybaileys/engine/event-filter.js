@@ -0,0 +1,112 @@
+// Declarative filters and field projection for SUBSCRIBE. They run before an
+// event is serialized, so payloads a listener doesn't want never reach Python.
+//
+// A filter is an object of optional predicates that must all match:
+//   jid          remoteJid glob(s), '*' matches anything: '*@g.us'
+//   from_me      true / false
+//   type         message content type(s): 'imageMessage', or 'text' for
+//                conversation / extendedTextMessage
+//   text_prefix  prefix(es) of the text or caption: '!'
+// Events carrying a `messages` list (messages.upsert, messaging-history.set)
+// and array payloads are filtered per item and dropped once nothing is left.
+// `fields` keeps only the listed dotted paths of every item ('key.remoteJid').
+const { getContentType, normalizeMessageContent } = require('./vendor/baileys-main/lib/index');
+
+const FILTER_KEYS = ['jid', 'from_me', 'type', 'text_prefix'];
+const TEXT_TYPES = ['conversation', 'extendedTextMessage'];
+
+const asList = (value) => (Array.isArray(value) ? value : [value]);
+
+const globToRegExp = (glob) => new RegExp(
+    `^${glob.split('*').map((part) => part.replace(/[.+?^${}()|[\]\\]/g, '\\$&')).join('.*')}$`
+);
+
+const itemJid = (item) => item.key?.remoteJid ?? item.id ?? item.jid ?? item.remoteJid;
+
+const itemContent = (item) => {
+    const content = normalizeMessageContent(item.message);
+    const type = getContentType(content);
+    return { content, type };
+};
+
+const itemText = (content, type) => {
+    if (!content || !type) return undefined;
+    if (type === 'conversation') return content.conversation;
+    return content[type]?.text ?? content[type]?.caption;
+};
+
+const compileFilter = (spec) => {
+    const tests = [];
+    for (const key of Object.keys(spec)) {
+        if (!FILTER_KEYS.includes(key)) throw new Error(`Unknown filter key ${key}`);
+    }
+    if (spec.jid !== undefined && spec.jid !== null) {
+        const patterns = asList(spec.jid).map(globToRegExp);
+        tests.push((item) => {
+            const jid = itemJid(item);
+            return typeof jid === 'string' && patterns.some((re) => re.test(jid));
+        });
+    }
+    if (spec.from_me !== undefined && spec.from_me !== null) {
+        tests.push((item) => !!item.key?.fromMe === !!spec.from_me);
+    }
+    if (spec.type !== undefined && spec.type !== null) {
+        const types = new Set(asList(spec.type).flatMap((t) => (t === 'text' ? TEXT_TYPES : [t])));
+        tests.push((item) => types.has(itemContent(item).type));
+    }
+    if (spec.text_prefix !== undefined && spec.text_prefix !== null) {
+        const prefixes = asList(spec.text_prefix);
+        tests.push((item) => {
+            const { content, type } = itemContent(item);
+            const text = itemText(content, type);
+            return typeof text === 'string' && prefixes.some((p) => text.startsWith(p));
+        });
+    }
+    return (item) => !!item && tests.every((test) => test(item));
+};
+
+const compileProjection = (fields) => {
+    const paths = fields.map((field) => field.split('.'));
+    return (item) => {
+        const out = {};
+        for (const path of paths) {
+            let value = item;
+            for (const part of path) {
+                value = value?.[part];
+                if (value === undefined) break;
+            }
+            if (value === undefined) continue;
+            let target = out;
+            for (const part of path.slice(0, -1)) {
+                target = target[part] = target[part] || {};
+            }
+            target[path[path.length - 1]] = value;
+        }
+        return out;
+    };
+};
+
+// Returns payload => payload | undefined (drop), or null when there is nothing to apply
+const makeEventTransform = (filter, fields) => {
+    if (!filter && !fields) return null;
+    const test = filter ? compileFilter(filter) : () => true;
+    const project = fields ? compileProjection(fields) : (item) => item;
+    const apply = (items) => {
+        const kept = [];
+        for (const item of items) {
+            if (test(item)) kept.push(project(item));
+        }
+        return kept.length ? kept : undefined;
+    };
+
+    return (payload) => {
+        if (Array.isArray(payload)) return apply(payload);
+        if (payload && Array.isArray(payload.messages)) {
+            const messages = apply(payload.messages);
+            return messages && { ...payload, messages };
+        }
+        return test(payload) ? project(payload) : undefined;
+    };
+};
+
+module.exports = { makeEventTransform };
@@ -0,0 +1,56 @@
+// Length-prefixed frames over a byte stream, used by the 'unix' and 'stdio'
+// transports instead of WebSocket framing: a 4-byte big-endian payload length,
+// one flags byte (1 = binary / msgpack, 0 = UTF-8 JSON), then the payload.
+// Looks like a `ws` connection to bridge.js: 'message' (data, isBinary) and
+// 'close' events, send(data, callback).
+const { EventEmitter } = require('events');
+
+const HEADER_SIZE = 5;
+const FLAG_BINARY = 1;
+
+class FramedConnection extends EventEmitter {
+    constructor(input, output) {
+        super();
+        this.output = output;
+        this.buffer = Buffer.alloc(0);
+        this.closed = false;
+        input.on('data', (chunk) => this.feed(chunk));
+        input.on('end', () => this.close());
+        input.on('close', () => this.close());
+        input.on('error', () => this.close());
+        output.on('error', () => this.close());
+    }
+
+    feed(chunk) {
+        let buf = this.buffer.length ? Buffer.concat([this.buffer, chunk]) : chunk;
+        while (buf.length >= HEADER_SIZE) {
+            const length = buf.readUInt32BE(0);
+            if (buf.length < HEADER_SIZE + length) break;
+            const isBinary = (buf[4] & FLAG_BINARY) !== 0;
+            const payload = buf.subarray(HEADER_SIZE, HEADER_SIZE + length);
+            buf = buf.subarray(HEADER_SIZE + length);
+            this.emit('message', payload, isBinary);
+        }
+        this.buffer = buf;
+    }
+
+    send(data, callback) {
+        const isBinary = Buffer.isBuffer(data);
+        const payload = isBinary ? data : Buffer.from(data, 'utf-8');
+        const header = Buffer.allocUnsafe(HEADER_SIZE);
+        header.writeUInt32BE(payload.length, 0);
+        header[4] = isBinary ? FLAG_BINARY : 0;
+        this.output.cork();
+        this.output.write(header);
+        this.output.write(payload, callback);
+        this.output.uncork();
+    }
+
+    close() {
+        if (this.closed) return;
+        this.closed = true;
+        this.emit('close');
+    }
+}
+
+module.exports = { FramedConnection };
@@ -0,0 +1,169 @@
+// Group metadata kept in the engine and served to Baileys as
+// cachedGroupMetadata, so a group send doesn't query the full participant list
+// every time. Warmed with one groupFetchAllParticipating() when the connection
+// opens and patched from groups.update / group-participants.update. Changes are
+// pushed to Python in coalesced GROUPS frames, and the whole map can be
+// snapshotted to a JSON file so a restart starts warm.
+const fs = require('fs');
+const path = require('path');
+const { BufferJSON, areJidsSameUser } = require('./vendor/baileys-main/lib/index');
+
+const PUSH_DELAY_MS = 50;
+const SNAPSHOT_DELAY_MS = 5000;
+
+const ADMIN_ACTIONS = { promote: 'admin', demote: null };
+
+const makeGroupCache = ({ snapshot, logger, onChange }) => {
+    const groups = new Map();
+    const fetching = new Map();
+    const counters = { hits: 0, misses: 0, fetches: 0 };
+    // jid -> metadata or null (removed), pushed to Python after PUSH_DELAY_MS
+    let changes = new Map();
+    let pushTimer = null;
+    let snapshotTimer = null;
+    let myJid = null;
+
+    const push = () => {
+        pushTimer = null;
+        if (!changes.size) return;
+        const batch = Object.fromEntries(changes);
+        changes = new Map();
+        onChange(batch, false);
+    };
+
+    const writeSnapshot = () => {
+        clearTimeout(snapshotTimer);
+        snapshotTimer = null;
+        if (!snapshot) return;
+        const tmp = `${snapshot}.tmp`;
+        fs.writeFileSync(tmp, JSON.stringify(Object.fromEntries(groups), BufferJSON.replacer));
+        fs.renameSync(tmp, snapshot);
+    };
+
+    const changed = (jid) => {
+        changes.set(jid, groups.get(jid) || null);
+        if (!pushTimer) pushTimer = setTimeout(push, PUSH_DELAY_MS);
+        if (snapshot && !snapshotTimer) snapshotTimer = setTimeout(writeSnapshot, SNAPSHOT_DELAY_MS);
+    };
+
+    const set = (meta) => {
+        groups.set(meta.id, meta);
+        changed(meta.id);
+    };
+
+    const remove = (jid) => {
+        if (groups.delete(jid)) changed(jid);
+    };
+
+    // Replaces everything, e.g. with the groupFetchAllParticipating() result
+    const reset = (all) => {
+        groups.clear();
+        for (const meta of Object.values(all)) groups.set(meta.id, meta);
+        changes = new Map();
+        clearTimeout(pushTimer);
+        pushTimer = null;
+        onChange(Object.fromEntries(groups), true);
+        if (snapshot && !snapshotTimer) snapshotTimer = setTimeout(writeSnapshot, SNAPSHOT_DELAY_MS);
+    };
+
+    const matches = (participant, jid) => participant.id === jid || participant.lid === jid;
+
+    const applyParticipants = ({ id, participants, action }) => {
+        const meta = groups.get(id);
+        if (!meta) return;
+        if (myJid && (action === 'remove' || action === 'leave')
+            && participants.some((jid) => areJidsSameUser(jid, myJid))) {
+            remove(id);
+            return;
+        }
+        let list = meta.participants || [];
+        if (action === 'add') {
+            const added = participants.filter((jid) => !list.some((p) => matches(p, jid)));
+            list = [...list, ...added.map((jid) => ({ id: jid, admin: null }))];
+        } else if (action === 'remove' || action === 'leave') {
+            list = list.filter((p) => !participants.some((jid) => matches(p, jid)));
+        } else if (action in ADMIN_ACTIONS) {
+            list = list.map((p) => (participants.some((jid) => matches(p, jid)) ? { ...p, admin: ADMIN_ACTIONS[action] } : p));
+        } else {
+            // A number change: the new ids are only known to the server, fetch again on next use
+            remove(id);
+            return;
+        }
+        set({ ...meta, participants: list, size: list.length });
+    };
+
+    const bind = (sock) => {
+        sock.ev.on('connection.update', ({ connection }) => {
+            if (connection !== 'open') return;
+            myJid = sock.user?.id;
+            sock.groupFetchAllParticipating()
+                .then((all) => {
+                    reset(all);
+                    logger?.debug({ groups: groups.size }, 'group metadata cache warmed');
+                })
+                .catch((err) => logger?.warn({ err }, 'group metadata warm-up failed'));
+        });
+        sock.ev.on('groups.upsert', (metas) => metas.forEach(set));
+        sock.ev.on('groups.update', (updates) => {
+            for (const update of updates) {
+                const existing = groups.get(update.id);
+                // Partial updates of groups we don't know about are useless, full records are kept
+                if (existing) set({ ...existing, ...update });
+                else if (update.participants) set(update);
+            }
+        });
+        sock.ev.on('group-participants.update', applyParticipants);
+    };
+
+    // Misses are fetched once, concurrent sends to the same group share the query
+    const fetch = (sock, jid) => {
+        let pending = fetching.get(jid);
+        if (!pending) {
+            counters.fetches++;
+            pending = sock.groupMetadata(jid)
+                .then((meta) => {
+                    set(meta);
+                    return meta;
+                })
+                .catch((err) => {
+                    logger?.debug({ err, jid }, 'group metadata fetch failed');
+                    return undefined;
+                })
+                .finally(() => fetching.delete(jid));
+            fetching.set(jid, pending);
+        }
+        return pending;
+    };
+
+    const get = (jid) => {
+        const meta = groups.get(jid);
+        if (meta) counters.hits++;
+        else counters.misses++;
+        return meta;
+    };
+
+    if (snapshot && fs.existsSync(snapshot)) {
+        try {
+            const saved = JSON.parse(fs.readFileSync(snapshot, 'utf-8'), BufferJSON.reviver);
+            for (const meta of Object.values(saved)) groups.set(meta.id, meta);
+        } catch (err) {
+            logger?.warn({ err }, 'ignoring unreadable group snapshot');
+        }
+    }
+    if (snapshot) fs.mkdirSync(path.dirname(snapshot), { recursive: true });
+
+    return {
+        bind,
+        get,
+        fetch,
+        // Full state for a (re)connected client
+        sync: () => onChange(Object.fromEntries(groups), true),
+        stats: () => ({ size: groups.size, ...counters }),
+        close: () => {
+            clearTimeout(pushTimer);
+            if (snapshot) writeSnapshot();
+        }
+    };
+};
+
+module.exports = { makeGroupCache };
@@ -0,0 +1,177 @@
+// Streaming replacement for Baileys' downloadAndProcessHistorySyncNotification.
+// The history blob is inflated as a stream and HistorySync's top-level fields
+// are read one at a time, so only one conversation is decoded at once instead
+// of the whole sync. Chats, contacts and messages are handed to `sink` in
+// chunks of about `chunkSize` messages (a conversation is never split); the
+// next chunk waits for the sink.
+const fs = require('fs');
+const path = require('path');
+const zlib = require('zlib');
+const { once } = require('events');
+const { pipeline } = require('stream');
+const { BufferJSON, proto, downloadContentFromMessage, toNumber, isJidUser, WAMessageStubType } = require('./vendor/baileys-main/lib/index');
+
+// Field numbers of HistorySync (WAProto/HistorySync/HistorySync.proto)
+const FIELD_SYNC_TYPE = 1;
+const FIELD_CONVERSATIONS = 2;
+const FIELD_PROGRESS = 6;
+const FIELD_PUSHNAMES = 7;
+
+const EMPTY = Buffer.alloc(0);
+
+const readVarint = (buf, pos) => {
+    let value = 0;
+    let scale = 1;
+    for (let i = pos; i < buf.length && i < pos + 10; i++) {
+        const byte = buf[i];
+        value += (byte & 0x7f) * scale;
+        if (byte < 0x80) return { value, next: i + 1 };
+        scale *= 128;
+    }
+    return null;
+};
+
+// Tag plus the value (or the length of a length-delimited value), null when incomplete
+const readHeader = (buf) => {
+    const tag = readVarint(buf, 0);
+    if (!tag) return null;
+    const number = Math.floor(tag.value / 8);
+    const wireType = tag.value % 8;
+    switch (wireType) {
+        case 0: {
+            const v = readVarint(buf, tag.next);
+            return v && { number, wireType, value: v.value, next: v.next };
+        }
+        case 1: return buf.length >= tag.next + 8 ? { number, wireType, next: tag.next + 8 } : null;
+        case 5: return buf.length >= tag.next + 4 ? { number, wireType, next: tag.next + 4 } : null;
+        case 2: {
+            const len = readVarint(buf, tag.next);
+            return len && { number, wireType, length: len.value, next: len.next };
+        }
+        default: throw new Error(`Unsupported protobuf wire type ${wireType} in history sync`);
+    }
+};
+
+// Yields {number, value} for every top-level field. Length-delimited values are
+// collected from their parts, so a large conversation is copied only once.
+async function* readFields(stream) {
+    let buf = EMPTY;
+    let field = null;
+    for await (const data of stream) {
+        buf = buf.length ? Buffer.concat([buf, data]) : data;
+        while (buf.length) {
+            if (field) {
+                const take = Math.min(field.length - field.size, buf.length);
+                field.parts.push(buf.subarray(0, take));
+                field.size += take;
+                buf = buf.subarray(take);
+                if (field.size < field.length) break;
+                yield { number: field.number, value: Buffer.concat(field.parts, field.length) };
+                field = null;
+                continue;
+            }
+            const header = readHeader(buf);
+            if (!header) break;
+            buf = buf.subarray(header.next);
+            if (header.wireType === 2) {
+                field = { number: header.number, length: header.length, parts: [], size: 0 };
+                if (!header.length) {
+                    yield { number: header.number, value: EMPTY };
+                    field = null;
+                }
+            } else {
+                yield { number: header.number, value: header.value };
+            }
+        }
+    }
+    if (field || buf.length) throw new Error('Truncated history sync payload');
+}
+
+// Same records processHistoryMessage builds, for one conversation
+const takeConversation = (chat, out) => {
+    out.contacts.push({
+        id: chat.id,
+        name: chat.name || undefined,
+        lid: chat.lidJid || undefined,
+        phoneNumber: chat.pnJid || undefined
+    });
+    const msgs = chat.messages || [];
+    delete chat.messages;
+    for (const { message } of msgs) {
+        if (!message) continue;
+        if (!chat.messages?.length) chat.messages = [{ message }];
+        if (!message.key.fromMe && !chat.lastMessageRecvTimestamp) {
+            chat.lastMessageRecvTimestamp = toNumber(message.messageTimestamp);
+        }
+        if ((message.messageStubType === WAMessageStubType.BIZ_PRIVACY_MODE_TO_BSP
+            || message.messageStubType === WAMessageStubType.BIZ_PRIVACY_MODE_TO_FB)
+            && message.messageStubParameters?.[0]) {
+            out.contacts.push({
+                id: message.key.participant || message.key.remoteJid,
+                verifiedName: message.messageStubParameters[0]
+            });
+        }
+        out.messages.push(message);
+    }
+    out.chats.push({ ...chat });
+};
+
+const streamHistory = async (notification, { chunkSize = 500, sink, options, logger }) => {
+    const download = await downloadContentFromMessage(notification, 'md-msg-hist', { options });
+    const inflate = zlib.createInflate();
+    pipeline(download, inflate, () => {});
+
+    let syncType = notification.syncType;
+    let progress = notification.progress;
+    let out = { chats: [], contacts: [], messages: [] };
+    const totals = { chats: 0, contacts: 0, messages: 0, chunks: 0 };
+
+    const flush = async () => {
+        if (!out.chats.length && !out.contacts.length && !out.messages.length) return;
+        const chunk = out;
+        out = { chats: [], contacts: [], messages: [] };
+        totals.chats += chunk.chats.length;
+        totals.contacts += chunk.contacts.length;
+        totals.messages += chunk.messages.length;
+        totals.chunks++;
+        await sink({ ...chunk, syncType, progress }, totals);
+    };
+
+    for await (const { number, value } of readFields(inflate)) {
+        if (number === FIELD_SYNC_TYPE) {
+            syncType = value;
+        } else if (number === FIELD_PROGRESS) {
+            progress = value;
+        } else if (number === FIELD_CONVERSATIONS) {
+            const chat = proto.Conversation.decode(value);
+            takeConversation(chat, out);
+            if (out.messages.length >= chunkSize) await flush();
+        } else if (number === FIELD_PUSHNAMES) {
+            const { id, pushname } = proto.Pushname.decode(value);
+            out.contacts.push({ id, name: pushname || undefined, jid: isJidUser(id) ? id : undefined });
+            if (out.contacts.length >= chunkSize) await flush();
+        }
+    }
+    await flush();
+    logger?.debug({ syncType, ...totals }, 'streamed history sync');
+    return { syncType, progress, ...totals };
+};
+
+// Appends chunks to a file as {"type": "chat" | "contact" | "message", "data": ...} lines
+const makeNdjsonSink = (file) => {
+    fs.mkdirSync(path.dirname(file), { recursive: true });
+    const out = fs.createWriteStream(file, { flags: 'a' });
+    const line = (type, data) => `${JSON.stringify({ type, data }, BufferJSON.replacer)}\n`;
+    return {
+        write: async ({ chats, contacts, messages }) => {
+            let text = '';
+            for (const chat of chats) text += line('chat', chat);
+            for (const contact of contacts) text += line('contact', contact);
+            for (const message of messages) text += line('message', message);
+            if (!out.write(text)) await once(out, 'drain');
+        },
+        close: () => new Promise((resolve) => out.end(resolve))
+    };
+};
+
+module.exports = { streamHistory, readFields, makeNdjsonSink };
@@ -0,0 +1,109 @@
+// Write-behind cache in front of any SignalKeyStore (files or SQLite).
+// Reads are served from an LRU (missing keys are cached too, Baileys asks for
+// sessions that don't exist all the time). Writes land in the cache right
+// away and are coalesced into one store.set() every flushMs; flush() must run
+// before the process exits, bridge.js does it on SHUTDOWN and on signals.
+const { LRUCache } = require('./cache');
+
+const makeWriteBehindKeyStore = (store, { max, flushMs, logger } = {}) => {
+    max = max || 10000;
+    flushMs = flushMs || 1000;
+    const cache = new LRUCache({ max });
+    // Pending writes by cache key, authoritative over both cache and store
+    let dirty = new Map();
+    let timer = null;
+    let flushing = Promise.resolve();
+    let dirtyHits = 0;
+    let flushes = 0;
+
+    const cacheKey = (type, id) => `${type}.${id}`;
+
+    const scheduleFlush = () => {
+        if (!timer) timer = setTimeout(() => flush().catch(() => {}), flushMs);
+    };
+
+    const writeOut = async () => {
+        if (!dirty.size) return;
+        const batch = dirty;
+        dirty = new Map();
+        const data = {};
+        for (const { type, id, value } of batch.values()) {
+            (data[type] = data[type] || {})[id] = value;
+        }
+        try {
+            await store.set(data);
+            flushes++;
+        } catch (err) {
+            // Put the batch back unless newer writes superseded it
+            for (const [key, entry] of batch) {
+                if (!dirty.has(key)) dirty.set(key, entry);
+            }
+            logger?.error({ err, keys: batch.size }, 'failed to flush signal keys');
+            scheduleFlush();
+            throw err;
+        }
+    };
+
+    const flush = () => {
+        clearTimeout(timer);
+        timer = null;
+        // Chain so two flushes never write the same keys out of order
+        flushing = flushing.catch(() => {}).then(writeOut);
+        return flushing;
+    };
+
+    return {
+        get: async (type, ids) => {
+            const data = {};
+            const missing = [];
+            for (const id of ids) {
+                const key = cacheKey(type, id);
+                const pending = dirty.get(key);
+                if (pending) {
+                    dirtyHits++;
+                    data[id] = pending.value;
+                    continue;
+                }
+                const cached = cache.get(key);
+                if (cached !== undefined) data[id] = cached;
+                else missing.push(id);
+            }
+            if (missing.length) {
+                const fetched = await store.get(type, missing);
+                for (const id of missing) {
+                    const value = fetched[id] ?? null;
+                    // A write may have landed while the store was being read
+                    const pending = dirty.get(cacheKey(type, id));
+                    data[id] = pending ? pending.value : value;
+                    if (!pending) cache.set(cacheKey(type, id), value);
+                }
+            }
+            return data;
+        },
+        set: async (data) => {
+            for (const type in data) {
+                for (const id in data[type]) {
+                    const value = data[type][id] ?? null;
+                    const key = cacheKey(type, id);
+                    cache.set(key, value);
+                    dirty.set(key, { type, id, value });
+                }
+            }
+            scheduleFlush();
+        },
+        clear: async () => {
+            clearTimeout(timer);
+            timer = null;
+            dirty.clear();
+            cache.clear();
+            await store.clear?.();
+        },
+        flush,
+        stats: () => {
+            const { size, hits, misses } = cache.stats();
+            return { size, hits: hits + dirtyHits, misses, dirty: dirty.size, flushes };
+        }
+    };
+};
+
+module.exports = { makeWriteBehindKeyStore };
@@ -0,0 +1,68 @@
+// Link previews cached by URL. Baileys fetches the page (and its image) for
+// every text that contains a link, up to a 3 s timeout each time. apply() runs
+// before sendMessage and fills `content.linkPreview` from the cache, which
+// Baileys then uses as is. A URL already being fetched is waited for, not
+// fetched again, and prefetch() starts the fetch when a message is queued so
+// it is usually done by the time the message is sent.
+//
+// Failed fetches are remembered for `failureTtlMs`, so a dead link doesn't cost
+// a timeout per send; pages without a preview count as fetched, with none.
+const { LRUCache } = require('./cache');
+const { extractUrlFromText } = require('./vendor/baileys-main/lib/index');
+
+const makeLinkPreviews = ({ max = 1000, ttlMs = 3600 * 1000, failureTtlMs = 300 * 1000, getUrlInfo, logger }) => {
+    // url -> the preview, or null for none
+    const cache = new LRUCache({ max, ttlMs });
+    // url -> promise of the fetch in progress
+    const fetching = new Map();
+    const counters = { fetched: 0, failed: 0, joined: 0 };
+
+    const fetchPreview = async (url) => {
+        try {
+            const info = (await getUrlInfo(url)) || null;
+            counters.fetched++;
+            cache.set(url, info);
+            return info;
+        } catch (err) {
+            counters.failed++;
+            logger?.warn({ err: err.message, url }, 'link preview failed');
+            cache.set(url, null, failureTtlMs);
+            return null;
+        }
+    };
+
+    const lookup = (url) => {
+        const cached = cache.get(url);
+        if (cached !== undefined) return cached;
+        if (fetching.has(url)) {
+            counters.joined++;
+            return fetching.get(url);
+        }
+        const promise = fetchPreview(url).finally(() => fetching.delete(url));
+        fetching.set(url, promise);
+        return promise;
+    };
+
+    // The URL Baileys would preview, when it would make one
+    const urlOf = (content) => {
+        if (!content || typeof content.text !== 'string' || content.linkPreview !== undefined) return null;
+        return extractUrlFromText(content.text) || null;
+    };
+
+    const apply = async (content) => {
+        const url = urlOf(content);
+        // null tells Baileys there is no preview, instead of making it fetch one
+        if (url) content.linkPreview = await lookup(url);
+    };
+
+    const prefetch = (content) => {
+        const url = urlOf(content);
+        if (url) lookup(url);
+    };
+
+    const stats = () => ({ ...cache.stats(), ...counters, fetching: fetching.size });
+
+    return { apply, prefetch, stats };
+};
+
+module.exports = { makeLinkPreviews };
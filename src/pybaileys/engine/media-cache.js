@@ -0,0 +1,244 @@
+// Persistent cache of media uploads, served to Baileys as config.mediaCache so
+// the same image or document sent to many chats is encrypted and uploaded once.
+//
+// Baileys only consults the cache for {url} media and keys it by
+// `${mediaType}:${url}`. prepare() runs before each sendMessage and makes every
+// media cacheable by content:
+// - http(s) URLs are kept and keyed by the URL
+// - Buffers are keyed by their SHA-256; only on a miss are they written to
+//   <dir>/blobs/<hash> for the upload, and removed after the send
+// - local files are keyed by the SHA-256 of their contents
+// Concurrent sends of the same media wait for the first upload instead of
+// starting their own.
+//
+// A value is the encoded upload (url, directPath, mediaKey, hashes, thumbnail).
+// It expires with the uploaded URL (its `oe` parameter), at the latest after
+// `ttlMs`. Least recently used values are evicted past `maxBytes`, and the
+// index is snapshotted to <dir>/index.json.
+const fs = require('fs');
+const path = require('path');
+const crypto = require('crypto');
+const { pipeline } = require('stream/promises');
+const { MEDIA_KEYS, proto } = require('./vendor/baileys-main/lib/index');
+
+const SNAPSHOT_DELAY_MS = 5000;
+// Stop reusing an upload this long before WhatsApp expires its URL
+const EXPIRY_MARGIN_MS = 60 * 60 * 1000;
+
+const sha256File = async (file) => {
+    const hash = crypto.createHash('sha256');
+    await pipeline(fs.createReadStream(file), hash);
+    return hash.digest('hex');
+};
+
+// When the uploaded media's URL stops working, from its hex `oe` (unix seconds) parameter
+const urlExpiry = (value) => {
+    try {
+        const message = proto.Message.decode(value);
+        for (const [field, content] of Object.entries(message)) {
+            if (!field.endsWith('Message') || !content?.url) continue;
+            const oe = new URL(content.url).searchParams.get('oe');
+            if (oe && /^[0-9a-f]+$/i.test(oe)) return parseInt(oe, 16) * 1000;
+        }
+    } catch {
+        // Not decodable here, the TTL applies
+    }
+    return null;
+};
+
+const makeMediaCache = ({ dir, maxBytes = 64 * 1024 * 1024, ttlMs = 14 * 24 * 3600 * 1000, logger }) => {
+    const blobs = path.join(dir, 'blobs');
+    const snapshot = path.join(dir, 'index.json');
+    fs.rmSync(blobs, { recursive: true, force: true });
+    fs.mkdirSync(blobs, { recursive: true });
+
+    // key -> {value: Buffer, expires}, least recently used first
+    const entries = new Map();
+    // url Baileys sees -> {key: 'sha256:<hash>', refs, data: Buffer for blobs}
+    const aliases = new Map();
+    // storage key -> promise of the first send uploading it
+    const uploading = new Map();
+    const counters = { hits: 0, misses: 0, uploads: 0, joined: 0, evictions: 0, expired: 0 };
+    let bytes = 0;
+    let snapshotTimer = null;
+
+    const writeSnapshot = () => {
+        clearTimeout(snapshotTimer);
+        snapshotTimer = null;
+        const now = Date.now();
+        const out = [];
+        for (const [key, { value, expires }] of entries) {
+            if (expires > now) out.push([key, value.toString('base64'), expires]);
+        }
+        const tmp = `${snapshot}.tmp`;
+        fs.writeFileSync(tmp, JSON.stringify(out));
+        fs.renameSync(tmp, snapshot);
+    };
+
+    const changed = () => {
+        if (!snapshotTimer) snapshotTimer = setTimeout(writeSnapshot, SNAPSHOT_DELAY_MS);
+    };
+
+    const remove = (key) => {
+        const entry = entries.get(key);
+        if (!entry) return;
+        entries.delete(key);
+        bytes -= entry.value.length;
+    };
+
+    const put = (key, value, expires) => {
+        remove(key);
+        entries.set(key, { value, expires });
+        bytes += value.length;
+        while (bytes > maxBytes && entries.size > 1) {
+            remove(entries.keys().next().value);
+            counters.evictions++;
+        }
+    };
+
+    const fresh = (key) => {
+        const entry = entries.get(key);
+        return !!entry && entry.expires > Date.now();
+    };
+
+    const lookup = (key) => {
+        const entry = entries.get(key);
+        if (!entry) return undefined;
+        if (entry.expires <= Date.now()) {
+            remove(key);
+            counters.expired++;
+            changed();
+            return undefined;
+        }
+        entries.delete(key);
+        entries.set(key, entry);
+        return entry.value;
+    };
+
+    try {
+        const now = Date.now();
+        for (const [key, value, expires] of JSON.parse(fs.readFileSync(snapshot, 'utf-8'))) {
+            if (expires > now) put(key, Buffer.from(value, 'base64'), expires);
+        }
+    } catch (err) {
+        if (err.code !== 'ENOENT') logger?.warn({ err }, 'media cache snapshot unreadable, starting empty');
+    }
+
+    // Baileys' key with local urls replaced by the content hash they alias
+    const resolveKey = (baileysKey) => {
+        const sep = baileysKey.indexOf(':');
+        const url = baileysKey.slice(sep + 1);
+        const alias = aliases.get(url);
+        return { key: alias ? `${baileysKey.slice(0, sep)}:${alias.key}` : baileysKey, url, alias };
+    };
+
+    // The CacheStore interface Baileys calls
+    const store = {
+        get: (baileysKey) => {
+            const { key, url, alias } = resolveKey(baileysKey);
+            const value = lookup(key);
+            if (value) {
+                counters.hits++;
+                return value;
+            }
+            counters.misses++;
+            // Baileys reads the blob next, for the upload
+            if (alias?.data && !fs.existsSync(url)) fs.writeFileSync(url, alias.data);
+            return undefined;
+        },
+        set: (baileysKey, value) => {
+            const buffer = Buffer.from(value);
+            const expiry = urlExpiry(buffer);
+            const expires = Math.min(Date.now() + ttlMs, expiry ? expiry - EXPIRY_MARGIN_MS : Infinity);
+            put(resolveKey(baileysKey).key, buffer, expires);
+            counters.uploads++;
+            changed();
+        },
+        del: (baileysKey) => {
+            remove(resolveKey(baileysKey).key);
+            changed();
+        },
+        flushAll: () => {
+            entries.clear();
+            bytes = 0;
+            changed();
+        }
+    };
+
+    const alias = (url, key, data) => {
+        const existing = aliases.get(url);
+        if (existing) existing.refs++;
+        else aliases.set(url, { key, refs: 1, data });
+    };
+
+    const unalias = (url) => {
+        const existing = aliases.get(url);
+        if (existing && --existing.refs === 0) aliases.delete(url);
+        return existing?.refs === 0;
+    };
+
+    // Points the message's media at something Baileys can key on; returns what
+    // send() needs, or null when it isn't cacheable (streams, data: urls)
+    const prepare = async (content) => {
+        const mediaType = MEDIA_KEYS.find((type) => content && type in content);
+        if (!mediaType) return null;
+        const media = content[mediaType];
+
+        if (Buffer.isBuffer(media)) {
+            const key = `sha256:${crypto.createHash('sha256').update(media).digest('hex')}`;
+            const blob = path.join(blobs, key.slice(7));
+            alias(blob, key, media);
+            content[mediaType] = { url: blob };
+            return { mediaType, key, url: blob, blob };
+        }
+
+        const url = typeof media?.url === 'string' ? media.url : media?.url?.toString();
+        if (!url || url.startsWith('data:')) return null;
+        if (/^https?:\/\//.test(url)) return { mediaType, key: url, url: null };
+        const key = `sha256:${await sha256File(url)}`;
+        alias(url, key);
+        return { mediaType, key, url };
+    };
+
+    // Runs doSend(), a sendMessage with `content`, through the cache
+    const send = async (content, doSend) => {
+        const prepared = await prepare(content);
+        if (!prepared) return doSend();
+        const key = `${prepared.mediaType}:${prepared.key}`;
+        let finish = null;
+        try {
+            while (!fresh(key) && uploading.has(key)) {
+                counters.joined++;
+                await uploading.get(key);
+            }
+            if (!fresh(key)) uploading.set(key, new Promise((resolve) => { finish = resolve; }));
+            return await doSend();
+        } finally {
+            if (finish) {
+                uploading.delete(key);
+                finish();
+            }
+            if (prepared.url && unalias(prepared.url) && prepared.blob) {
+                fs.rmSync(prepared.blob, { force: true });
+            }
+        }
+    };
+
+    const stats = () => {
+        const lookups = counters.hits + counters.misses;
+        return {
+            entries: entries.size,
+            bytes,
+            ...counters,
+            hit_rate: lookups ? Math.round((counters.hits / lookups) * 1000) / 1000 : null
+        };
+    };
+
+    const close = () => {
+        if (snapshotTimer) writeSnapshot();
+    };
+
+    return { store, send, stats, close };
+};
+
+module.exports = { makeMediaCache, sha256File };
@@ -0,0 +1,259 @@
+// Disk-backed chat / contact / message store, the SQLite counterpart of
+// Baileys' makeInMemoryStore. Records are kept as BufferJSON text with the
+// fields we query on broken out into indexed columns, so memory use doesn't
+// grow with the account's history.
+const fs = require('fs');
+const path = require('path');
+const { BufferJSON, jidNormalizedUser, proto, toNumber, updateMessageWithReaction, updateMessageWithReceipt } = require('./vendor/baileys-main/lib/index');
+const { openDatabase, transaction } = require('./sqlite');
+
+const SCHEMA = `
+    CREATE TABLE IF NOT EXISTS messages (
+        seq INTEGER PRIMARY KEY,
+        jid TEXT NOT NULL,
+        id TEXT NOT NULL,
+        from_me INTEGER NOT NULL,
+        sender TEXT,
+        timestamp INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        UNIQUE (jid, id)
+    );
+    CREATE INDEX IF NOT EXISTS messages_by_time ON messages (jid, timestamp);
+    CREATE INDEX IF NOT EXISTS messages_by_id ON messages (id);
+    CREATE INDEX IF NOT EXISTS messages_by_sender ON messages (sender, timestamp);
+    CREATE TABLE IF NOT EXISTS chats (
+        jid TEXT PRIMARY KEY,
+        unread_count INTEGER NOT NULL,
+        timestamp INTEGER NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS chats_by_time ON chats (timestamp);
+    CREATE TABLE IF NOT EXISTS contacts (
+        id TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    );
+`;
+
+const MAX_LIMIT = 1000;
+
+const encode = (value) => JSON.stringify(value, BufferJSON.replacer);
+const decode = (row) => (row ? JSON.parse(row.data, BufferJSON.reviver) : null);
+const clampLimit = (limit, fallback) => Math.min(Math.max(1, limit || fallback), MAX_LIMIT);
+
+const openMessageStore = (file, logger) => {
+    fs.mkdirSync(path.dirname(file), { recursive: true });
+    const db = openDatabase(file, SCHEMA, 'message_store');
+
+    const stmt = {
+        upsertMessage: db.prepare(`
+            INSERT INTO messages (jid, id, from_me, sender, timestamp, data) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (jid, id) DO UPDATE SET sender = excluded.sender, timestamp = excluded.timestamp, data = excluded.data
+        `),
+        updateMessage: db.prepare('UPDATE messages SET data = ? WHERE jid = ? AND id = ?'),
+        getMessage: db.prepare('SELECT data FROM messages WHERE jid = ? AND id = ?'),
+        getMessageById: db.prepare('SELECT data FROM messages WHERE id = ? ORDER BY timestamp DESC LIMIT 1'),
+        cursor: db.prepare('SELECT timestamp, seq FROM messages WHERE jid = ? AND id = ?'),
+        cursorById: db.prepare('SELECT timestamp, seq FROM messages WHERE id = ? ORDER BY timestamp DESC LIMIT 1'),
+        deleteMessage: db.prepare('DELETE FROM messages WHERE jid = ? AND id = ?'),
+        clearChatMessages: db.prepare('DELETE FROM messages WHERE jid = ?'),
+        getChat: db.prepare('SELECT data FROM chats WHERE jid = ?'),
+        upsertChat: db.prepare(`
+            INSERT INTO chats (jid, unread_count, timestamp, data) VALUES (?, ?, ?, ?)
+            ON CONFLICT (jid) DO UPDATE SET unread_count = excluded.unread_count, timestamp = excluded.timestamp, data = excluded.data
+        `),
+        deleteChat: db.prepare('DELETE FROM chats WHERE jid = ?'),
+        getContact: db.prepare('SELECT data FROM contacts WHERE id = ?'),
+        upsertContact: db.prepare('INSERT OR REPLACE INTO contacts (id, data) VALUES (?, ?)'),
+        unreadOf: db.prepare('SELECT unread_count FROM chats WHERE jid = ?'),
+        unread: db.prepare('SELECT jid, unread_count FROM chats WHERE unread_count > 0')
+    };
+
+    // Returns the chat jid, or null for messages without a usable key
+    const putMessage = (msg) => {
+        const { key } = msg;
+        if (!key?.remoteJid || !key.id) return null;
+        const jid = jidNormalizedUser(key.remoteJid);
+        const sender = key.fromMe ? null : jidNormalizedUser(key.participant || key.remoteJid);
+        stmt.upsertMessage.run(jid, key.id, key.fromMe ? 1 : 0, sender, toNumber(msg.messageTimestamp) || 0, encode(msg));
+        return jid;
+    };
+
+    const putChat = (chat) => {
+        stmt.upsertChat.run(chat.id, chat.unreadCount || 0, toNumber(chat.conversationTimestamp) || 0, encode(chat));
+    };
+
+    const putContact = (contact) => {
+        const existing = decode(stmt.getContact.get(contact.id));
+        stmt.upsertContact.run(contact.id, encode(existing ? { ...existing, ...contact } : contact));
+    };
+
+    // Read-modify-write of a stored message, updates for unknown messages are dropped
+    const patchMessage = (key, change) => {
+        const jid = jidNormalizedUser(key.remoteJid);
+        const msg = decode(stmt.getMessage.get(jid, key.id));
+        if (!msg) return;
+        change(msg);
+        stmt.updateMessage.run(encode(msg), jid, key.id);
+    };
+
+    // History records never overwrite chats we already know
+    const putHistory = ({ chats, contacts, messages }) => {
+        for (const chat of chats) {
+            if (!stmt.getChat.get(chat.id)) putChat(chat);
+        }
+        contacts.forEach(putContact);
+        messages.forEach(putMessage);
+    };
+
+    const bind = (ev) => {
+        ev.on('messaging-history.set', (history) => {
+            transaction(db, () => {
+                if (history.isLatest) db.exec('DELETE FROM chats; DELETE FROM messages;');
+                putHistory(history);
+            });
+            logger?.debug({ chats: history.chats.length, messages: history.messages.length }, 'stored history');
+        });
+
+        ev.on('messages.upsert', ({ messages, type }) => {
+            if (type !== 'append' && type !== 'notify') return;
+            transaction(db, () => {
+                for (const msg of messages) {
+                    const jid = putMessage(msg);
+                    // Unread counts come from chats.update, which Baileys only
+                    // increments for messages from others
+                    if (type === 'notify' && jid && !stmt.getChat.get(jid)) {
+                        putChat({ id: jid, conversationTimestamp: toNumber(msg.messageTimestamp), unreadCount: 0 });
+                    }
+                }
+            });
+        });
+
+        ev.on('messages.update', (updates) => transaction(db, () => {
+            for (const { key, update } of updates) {
+                patchMessage(key, (msg) => {
+                    const change = { ...update };
+                    // Receipts can arrive out of order, never move the status backwards
+                    if (change.status && msg.status && change.status <= msg.status) delete change.status;
+                    Object.assign(msg, change);
+                });
+            }
+        }));
+
+        ev.on('messages.delete', (item) => {
+            if ('all' in item) {
+                stmt.clearChatMessages.run(jidNormalizedUser(item.jid));
+                return;
+            }
+            transaction(db, () => {
+                for (const key of item.keys) stmt.deleteMessage.run(jidNormalizedUser(key.remoteJid), key.id);
+            });
+        });
+
+        ev.on('messages.reaction', (reactions) => transaction(db, () => {
+            for (const { key, reaction } of reactions) patchMessage(key, (msg) => updateMessageWithReaction(msg, reaction));
+        }));
+
+        ev.on('message-receipt.update', (updates) => transaction(db, () => {
+            for (const { key, receipt } of updates) patchMessage(key, (msg) => updateMessageWithReceipt(msg, receipt));
+        }));
+
+        ev.on('chats.upsert', (chats) => transaction(db, () => {
+            for (const chat of chats) {
+                const existing = decode(stmt.getChat.get(chat.id));
+                putChat(existing ? { ...existing, ...chat } : chat);
+            }
+        }));
+
+        ev.on('chats.update', (updates) => transaction(db, () => {
+            for (const update of updates) {
+                // Buffered, a new chat's first update comes before its messages.upsert
+                const chat = decode(stmt.getChat.get(update.id)) || { id: update.id, unreadCount: 0 };
+                // The messages it carries are stored by messages.upsert
+                const { messages, ...change } = update;
+                // A positive unreadCount is an increment, anything else replaces it
+                if (change.unreadCount > 0) change.unreadCount = (chat.unreadCount || 0) + change.unreadCount;
+                putChat(Object.assign(chat, change));
+            }
+        }));
+
+        ev.on('chats.delete', (jids) => transaction(db, () => {
+            for (const jid of jids) stmt.deleteChat.run(jid);
+        }));
+
+        ev.on('contacts.upsert', (contacts) => transaction(db, () => contacts.forEach(putContact)));
+
+        ev.on('contacts.update', (updates) => transaction(db, () => {
+            for (const update of updates) {
+                if (stmt.getContact.get(update.id)) putContact(update);
+            }
+        }));
+    };
+
+    const pageQueries = new Map();
+    const pageQuery = (where) => {
+        let query = pageQueries.get(where);
+        if (!query) {
+            query = db.prepare(`SELECT data FROM messages WHERE ${where} ORDER BY timestamp DESC, seq DESC LIMIT ?`);
+            pageQueries.set(where, query);
+        }
+        return query;
+    };
+
+    // Newest first, `before` is the id of the oldest message the caller already has
+    const messages = ({ jid, sender, limit, before } = {}) => {
+        if (!jid && !sender) throw new Error('messages() needs a jid or a sender');
+        const where = [];
+        const params = [];
+        if (jid) {
+            where.push('jid = ?');
+            params.push(jidNormalizedUser(jid));
+        }
+        if (sender) {
+            where.push('sender = ?');
+            params.push(jidNormalizedUser(sender));
+        }
+        if (before) {
+            const cursor = jid ? stmt.cursor.get(jidNormalizedUser(jid), before) : stmt.cursorById.get(before);
+            if (!cursor) throw new Error(`Unknown cursor message ${before}`);
+            where.push('(timestamp, seq) < (?, ?)');
+            params.push(cursor.timestamp, cursor.seq);
+        }
+        params.push(clampLimit(limit, 25));
+        return pageQuery(where.join(' AND ')).all(...params).map(decode);
+    };
+
+    const message = ({ id, jid } = {}) => decode(
+        jid ? stmt.getMessage.get(jidNormalizedUser(jid), id) : stmt.getMessageById.get(id)
+    );
+
+    const chats = ({ limit, offset } = {}) => db
+        .prepare('SELECT data FROM chats ORDER BY timestamp DESC LIMIT ? OFFSET ?')
+        .all(clampLimit(limit, 50), offset || 0)
+        .map(decode);
+
+    const unread = ({ jid } = {}) => {
+        if (jid) return stmt.unreadOf.get(jidNormalizedUser(jid))?.unread_count || 0;
+        const counts = {};
+        for (const row of stmt.unread.all()) counts[row.jid] = row.unread_count;
+        return counts;
+    };
+
+    const contact = ({ id } = {}) => decode(stmt.getContact.get(id));
+
+    return {
+        bind,
+        // One chunk of a streamed history sync
+        ingest: (history) => transaction(db, () => putHistory(history)),
+        // Read-only operations exposed to Python through STORE
+        queries: { messages, message, chats, unread, contact },
+        // For socket config getMessage: resend payloads on retry receipts. Made a
+        // proto.Message again, as revived JSON re-encodes its enums as 0
+        getMessage: (key) => {
+            const msg = message({ id: key.id, jid: key.remoteJid })?.message;
+            return msg ? proto.Message.fromObject(msg) : undefined;
+        },
+        close: () => db.close()
+    };
+};
+
+module.exports = { openMessageStore };
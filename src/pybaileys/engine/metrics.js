@@ -0,0 +1,71 @@
+// Engine side of client metrics (BaileysClient(metrics=True)). Every request
+// is clocked from the moment its frame arrives; the RESPONSE / ERROR frame
+// answering it carries `timing: {node, whatsapp}` in ms, where `whatsapp` is the
+// time spent inside the socket call and `node` everything else the engine did.
+// The client subtracts both from its own round trip to get the IPC share.
+const { performance, monitorEventLoopDelay } = require('perf_hooks');
+
+// Sampling interval of the event loop delay histogram, which also counts it
+const LOOP_RESOLUTION_MS = 10;
+
+const makeMetrics = () => {
+    const inFlight = new Map();
+    const frames = { in: { count: 0, bytes: 0 }, out: {} };
+    const loopDelay = monitorEventLoopDelay({ resolution: LOOP_RESOLUTION_MS });
+    loopDelay.enable();
+
+    const received = (id, bytes) => {
+        frames.in.count++;
+        frames.in.bytes += bytes;
+        if (id) inFlight.set(id, { start: performance.now(), whatsapp: 0 });
+    };
+
+    // Times fn(), the socket call of request `id`
+    const timeCall = async (id, fn) => {
+        const started = performance.now();
+        try {
+            return await fn();
+        } finally {
+            const clock = inFlight.get(id);
+            if (clock) clock.whatsapp += performance.now() - started;
+        }
+    };
+
+    const sent = (frame, bytes) => {
+        const counter = frames.out[frame.type] || (frames.out[frame.type] = { count: 0, bytes: 0 });
+        counter.count++;
+        counter.bytes += bytes;
+    };
+
+    // Stops the clock of request `id`; undefined when it was not clocked
+    const finish = (id) => {
+        const clock = inFlight.get(id);
+        if (!clock) return undefined;
+        inFlight.delete(id);
+        const total = performance.now() - clock.start;
+        return { node: total - clock.whatsapp, whatsapp: clock.whatsapp };
+    };
+
+    const snapshot = () => {
+        const ms = (ns) => Math.max(0, Math.round(ns / 1e4 - LOOP_RESOLUTION_MS * 100) / 100);
+        const memory = process.memoryUsage();
+        return {
+            frames,
+            requests_in_flight: inFlight.size,
+            event_loop_delay_ms: {
+                mean: ms(loopDelay.mean),
+                p50: ms(loopDelay.percentile(50)),
+                p99: ms(loopDelay.percentile(99)),
+                max: ms(loopDelay.max)
+            },
+            memory_mb: {
+                rss: Math.round(memory.rss / 1048576),
+                heap_used: Math.round(memory.heapUsed / 1048576)
+            }
+        };
+    };
+
+    return { received, timeCall, sent, finish, snapshot };
+};
+
+module.exports = { makeMetrics };
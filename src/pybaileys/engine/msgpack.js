@@ -0,0 +1,229 @@
+// Minimal MessagePack codec for the Python <-> bridge wire format.
+// Buffers travel as bin, BigInt / Long as 64-bit ints, protobuf messages as
+// plain maps (so their bytes fields stay binary instead of base64).
+
+class Encoder {
+    constructor(size = 64 * 1024) {
+        this.initialSize = size;
+        this.buf = Buffer.allocUnsafe(size);
+        this.pos = 0;
+    }
+
+    ensure(n) {
+        if (this.pos + n <= this.buf.length) return;
+        let size = this.buf.length * 2;
+        while (size < this.pos + n) size *= 2;
+        const next = Buffer.allocUnsafe(size);
+        this.buf.copy(next, 0, 0, this.pos);
+        this.buf = next;
+    }
+
+    u8(v) { this.ensure(1); this.buf[this.pos++] = v; }
+    u16(v) { this.ensure(2); this.buf.writeUInt16BE(v, this.pos); this.pos += 2; }
+    u32(v) { this.ensure(4); this.buf.writeUInt32BE(v, this.pos); this.pos += 4; }
+
+    encode(value) {
+        this.pos = 0;
+        this.write(value);
+        const out = Buffer.from(this.buf.subarray(0, this.pos));
+        // Don't keep a huge scratch buffer around after one large media frame
+        if (this.buf.length > 16 * this.initialSize) this.buf = Buffer.allocUnsafe(this.initialSize);
+        return out;
+    }
+
+    write(value) {
+        switch (typeof value) {
+            case 'undefined': return this.u8(0xc0);
+            case 'boolean': return this.u8(value ? 0xc3 : 0xc2);
+            case 'number': return this.number(value);
+            case 'bigint': return this.bigint(value);
+            case 'string': return this.string(value);
+            case 'object': return this.object(value);
+            default: return this.u8(0xc0); // functions, symbols
+        }
+    }
+
+    number(v) {
+        if (!Number.isInteger(v) || !Number.isSafeInteger(v)) {
+            this.ensure(9);
+            this.buf[this.pos++] = 0xcb;
+            this.buf.writeDoubleBE(v, this.pos);
+            this.pos += 8;
+            return;
+        }
+        if (v >= 0) {
+            if (v < 0x80) return this.u8(v);
+            if (v < 0x100) { this.u8(0xcc); return this.u8(v); }
+            if (v < 0x10000) { this.u8(0xcd); return this.u16(v); }
+            if (v < 0x100000000) { this.u8(0xce); return this.u32(v); }
+            return this.bigint(BigInt(v));
+        }
+        if (v >= -0x20) return this.u8(v & 0xff);
+        if (v >= -0x80) { this.ensure(2); this.buf[this.pos++] = 0xd0; this.buf.writeInt8(v, this.pos); this.pos += 1; return; }
+        if (v >= -0x8000) { this.ensure(3); this.buf[this.pos++] = 0xd1; this.buf.writeInt16BE(v, this.pos); this.pos += 2; return; }
+        if (v >= -0x80000000) { this.ensure(5); this.buf[this.pos++] = 0xd2; this.buf.writeInt32BE(v, this.pos); this.pos += 4; return; }
+        return this.bigint(BigInt(v));
+    }
+
+    bigint(v) {
+        this.ensure(9);
+        if (v >= 0n) {
+            this.buf[this.pos++] = 0xcf;
+            this.buf.writeBigUInt64BE(BigInt.asUintN(64, v), this.pos);
+        } else {
+            this.buf[this.pos++] = 0xd3;
+            this.buf.writeBigInt64BE(BigInt.asIntN(64, v), this.pos);
+        }
+        this.pos += 8;
+    }
+
+    string(v) {
+        const len = Buffer.byteLength(v);
+        if (len < 32) this.u8(0xa0 | len);
+        else if (len < 0x100) { this.u8(0xd9); this.u8(len); }
+        else if (len < 0x10000) { this.u8(0xda); this.u16(len); }
+        else { this.u8(0xdb); this.u32(len); }
+        this.ensure(len);
+        this.pos += this.buf.write(v, this.pos, len, 'utf8');
+    }
+
+    binary(v) {
+        const len = v.length;
+        if (len < 0x100) { this.u8(0xc4); this.u8(len); }
+        else if (len < 0x10000) { this.u8(0xc5); this.u16(len); }
+        else { this.u8(0xc6); this.u32(len); }
+        this.ensure(len);
+        this.buf.set(v, this.pos);
+        this.pos += len;
+    }
+
+    header(len, fix, b16, b32) {
+        if (len < 16) this.u8(fix | len);
+        else if (len < 0x10000) { this.u8(b16); this.u16(len); }
+        else { this.u8(b32); this.u32(len); }
+    }
+
+    object(v) {
+        if (v === null) return this.u8(0xc0);
+        if (v instanceof Uint8Array) return this.binary(v);
+        if (ArrayBuffer.isView(v)) return this.binary(new Uint8Array(v.buffer, v.byteOffset, v.byteLength));
+        if (v instanceof ArrayBuffer) return this.binary(new Uint8Array(v));
+        if (Array.isArray(v)) {
+            this.header(v.length, 0x90, 0xdc, 0xdd);
+            for (const item of v) this.write(item);
+            return;
+        }
+        if (isLong(v)) return this.bigint(BigInt(v.toString()));
+        if (typeof v.toJSON === 'function' && !isProtoMessage(v)) return this.write(v.toJSON());
+        if (v instanceof Map) return this.map([...v.entries()]);
+        if (v instanceof Set) return this.write([...v]);
+
+        const entries = [];
+        for (const key of Object.keys(v)) {
+            const item = v[key];
+            if (item !== undefined && typeof item !== 'function') entries.push([key, item]);
+        }
+        this.map(entries);
+    }
+
+    map(entries) {
+        this.header(entries.length, 0x80, 0xde, 0xdf);
+        for (const [key, item] of entries) {
+            this.write(typeof key === 'string' ? key : String(key));
+            this.write(item);
+        }
+    }
+}
+
+const isLong = (v) => typeof v.low === 'number' && typeof v.high === 'number' && typeof v.unsigned === 'boolean';
+
+const isProtoMessage = (v) => {
+    const ctor = v.constructor;
+    return !!ctor && typeof ctor.encode === 'function' && typeof ctor.toObject === 'function';
+};
+
+class Decoder {
+    decode(buf, reviver) {
+        this.buf = buf;
+        this.pos = 0;
+        this.reviver = reviver;
+        return this.read();
+    }
+
+    read() {
+        const b = this.buf;
+        const t = b[this.pos++];
+        if (t < 0x80) return t;
+        if (t < 0x90) return this.readMap(t & 0x0f);
+        if (t < 0xa0) return this.readArray(t & 0x0f);
+        if (t < 0xc0) return this.readString(t & 0x1f);
+        if (t >= 0xe0) return t - 0x100;
+        let v;
+        switch (t) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: v = b[this.pos]; this.pos += 1; return this.readBinary(v);
+            case 0xc5: v = b.readUInt16BE(this.pos); this.pos += 2; return this.readBinary(v);
+            case 0xc6: v = b.readUInt32BE(this.pos); this.pos += 4; return this.readBinary(v);
+            case 0xca: v = b.readFloatBE(this.pos); this.pos += 4; return v;
+            case 0xcb: v = b.readDoubleBE(this.pos); this.pos += 8; return v;
+            case 0xcc: return b[this.pos++];
+            case 0xcd: v = b.readUInt16BE(this.pos); this.pos += 2; return v;
+            case 0xce: v = b.readUInt32BE(this.pos); this.pos += 4; return v;
+            case 0xcf: v = b.readBigUInt64BE(this.pos); this.pos += 8; return toNumber(v);
+            case 0xd0: v = b.readInt8(this.pos); this.pos += 1; return v;
+            case 0xd1: v = b.readInt16BE(this.pos); this.pos += 2; return v;
+            case 0xd2: v = b.readInt32BE(this.pos); this.pos += 4; return v;
+            case 0xd3: v = b.readBigInt64BE(this.pos); this.pos += 8; return toNumber(v);
+            case 0xd9: v = b[this.pos]; this.pos += 1; return this.readString(v);
+            case 0xda: v = b.readUInt16BE(this.pos); this.pos += 2; return this.readString(v);
+            case 0xdb: v = b.readUInt32BE(this.pos); this.pos += 4; return this.readString(v);
+            case 0xdc: v = b.readUInt16BE(this.pos); this.pos += 2; return this.readArray(v);
+            case 0xdd: v = b.readUInt32BE(this.pos); this.pos += 4; return this.readArray(v);
+            case 0xde: v = b.readUInt16BE(this.pos); this.pos += 2; return this.readMap(v);
+            case 0xdf: v = b.readUInt32BE(this.pos); this.pos += 4; return this.readMap(v);
+            default: throw new Error(`Unsupported msgpack type 0x${t.toString(16)}`);
+        }
+    }
+
+    readString(len) {
+        const v = this.buf.toString('utf8', this.pos, this.pos + len);
+        this.pos += len;
+        return v;
+    }
+
+    readBinary(len) {
+        // Copy so the frame buffer can be released independently
+        const v = Buffer.from(this.buf.subarray(this.pos, this.pos + len));
+        this.pos += len;
+        return v;
+    }
+
+    readArray(len) {
+        const v = new Array(len);
+        for (let i = 0; i < len; i++) v[i] = this.read();
+        return v;
+    }
+
+    readMap(len) {
+        const v = {};
+        for (let i = 0; i < len; i++) {
+            const key = this.read();
+            v[key] = this.read();
+        }
+        return this.reviver ? this.reviver(v) : v;
+    }
+}
+
+const toNumber = (v) => (v <= BigInt(Number.MAX_SAFE_INTEGER) && v >= BigInt(Number.MIN_SAFE_INTEGER) ? Number(v) : v);
+
+const encoder = new Encoder();
+const decoder = new Decoder();
+
+module.exports = {
+    encode: (value) => encoder.encode(value),
+    decode: (buf, reviver) => decoder.decode(buf, reviver),
+    Encoder,
+    Decoder
+};
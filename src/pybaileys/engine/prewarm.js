@@ -0,0 +1,39 @@
+// Resolves device lists and signal sessions for many users ahead of a
+// broadcast. Baileys does both lazily per message (getUSyncDevices, then
+// assertSessions fetching pre-keys for devices without a session); here they
+// run once per batch of users: one USync query for the devices missing from
+// userDevicesCache, and one pre-key query for the devices missing a session.
+const { jidDecode, jidNormalizedUser, isJidUser, isLidUser } = require('./vendor/baileys-main/lib/index');
+
+const prewarm = async (sock, jids, { batchSize = 500, logger } = {}) => {
+    const report = { warmed: [], failed: {}, devices: 0 };
+    const meId = sock.authState.creds.me?.id;
+    if (!meId) throw new Error('Not logged in');
+
+    const users = [];
+    for (const jid of new Set(jids)) {
+        if (isJidUser(jid) || isLidUser(jid)) users.push(jidNormalizedUser(jid));
+        else report.failed[jid] = 'not a user jid';
+    }
+
+    for (let i = 0; i < users.length; i += batchSize) {
+        const batch = [...new Set(users.slice(i, i + batchSize))];
+        try {
+            const devices = await sock.getUSyncDevices(batch, true, false);
+            const found = new Set(devices.map((d) => d.user));
+            const wireJids = devices.map((d) => d.wireJid).filter((jid) => jid !== meId);
+            if (wireJids.length) await sock.assertSessions(wireJids, false);
+            report.devices += wireJids.length;
+            for (const jid of batch) {
+                if (found.has(jidDecode(jid).user)) report.warmed.push(jid);
+                else report.failed[jid] = 'no devices';
+            }
+        } catch (err) {
+            logger?.warn({ err, users: batch.length }, 'prewarm batch failed');
+            for (const jid of batch) report.failed[jid] = err.message;
+        }
+    }
+    return report;
+};
+
+module.exports = { prewarm };
@@ -0,0 +1,85 @@
+// Offline stand-in for a Baileys socket, used by benchmarks/replay.py. With
+// PYBAILEYS_REPLAY pointing at an event capture (captureEventStream's NDJSON,
+// one {timestamp, event, data} per line; see PYBAILEYS_CAPTURE_EVENTS), INIT
+// builds this instead of connecting to WhatsApp. The capture is replayed into
+// sock.ev at `speed` times its recorded pace (0: as fast as possible), then
+// 'replay.done' is emitted. Every socket call resolves after `latencyMs` with
+// a canned result.
+const fs = require('fs');
+const readline = require('readline');
+const crypto = require('crypto');
+const { performance } = require('perf_hooks');
+const { setTimeout: sleep } = require('timers/promises');
+const { makeEventBuffer, BufferJSON } = require('./vendor/baileys-main/lib/index');
+
+const CANNED = {
+    sendMessage: (jid, content) => ({
+        key: { remoteJid: jid, fromMe: true, id: `3EB0${crypto.randomBytes(8).toString('hex').toUpperCase()}` },
+        message: content,
+        messageTimestamp: Math.floor(Date.now() / 1000),
+        status: 1
+    }),
+    onWhatsApp: (...jids) => jids.map((jid) => ({ jid, exists: true })),
+    getUSyncDevices: () => [],
+    assertSessions: () => false,
+    groupFetchAllParticipating: () => ({}),
+    groupMetadata: (jid) => ({ id: jid, subject: '', participants: [] })
+};
+
+// Never answered by the proxy: awaiting the socket or logging it must not look like a call
+const NOT_METHODS = new Set(['then', 'catch', 'finally', 'toJSON', 'inspect', 'constructor']);
+
+const replay = async (sock, file, speed) => {
+    const started = performance.now();
+    const lines = readline.createInterface({ input: fs.createReadStream(file), crlfDelay: Infinity });
+    let first = null;
+    let events = 0;
+    for await (const line of lines) {
+        if (sock.closed) break;
+        if (!line) continue;
+        const { timestamp, event, data } = JSON.parse(line, BufferJSON.reviver);
+        if (speed > 0 && timestamp) {
+            first ??= timestamp;
+            const due = (timestamp - first) / speed - (performance.now() - started);
+            if (due > 0) await sleep(due);
+        }
+        sock.ev.emit(event, data);
+        events++;
+    }
+    lines.close();
+    if (!sock.closed) sock.ev.emit('replay.done', { events, ms: Math.round(performance.now() - started) });
+};
+
+const makeReplaySocket = (config, { file, speed = 0, latencyMs = 0 }) => {
+    const { logger } = config;
+    const target = {
+        ev: makeEventBuffer(logger),
+        authState: config.auth,
+        user: { id: '0@s.whatsapp.net', name: 'replay' },
+        logger,
+        closed: false,
+        end() {
+            target.closed = true;
+        }
+    };
+
+    const call = (method) => async (...args) => {
+        if (latencyMs) await sleep(latencyMs);
+        return CANNED[method] ? CANNED[method](...args) : null;
+    };
+    const sock = new Proxy(target, {
+        get: (obj, prop) => {
+            if (prop in obj || typeof prop === 'symbol' || NOT_METHODS.has(prop)) return obj[prop];
+            return (obj[prop] = call(prop));
+        }
+    });
+
+    // Listeners are attached once INIT has built the session, start after that
+    setImmediate(() => {
+        sock.ev.emit('connection.update', { connection: 'open' });
+        replay(sock, file, speed).catch((err) => logger.error({ err }, 'event replay failed'));
+    });
+    return sock;
+};
+
+module.exports = { makeReplaySocket };
@@ -0,0 +1,198 @@
+// Outbound send queue. Messages to the same chat run one at a time in the
+// order they were queued; lanes decide which chat goes next ('high' before
+// 'normal' before 'bulk', round robin within a lane), and token buckets pace
+// sends globally and per chat when a rate is configured (unlimited otherwise). A chat takes the lane of its most urgent queued
+// message, so a reply is not stuck behind a broadcast to someone else, but
+// never overtakes earlier messages to its own chat.
+const { LRUCache } = require('./cache');
+
+const LANES = ['high', 'normal', 'bulk'];
+// Chats whose devices Baileys resolves through userDevicesCache
+const DEVICE_JID = /@(s\.whatsapp\.net|lid)$/;
+
+// `rate` tokens per second up to `burst`; no rate means unlimited
+class TokenBucket {
+    constructor(rate, burst) {
+        this.rate = rate || 0;
+        this.burst = Math.max(1, burst || rate || 1);
+        this.tokens = this.burst;
+        this.updated = Date.now();
+    }
+
+    // Milliseconds until a token is available, 0 when one can be taken now
+    wait(now) {
+        if (!this.rate) return 0;
+        this.tokens = Math.min(this.burst, this.tokens + ((now - this.updated) * this.rate) / 1000);
+        this.updated = now;
+        return this.tokens >= 1 ? 0 : Math.ceil(((1 - this.tokens) * 1000) / this.rate);
+    }
+
+    take() {
+        if (this.rate) this.tokens -= 1;
+    }
+}
+
+const makeSendScheduler = (opts = {}, { send, prefetch, logger }) => {
+    const {
+        rate = 0,
+        burst = rate,
+        jid_rate: jidRate = 0,
+        jid_burst: jidBurst = 5,
+        concurrency = 8
+    } = opts;
+
+    const global = new TokenBucket(rate, burst);
+    // jid -> { jid, queue, bucket, busy, lane }
+    const chats = new Map();
+    // Waiting chats per lane, in the order they became ready
+    const lanes = LANES.map(() => new Set());
+    // Buckets of idle chats, so a chat can't dodge its rate by draining its queue
+    const idleBuckets = new LRUCache({ max: 10000 });
+    const depth = Object.fromEntries(LANES.map((lane) => [lane, 0]));
+    const counters = { sent: 0, failed: 0, wait_ms: 0 };
+    let inFlight = 0;
+    let timer = null;
+    let closed = false;
+
+    // Every chat queued in the same tick shares one device lookup: cached users
+    // come from one userDevicesCache.mget, the rest from a single USync query
+    let pendingDevices = new Set();
+    let devicesBatch = null;
+    const requestDevices = (jid) => {
+        if (!prefetch || !DEVICE_JID.test(jid)) return null;
+        pendingDevices.add(jid);
+        if (!devicesBatch) {
+            devicesBatch = new Promise((resolve) => setImmediate(resolve))
+                .then(() => {
+                    const jids = [...pendingDevices];
+                    pendingDevices = new Set();
+                    devicesBatch = null;
+                    return prefetch(jids);
+                })
+                .catch((err) => logger?.debug({ err }, 'device prefetch failed'));
+        }
+        return devicesBatch;
+    };
+
+    const laneOf = (chat) => Math.min(...chat.queue.map((job) => job.lane));
+
+    const schedule = (chat) => {
+        chat.lane = laneOf(chat);
+        lanes[chat.lane].add(chat.jid);
+    };
+
+    const nextChat = (now) => {
+        let wait = Infinity;
+        for (const lane of lanes) {
+            for (const jid of lane) {
+                const chat = chats.get(jid);
+                const chatWait = chat.bucket.wait(now);
+                if (!chatWait) return { chat };
+                wait = Math.min(wait, chatWait);
+            }
+        }
+        return { wait };
+    };
+
+    const run = async (chat, job) => {
+        const started = Date.now();
+        try {
+            await job.ready;
+            job.onDispatch?.();
+            const result = await send(chat.jid, ...job.args);
+            counters.sent++;
+            counters.wait_ms += started - job.queued;
+            job.resolve(result);
+        } catch (err) {
+            counters.failed++;
+            job.reject(err);
+        } finally {
+            inFlight--;
+            chat.busy = false;
+            if (closed) return;
+            if (chat.queue.length) {
+                schedule(chat);
+            } else {
+                chats.delete(chat.jid);
+                idleBuckets.set(chat.jid, chat.bucket);
+            }
+            pump();
+        }
+    };
+
+    const pump = () => {
+        clearTimeout(timer);
+        timer = null;
+        let wait = Infinity;
+        while (inFlight < concurrency) {
+            const now = Date.now();
+            const globalWait = global.wait(now);
+            if (globalWait) {
+                wait = globalWait;
+                break;
+            }
+            const next = nextChat(now);
+            if (!next.chat) {
+                wait = next.wait;
+                break;
+            }
+            const { chat } = next;
+            lanes[chat.lane].delete(chat.jid);
+            const job = chat.queue.shift();
+            depth[LANES[job.lane]]--;
+            chat.busy = true;
+            global.take();
+            chat.bucket.take();
+            inFlight++;
+            run(chat, job);
+        }
+        if (wait !== Infinity) timer = setTimeout(pump, wait);
+    };
+
+    // onDispatch is called when the message leaves the queue to be sent
+    const enqueue = (jid, args, priority = 'normal', onDispatch) => new Promise((resolve, reject) => {
+        if (closed) return reject(new Error('Send queue closed'));
+        const lane = LANES.indexOf(priority);
+        if (lane < 0) return reject(new Error(`Unknown send priority ${priority}`));
+        let chat = chats.get(jid);
+        if (!chat) {
+            chat = { jid, queue: [], bucket: idleBuckets.get(jid) || new TokenBucket(jidRate, jidBurst), busy: false, lane };
+            idleBuckets.delete(jid);
+            chats.set(jid, chat);
+        }
+        chat.queue.push({ args, lane, resolve, reject, onDispatch, queued: Date.now(), ready: requestDevices(jid) });
+        depth[priority]++;
+        if (!chat.busy) {
+            lanes[chat.lane].delete(jid);
+            schedule(chat);
+        }
+        pump();
+    });
+
+    // Rejects everything still queued, sends already running finish
+    const close = () => {
+        closed = true;
+        clearTimeout(timer);
+        const error = new Error('Send queue closed');
+        for (const chat of chats.values()) {
+            for (const job of chat.queue.splice(0)) job.reject(error);
+        }
+        chats.clear();
+        lanes.forEach((lane) => lane.clear());
+        for (const lane of LANES) depth[lane] = 0;
+    };
+
+    const stats = () => ({
+        queued: LANES.reduce((sum, lane) => sum + depth[lane], 0),
+        lanes: { ...depth },
+        in_flight: inFlight,
+        chats: chats.size,
+        sent: counters.sent,
+        failed: counters.failed,
+        avg_wait_ms: counters.sent ? Math.round(counters.wait_ms / counters.sent) : 0
+    });
+
+    return { enqueue, close, stats };
+};
+
+module.exports = { makeSendScheduler };
@@ -0,0 +1,31 @@
+// Shared helpers for the engine's SQLite files, built on node:sqlite (Node.js 22.13+;
+// 22.5-22.12 only have it behind --experimental-sqlite)
+const openDatabase = (file, schema, feature) => {
+    let DatabaseSync;
+    try {
+        ({ DatabaseSync } = require('node:sqlite'));
+    } catch {
+        throw new Error(`${feature} needs Node.js 22.13+ (node:sqlite), running ${process.versions.node}`);
+    }
+    const db = new DatabaseSync(file);
+    db.exec(`
+        PRAGMA journal_mode = WAL;
+        PRAGMA synchronous = NORMAL;
+        ${schema}
+    `);
+    return db;
+};
+
+const transaction = (db, work) => {
+    db.exec('BEGIN');
+    try {
+        const result = work();
+        db.exec('COMMIT');
+        return result;
+    } catch (err) {
+        db.exec('ROLLBACK');
+        throw err;
+    }
+};
+
+module.exports = { openDatabase, transaction };
@@ -0,0 +1,27 @@
+// Worker thread of engine/thumbnails.js: makes one thumbnail at a time with
+// Baileys' own functions, so results match what it would make inline.
+const { parentPort } = require('worker_threads');
+const media = require('./vendor/baileys-main/lib/Utils/messages-media');
+
+// Buffers arrive as plain Uint8Arrays
+const asBuffer = (file) => (file instanceof Uint8Array && !Buffer.isBuffer(file)
+    ? Buffer.from(file.buffer, file.byteOffset, file.byteLength)
+    : file);
+
+const TASKS = {
+    // generateThumbnail(file, mediaType) for an image or video being sent
+    generate: ({ file, mediaType }) => media.generateThumbnail(asBuffer(file), mediaType),
+    // extractImageThumb(image, width, quality), used for link preview images
+    extract: async ({ file, width, quality }) => {
+        const { buffer, original } = await media.extractImageThumb(asBuffer(file), width, quality);
+        return { buffer, original };
+    }
+};
+
+parentPort.on('message', async ({ task, args }) => {
+    try {
+        parentPort.postMessage({ result: await TASKS[task](args) });
+    } catch (err) {
+        parentPort.postMessage({ error: err.message || String(err) });
+    }
+});
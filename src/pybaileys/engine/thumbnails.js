@@ -0,0 +1,147 @@
+// Thumbnails made off the main thread. Baileys makes them inline while it
+// prepares a media message (sharp or jimp for images, ffmpeg for videos) and
+// for link preview images, on the event loop that also decrypts messages and
+// answers keep-alives. installThumbnails() points its generateThumbnail and
+// extractImageThumb at a bounded pool of worker threads instead. Results are
+// cached by content hash, and a thumbnail already being made is waited for,
+// so media sent to many chats is thumbnailed once.
+//
+// Baileys calls both through the messages-media exports, which is what gets
+// replaced; the pool is shared by every session of the engine.
+const path = require('path');
+const crypto = require('crypto');
+const { Readable } = require('stream');
+const { Worker } = require('worker_threads');
+const { LRUCache } = require('./cache');
+const { sha256File } = require('./media-cache');
+const media = require('./vendor/baileys-main/lib/Utils/messages-media');
+
+const WORKER_FILE = path.join(__dirname, 'thumbnail-worker.js');
+
+// Workers started on demand, up to `size`, each making one thumbnail at a time
+const makeWorkerPool = ({ size, logger }) => {
+    const idle = [];
+    const queue = [];
+    // worker -> the task it is running
+    const running = new Map();
+    const counters = { done: 0, failed: 0 };
+
+    const finish = (worker, error, result) => {
+        const task = running.get(worker);
+        running.delete(worker);
+        if (!task) return;
+        if (error) {
+            counters.failed++;
+            task.reject(new Error(error));
+        } else {
+            counters.done++;
+            task.resolve(result);
+        }
+    };
+
+    const spawn = () => {
+        const worker = new Worker(WORKER_FILE);
+        worker.on('message', ({ error, result }) => {
+            finish(worker, error, result);
+            idle.push(worker);
+            drain();
+        });
+        // A crashed worker fails its task and is replaced when one is needed
+        let failure = null;
+        worker.on('error', (err) => {
+            failure = err;
+        });
+        worker.on('exit', (code) => {
+            if (idle.includes(worker)) idle.splice(idle.indexOf(worker), 1);
+            if (running.has(worker)) {
+                logger?.warn({ err: failure, code }, 'thumbnail worker exited');
+                finish(worker, failure?.message || `thumbnail worker exited with code ${code}`);
+            }
+            drain();
+        });
+        // Idle workers don't keep the engine alive
+        worker.unref();
+        return worker;
+    };
+
+    const drain = () => {
+        while (queue.length && (idle.length || running.size < size)) {
+            const worker = idle.pop() || spawn();
+            const task = queue.shift();
+            running.set(worker, task);
+            worker.postMessage({ task: task.task, args: task.args });
+        }
+    };
+
+    const run = (task, args) => new Promise((resolve, reject) => {
+        queue.push({ task, args, resolve, reject });
+        drain();
+    });
+
+    const stats = () => ({ workers: running.size + idle.length, busy: running.size, queued: queue.length, ...counters });
+
+    return { run, stats };
+};
+
+let installed = null;
+
+const installThumbnails = ({ workers = 2, max = 500, logger } = {}) => {
+    if (installed) return installed;
+    const pool = makeWorkerPool({ size: workers, logger });
+    // content key -> thumbnail result
+    const cache = new LRUCache({ max });
+    // content key -> promise of the thumbnail being made
+    const making = new Map();
+    let joined = 0;
+
+    const cached = (key, make) => {
+        if (!key) return make();
+        const hit = cache.get(key);
+        if (hit !== undefined) return hit;
+        if (making.has(key)) {
+            joined++;
+            return making.get(key);
+        }
+        const promise = make()
+            .then((result) => {
+                cache.set(key, result);
+                return result;
+            })
+            .finally(() => making.delete(key));
+        making.set(key, promise);
+        return promise;
+    };
+
+    // Bytes or a local path as the worker takes them, and their content hash;
+    // remote URLs are fetched by the worker and not cached
+    const resolveInput = async (file) => {
+        if (file instanceof Readable) file = await media.toBuffer(file);
+        if (Buffer.isBuffer(file)) return { file, hash: crypto.createHash('sha256').update(file).digest('hex') };
+        if (typeof file === 'string' && !/^https?:\/\//.test(file)) return { file, hash: await sha256File(file) };
+        return { file: file?.toString(), hash: null };
+    };
+
+    const generateThumbnail = async (file, mediaType) => {
+        if (mediaType !== 'image' && mediaType !== 'video') return { thumbnail: undefined, originalImageDimensions: undefined };
+        const input = await resolveInput(file);
+        return cached(input.hash && `${mediaType}:${input.hash}`, () => pool.run('generate', { file: input.file, mediaType }));
+    };
+
+    const extractImageThumb = async (file, width = 32, quality = 50) => {
+        const input = await resolveInput(file);
+        const result = await cached(input.hash && `jpeg:${width}:${quality}:${input.hash}`,
+            () => pool.run('extract', { file: input.file, width, quality }));
+        // Thumbnails come back from the worker as plain Uint8Arrays
+        return { buffer: Buffer.from(result.buffer), original: result.original };
+    };
+
+    media.generateThumbnail = generateThumbnail;
+    media.extractImageThumb = extractImageThumb;
+
+    installed = {
+        stats: () => ({ ...pool.stats(), ...cache.stats(), joined, making: making.size })
+    };
+    return installed;
+};
+
+module.exports = { installThumbnails };
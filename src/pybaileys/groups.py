@@ -0,0 +1,46 @@
+import threading
+
+
+class GroupCache:
+    """Local mirror of the engine's group metadata cache (``start(group_cache=...)``).
+
+    Reads never leave the process; the engine pushes every change as it patches
+    its own copy. Values are Baileys ``GroupMetadata`` dicts:
+
+        meta = client.groups.get(jid)
+        admins = [p['id'] for p in meta['participants'] if p.get('admin')]
+    """
+
+    def __init__(self):
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def _apply(self, changes, reset=False):
+        with self._lock:
+            groups = {} if reset else dict(self._groups)
+            for jid, meta in changes.items():
+                if meta is None:
+                    groups.pop(jid, None)
+                else:
+                    groups[jid] = meta
+            # Readers hold on to the old dict, never one being modified
+            self._groups = groups
+
+    def get(self, jid, default=None):
+        return self._groups.get(jid, default)
+
+    def all(self):
+        """Every cached group's metadata."""
+        return list(self._groups.values())
+
+    def __getitem__(self, jid):
+        return self._groups[jid]
+
+    def __contains__(self, jid):
+        return jid in self._groups
+
+    def __iter__(self):
+        return iter(list(self._groups))
+
+    def __len__(self):
+        return len(self._groups)
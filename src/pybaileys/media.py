@@ -0,0 +1,62 @@
+import base64
+import os
+import shutil
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def temp_path(suffix=''):
+    fd, path = tempfile.mkstemp(prefix='pybaileys-', suffix=suffix)
+    os.close(fd)
+    return path
+
+
+class MediaFile:
+    """Hands media to the engine through the filesystem instead of the RPC frame.
+
+    ``source`` may be a path, raw bytes or a binary file object. Paths (and file
+    objects backed by a real file) are read by Node straight from disk; anything
+    else is spooled once to a temp file that the engine deletes after the call.
+
+        client.sendMessage(jid, {'video': MediaFile('clip.mp4'), 'caption': 'hi'})
+    """
+
+    def __init__(self, source):
+        self.cleanup = False
+        if isinstance(source, (str, os.PathLike)):
+            self.path = os.path.abspath(source)
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            self.path = self._spool(lambda f: f.write(source))
+        elif hasattr(source, 'read'):
+            name = getattr(source, 'name', None)
+            if isinstance(name, str) and os.path.isfile(name) and source.tell() == 0:
+                self.path = os.path.abspath(name)
+            else:
+                self.path = self._spool(lambda f: shutil.copyfileobj(source, f, CHUNK_SIZE))
+        else:
+            raise TypeError(f"Unsupported media source: {type(source).__name__}")
+
+    def _spool(self, write):
+        path = temp_path()
+        with open(path, 'wb') as f:
+            write(f)
+        self.cleanup = True
+        return path
+
+    def to_wire(self):
+        # bridge.js turns this into {url: path}, which Baileys streams with fs.createReadStream
+        return {'$file': self.path, 'cleanup': self.cleanup}
+
+
+def copy_out(path, target, chunk_size=CHUNK_SIZE):
+    """Moves a file written by the engine into ``target`` (file object) in chunks."""
+    with open(path, 'rb') as f:
+        shutil.copyfileobj(f, target, chunk_size)
+
+
+def decode_blob(data):
+    """bytes from a msgpack frame, or the base64 Buffer object bridge.js emits in JSON."""
+    if isinstance(data, dict) and data.get('type') == 'Buffer':
+        return base64.b64decode(data['data'])
+    return data
@@ -0,0 +1,215 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds of the latency histogram buckets, in ms
+BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# How a request's round trip splits: encoding it in Python, the engine's own
+# work, the socket call to WhatsApp, and what is left (transport and decoding)
+PHASES = ('total', 'serialize', 'ipc', 'node', 'whatsapp')
+
+# Commands the engine never answers, so there is no round trip to time
+NO_REPLY = frozenset({'SUBSCRIBE', 'HOOK_RESULT', 'STREAM_ACK', 'STREAM_CANCEL'})
+
+# Requests that never got an answer (timed out) are forgotten past this many
+MAX_IN_FLIGHT = 10000
+
+
+def rpc_label(payload):
+    cmd = payload.get('cmd')
+    if cmd == 'CALL':
+        return payload.get('method')
+    if cmd == 'STATIC_CALL':
+        return f"utils.{payload.get('method')}"
+    return cmd
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+
+    def snapshot(self):
+        buckets, cumulative = {}, 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            cumulative += n
+            buckets[bound] = cumulative
+        return {'count': self.count, 'sum_ms': round(self.sum, 3), 'buckets': buckets}
+
+
+class ClientMetrics:
+    """Python side of ``BaileysClient(metrics=True)``.
+
+    Fed by the client's frame encoder and reader; every request is timed from
+    the start of its encoding to the decoded RESPONSE / ERROR, then split into
+    PHASES with the engine's ``timing`` from that frame.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._rpc = {}
+        self._events = {}
+        self._frames = {'sent': [0, 0], 'received': [0, 0]}
+
+    def sent(self, payload, frame, started):
+        serialize = (time.perf_counter() - started) * 1000
+        with self._lock:
+            counter = self._frames['sent']
+            counter[0] += 1
+            counter[1] += len(frame)
+            if payload.get('cmd') in NO_REPLY or 'id' not in payload:
+                return
+            if len(self._in_flight) >= MAX_IN_FLIGHT:
+                self._in_flight.pop(next(iter(self._in_flight)))
+            self._in_flight[payload['id']] = (rpc_label(payload), started, serialize)
+
+    def received(self, data, size):
+        msg_type = data.get('type')
+        with self._lock:
+            counter = self._frames['received']
+            counter[0] += 1
+            counter[1] += size
+            if msg_type == 'EVENT':
+                event = self._events.setdefault(data.get('name'), [0, 0])
+                event[0] += 1
+                event[1] += size
+            elif msg_type in ('RESPONSE', 'ERROR'):
+                request = self._in_flight.pop(data.get('id'), None)
+                if request is not None:
+                    self._record(*request, data.get('timing') or {}, msg_type == 'ERROR')
+
+    def _record(self, label, started, serialize, timing, failed):
+        # Called with the lock held
+        total = (time.perf_counter() - started) * 1000
+        stats = self._rpc.get(label)
+        if stats is None:
+            stats = self._rpc[label] = {'count': 0, 'errors': 0, 'phases': {phase: Histogram() for phase in PHASES}}
+        stats['count'] += 1
+        if failed:
+            stats['errors'] += 1
+        phases = stats['phases']
+        phases['total'].observe(total)
+        phases['serialize'].observe(serialize)
+        if 'node' in timing:
+            node, whatsapp = timing['node'], timing['whatsapp']
+            phases['node'].observe(node)
+            phases['whatsapp'].observe(whatsapp)
+            phases['ipc'].observe(max(0.0, total - serialize - node - whatsapp))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'rpc': {
+                    label: dict(
+                        {'count': stats['count'], 'errors': stats['errors']},
+                        **{phase: h.snapshot() for phase, h in stats['phases'].items() if h.count}
+                    )
+                    for label, stats in self._rpc.items()
+                },
+                'events': {name: {'count': c, 'bytes': b} for name, (c, b) in self._events.items()},
+                'frames': {direction: {'count': c, 'bytes': b} for direction, (c, b) in self._frames.items()},
+                'awaiting_response': len(self._in_flight),
+            }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def prometheus_text(snapshot):
+    """Renders a ``client.metrics()`` snapshot in the Prometheus text exposition format."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP pybaileys_{name} {help_text}")
+        lines.append(f"# TYPE pybaileys_{name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"pybaileys_{name}{suffix}{_labels(**labels) if labels else ''} {value}")
+
+    histograms = []
+    for method, stats in snapshot['rpc'].items():
+        for phase in PHASES:
+            h = stats.get(phase)
+            if h is None:
+                continue
+            for bound, cumulative in h['buckets'].items():
+                histograms.append(('_bucket', {'method': method, 'phase': phase, 'le': bound / 1000}, cumulative))
+            histograms.append(('_bucket', {'method': method, 'phase': phase, 'le': '+Inf'}, h['count']))
+            histograms.append(('_sum', {'method': method, 'phase': phase}, round(h['sum_ms'] / 1000, 6)))
+            histograms.append(('_count', {'method': method, 'phase': phase}, h['count']))
+    metric('rpc_seconds', 'histogram', 'Request latency by method and phase.', histograms)
+    metric('rpc_errors_total', 'counter', 'Requests answered with an error.',
+           [('', {'method': m}, s['errors']) for m, s in snapshot['rpc'].items()])
+    metric('events_total', 'counter', 'Events received by name.',
+           [('', {'event': n}, e['count']) for n, e in snapshot['events'].items()])
+    metric('event_bytes_total', 'counter', 'Size of received event frames by name.',
+           [('', {'event': n}, e['bytes']) for n, e in snapshot['events'].items()])
+    metric('frames_total', 'counter', 'Frames exchanged with the engine.',
+           [('', {'direction': d}, f['count']) for d, f in snapshot['frames'].items()])
+    metric('frame_bytes_total', 'counter', 'Size of frames exchanged with the engine.',
+           [('', {'direction': d}, f['bytes']) for d, f in snapshot['frames'].items()])
+    metric('pending_requests', 'gauge', 'Requests waiting for a response.',
+           [('', None, snapshot['pending_requests'])])
+
+    dispatcher = snapshot['dispatcher']
+    metric('listener_threads', 'gauge', 'Event dispatcher worker threads.', [('', None, dispatcher['workers'])])
+    metric('listener_queue', 'gauge', 'Events waiting for a listener thread.', [('', None, dispatcher['pending'])])
+    metric('listener_dropped_total', 'counter', 'Events dropped by the backpressure policy.',
+           [('', None, dispatcher['dropped'])])
+    metric('hook_threads', 'gauge', 'Threads answering engine hooks.', [('', None, snapshot['hook_threads'])])
+
+    engine = snapshot.get('engine')
+    if engine:
+        delay = engine['event_loop_delay_ms']
+        metric('engine_event_loop_delay_seconds', 'gauge', 'Node.js event loop delay.',
+               [('', {'stat': stat}, round(ms / 1000, 6)) for stat, ms in delay.items()])
+        metric('engine_memory_bytes', 'gauge', 'Node.js memory use.',
+               [('', {'kind': kind}, mb * 1048576) for kind, mb in engine['memory_mb'].items()])
+        metric('engine_requests_in_flight', 'gauge', 'Requests the engine is working on.',
+               [('', None, engine['requests_in_flight'])])
+        metric('engine_frames_sent_total', 'counter', 'Frames the engine sent by type.',
+               [('', {'type': t}, f['count']) for t, f in engine['frames']['out'].items()])
+        metric('engine_frame_bytes_sent_total', 'counter', 'Size of frames the engine sent by type.',
+               [('', {'type': t}, f['bytes']) for t, f in engine['frames']['out'].items()])
+    return '\n'.join(lines) + '\n'
+
+
+def serve(render, host, port):
+    """Serves ``render()`` as Prometheus text on every GET, from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            try:
+                body = render().encode('utf-8')
+                status = 200
+            except Exception as e:
+                body = f"# metrics unavailable: {e}\n".encode('utf-8')
+                status = 503
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='pybaileys-metrics', daemon=True).start()
+    return server
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import deque
+
+from .client import BaileysClient
+
+
+class EnginePool:
+    """Keeps ``size`` engines booted and connected, so starting a session only costs INIT.
+
+        pool = EnginePool(size=4)
+        client = pool.acquire()          # Node running, modules loaded, WS connected
+        client.on('messages.upsert')(handle)
+        client.start('auth/alice')
+
+    ``pool.start(auth_path, **kwargs)`` does both in one call. Every handed-out
+    engine is replaced in the background. Idle engines are health-checked every
+    ``health_interval`` seconds and replaced when their process died or stopped
+    answering. ``client_factory`` builds the clients
+    (``BaileysClient(framing=..., transport=...)`` by default); the pool only holds thread-based clients, not AsyncBaileysClient.
+    """
+
+    def __init__(self, size=2, framing='json', transport='ws', health_interval=30, client_factory=None):
+        self.size = size
+        self.health_interval = health_interval
+        self.client_factory = client_factory or (lambda: BaileysClient(framing=framing, transport=transport))
+        self._idle = deque()
+        self._cond = threading.Condition()
+        self._booting = 0
+        self._closed = False
+        self._counters = {'booted': 0, 'boot_failures': 0, 'handed_out': 0, 'replaced': 0}
+        self._health_thread = None
+
+    def open(self):
+        """Starts booting engines up to ``size`` and the health checks; returns self."""
+        with self._cond:
+            self._fill()
+        if self._health_thread is None and self.health_interval:
+            self._health_thread = threading.Thread(target=self._health_loop, name='pybaileys-pool-health', daemon=True)
+            self._health_thread.start()
+        return self
+
+    def _fill(self):
+        # Called with the lock held
+        while not self._closed and len(self._idle) + self._booting < self.size:
+            self._booting += 1
+            threading.Thread(target=self._boot, name='pybaileys-pool-boot', daemon=True).start()
+
+    def _boot(self):
+        client = self.client_factory()
+        try:
+            client._connect()
+        except Exception as e:
+            print(f"[!] Pool engine failed to boot: {e}")
+            client._teardown()
+            client = None
+        with self._cond:
+            self._booting -= 1
+            if client is None:
+                self._counters['boot_failures'] += 1
+            elif self._closed:
+                threading.Thread(target=client.stop, daemon=True).start()
+            else:
+                self._counters['booted'] += 1
+                self._idle.append(client)
+                self._cond.notify()
+
+    def acquire(self, timeout=60):
+        """Takes a connected, not yet started client, waiting up to ``timeout`` seconds for one to boot."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("EnginePool is closed")
+            self._fill()
+            while not self._idle:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("No engine became available in the pool")
+                self._cond.wait(remaining)
+                # A boot that failed leaves a gap, try again
+                self._fill()
+            client = self._idle.popleft()
+            self._counters['handed_out'] += 1
+            self._fill()
+        return client
+
+    def start(self, auth_path="baileys_auth_info", **kwargs):
+        """``acquire()`` plus ``client.start(auth_path, **kwargs)``."""
+        client = self.acquire()
+        client.start(auth_path, **kwargs)
+        return client
+
+    def _healthy(self, client):
+        if client.process is None or client.process.poll() is not None:
+            return False
+        try:
+            client._call_rpc('STATS', {}, timeout=5)
+            return True
+        except Exception:
+            return False
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            with self._cond:
+                if self._closed:
+                    return
+                # Also retries boots that failed since the last round
+                self._fill()
+                idle = list(self._idle)
+            for client in idle:
+                if self._healthy(client):
+                    continue
+                with self._cond:
+                    # It may have been handed out while we checked
+                    if client not in self._idle:
+                        continue
+                    self._idle.remove(client)
+                    self._counters['replaced'] += 1
+                    self._fill()
+                client.stop()
+
+    def stats(self):
+        with self._cond:
+            return dict(self._counters, idle=len(self._idle), booting=self._booting)
+
+    def close(self):
+        """Stops the idle engines; clients already handed out keep running."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for client in idle:
+            client.stop()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,79 @@
+from .client import BaileysClient
+
+
+class BaileysSession(BaileysClient):
+    """One WhatsApp account hosted by a :class:`BaileysEngine`.
+
+    Behaves like a :class:`BaileysClient` (``on``, ``start``, socket calls,
+    downloads, hooks), but has no Node process or connection of its own: every
+    frame goes through the engine, tagged with the session id.
+    """
+
+    def __init__(self, engine, session_id):
+        super().__init__(dispatcher=engine.dispatcher, framing=engine.framing, transport=engine.transport)
+        self.engine = engine
+        self.session_id = session_id
+        self.port = engine.port
+        self._metrics = engine._metrics
+        # Request ids are unique across sessions, so replies resolve in the engine's tables
+        self.responses = engine.responses
+        self._response_waiters = engine._response_waiters
+        self._dispatch_waiters = engine._dispatch_waiters
+        self._connection_lost = engine._connection_lost
+        self._collectors = engine._collectors
+
+    def start(self, auth_path=None, **kwargs):
+        """Starts the account; takes the same options as :meth:`BaileysClient.start`."""
+        self._configure(auth_path or f"baileys_auth_{self.session_id}", kwargs)
+        self._send_init()
+
+    def _send_frame(self, payload):
+        payload['session'] = self.session_id
+        self.engine._send_frame(payload)
+
+    def _hook_executor(self):
+        return self.engine._hook_executor()
+
+    def _engine_lost(self):
+        return self.engine._engine_lost()
+
+    def stop(self):
+        """Logs the socket off and flushes its keys; the engine keeps running."""
+        try:
+            self._call_rpc('CLOSE', {}, timeout=10)
+        finally:
+            self.engine.sessions.pop(self.session_id, None)
+
+
+class BaileysEngine(BaileysClient):
+    """A single Node process and connection hosting many sessions.
+
+        engine = BaileysEngine()
+        engine.start()
+        alice = engine.session('alice')
+        alice.on('messages.upsert')(handle)
+        alice.start('auth/alice')
+
+    Sessions share the engine's event dispatcher and hook threads. ``stop()``
+    flushes every session and ends the process.
+    """
+
+    def __init__(self, dispatcher=None, framing='json', transport='ws', metrics=False):
+        super().__init__(dispatcher=dispatcher, framing=framing, transport=transport, metrics=metrics)
+        self.sessions = {}
+
+    def start(self):
+        self._connect()
+
+    def session(self, session_id):
+        """Returns the client for ``session_id``, creating it on first use."""
+        client = self.sessions.get(session_id)
+        if client is None:
+            client = BaileysSession(self, session_id)
+            self.sessions[session_id] = client
+        return client
+
+    def _session_client(self, session):
+        if session is None:
+            return self
+        return self.sessions.get(session)
@@ -0,0 +1,34 @@
+class MessageStore:
+    """Queries the engine's SQLite message store, enabled with ``start(message_store=True)``.
+
+    Records come back as the dicts Baileys emits (``WAMessage``, ``Chat``,
+    ``Contact``). Pages are newest first:
+
+        page = client.store.messages(jid, limit=50)
+        older = client.store.messages(jid, limit=50, before=page[-1]['key']['id'])
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def _query(self, op, **args):
+        return self.client._call_rpc('STORE', {'op': op, 'args': args})
+
+    def messages(self, jid=None, limit=25, before=None, sender=None):
+        """A chat's messages, or one sender's (across chats when ``jid`` is None)."""
+        return self._query('messages', jid=jid, sender=sender, limit=limit, before=before)
+
+    def message(self, id, jid=None):
+        """One message by id, or None."""
+        return self._query('message', id=id, jid=jid)
+
+    def chats(self, limit=50, offset=0):
+        """Chats by last activity, newest first."""
+        return self._query('chats', limit=limit, offset=offset)
+
+    def unread(self, jid=None):
+        """Unread count of ``jid``, or ``{jid: count}`` for every chat with unread messages."""
+        return self._query('unread', jid=jid)
+
+    def contact(self, id):
+        return self._query('contact', id=id)
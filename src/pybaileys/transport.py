@@ -0,0 +1,129 @@
+"""Length-prefixed framing for the 'unix' and 'stdio' transports (see engine/framed.js).
+
+Every frame is a 4-byte big-endian payload length, one flags byte (1 = binary /
+msgpack, 0 = UTF-8 JSON) and the payload. The connection classes stand in for
+the WebSocket objects the clients otherwise use.
+"""
+import asyncio
+import io
+import struct
+import threading
+
+TRANSPORTS = ('ws', 'unix', 'stdio')
+
+HEADER = struct.Struct('>IB')
+FLAG_BINARY = 1
+
+
+def encode(frame):
+    if isinstance(frame, (bytes, bytearray)):
+        return HEADER.pack(len(frame), FLAG_BINARY) + frame
+    data = frame.encode('utf-8')
+    return HEADER.pack(len(data), 0) + data
+
+
+def decode(flags, payload):
+    return payload if flags & FLAG_BINARY else payload.decode('utf-8')
+
+
+class FramedConnection:
+    """Blocking framed connection, read by run_forever() on its own thread.
+
+    ``reader`` is a binary file object (a pipe, or ``socket.makefile('rb')``),
+    ``write`` takes the encoded bytes of one frame.
+    """
+
+    def __init__(self, reader, write, close, on_message):
+        self._reader = reader
+        self._write = write
+        self._close = close
+        self._on_message = on_message
+        self._lock = threading.Lock()
+
+    @classmethod
+    def over_socket(cls, sock, on_message):
+        return cls(sock.makefile('rb'), sock.sendall, sock.close, on_message)
+
+    @classmethod
+    def over_pipes(cls, stdout, stdin, on_message):
+        # Raw (unbuffered) pipes can return and accept short reads and writes
+        if isinstance(stdout, io.RawIOBase):
+            stdout = io.BufferedReader(stdout)
+        if isinstance(stdin, io.RawIOBase):
+            stdin = io.BufferedWriter(stdin)
+
+        def write(data):
+            stdin.write(data)
+            stdin.flush()
+        return cls(stdout, write, stdin.close, on_message)
+
+    def send(self, frame, opcode=None):
+        data = encode(frame)
+        with self._lock:
+            self._write(data)
+
+    def run_forever(self):
+        try:
+            while True:
+                header = self._reader.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+                length, flags = HEADER.unpack(header)
+                payload = self._reader.read(length)
+                if len(payload) < length:
+                    return
+                self._on_message(self, decode(flags, payload))
+        except (OSError, ValueError):
+            # Closed underneath us by close()
+            return
+
+    def close(self):
+        try:
+            self._close()
+        except OSError:
+            pass
+
+
+class AsyncFramedConnection:
+    """asyncio flavour with the slice of the ``websockets`` API AsyncBaileysClient uses."""
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def open_unix(cls, path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    @classmethod
+    async def over_pipes(cls, stdout, stdin):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2 ** 31 - 1)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stdout)
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, stdin)
+        writer = asyncio.StreamWriter(transport, protocol, None, loop)
+        return cls(reader, writer)
+
+    async def send(self, frame):
+        self._writer.write(encode(frame))
+        await self._writer.drain()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            header = await self._reader.readexactly(HEADER.size)
+            length, flags = HEADER.unpack(header)
+            payload = await self._reader.readexactly(length)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            raise StopAsyncIteration
+        return decode(flags, payload)
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, NotImplementedError):
+            pass